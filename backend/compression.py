@@ -0,0 +1,142 @@
+"""
+Response compression: Accept-Encoding negotiation, an ASGI middleware for
+dynamic responses and a holder for bodies that are compressed only once.
+"""
+import gzip
+from typing import Dict, Optional
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+# Preference order when the client weighs encodings equally
+ENCODINGS = ("br", "gzip") if brotli is not None else ("gzip",)
+
+COMPRESSIBLE_TYPES = ("text/", "application/json", "application/javascript", "application/xml", "image/svg+xml")
+
+# Cheap levels for per-request bodies, maximum levels for bodies compressed once
+DYNAMIC_LEVELS = {"br": 4, "gzip": 6}
+STATIC_LEVELS = {"br": 11, "gzip": 9}
+
+
+def negotiate_encoding(accept_encoding: Optional[str]) -> Optional[str]:
+    """Pick the best supported encoding from an Accept-Encoding header, or None for identity"""
+    if not accept_encoding:
+        return None
+    weights: Dict[str, float] = {}
+    for item in accept_encoding.split(","):
+        name, _, params = item.strip().partition(";")
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name.strip().lower()] = q
+    best, best_q = None, 0.0
+    for encoding in ENCODINGS:
+        q = weights.get(encoding, weights.get("*", 0.0))
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str, level: Optional[int] = None) -> bytes:
+    if encoding == "br":
+        return brotli.compress(body, quality=DYNAMIC_LEVELS["br"] if level is None else level)
+    return gzip.compress(body, compresslevel=DYNAMIC_LEVELS["gzip"] if level is None else level, mtime=0)
+
+
+def is_compressible(content_type: str) -> bool:
+    return content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class PrecompressedBody:
+    """An immutable response body whose encoded variants are built once, on first use"""
+
+    def __init__(self, body: bytes):
+        self.body = body
+        self._encoded: Dict[str, bytes] = {}
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            data = self._encoded[encoding] = compress(self.body, encoding, STATIC_LEVELS[encoding])
+        return data
+
+    def precompress(self) -> "PrecompressedBody":
+        """Build every encoded variant now; brotli at level 11 takes a while, so run this off the event loop"""
+        for encoding in ENCODINGS:
+            self.encoded(encoding)
+        return self
+
+
+class CompressionMiddleware:
+    """Compress buffered text/JSON responses of at least minimum_size bytes.
+
+    Responses that already carry a Content-Encoding (precompressed bodies),
+    streamed responses and non-text content types pass through untouched.
+    """
+
+    def __init__(self, app, minimum_size: int = 1024):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = None
+        for name, value in scope["headers"]:
+            if name == b"accept-encoding":
+                accept_encoding = value.decode("latin-1")
+        encoding = negotiate_encoding(accept_encoding)
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+
+        async def send_compressed(message):
+            nonlocal start_message
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if start_message is None:
+                await send(message)
+                return
+            start, start_message = start_message, None
+            headers = {name.lower(): value for name, value in start["headers"]}
+            body = message.get("body", b"")
+            if (
+                message["type"] != "http.response.body"
+                or message.get("more_body", False)
+                or b"content-encoding" in headers
+                or len(body) < self.minimum_size
+                or not is_compressible(headers.get(b"content-type", b"").decode("latin-1"))
+            ):
+                await send(start)
+                await send(message)
+                return
+
+            body = compress(body, encoding)
+            raw_headers = [
+                (name, value) for name, value in start["headers"]
+                if name.lower() not in (b"content-length", b"vary")
+            ]
+            vary = headers.get(b"vary")
+            if vary and b"accept-encoding" not in vary.lower():
+                vary += b", Accept-Encoding"
+            raw_headers += [
+                (b"content-encoding", encoding.encode()),
+                (b"content-length", str(len(body)).encode()),
+                (b"vary", vary or b"Accept-Encoding"),
+            ]
+            await send({**start, "headers": raw_headers})
+            await send({**message, "body": body})
+
+        await self.app(scope, receive, send_compressed)
@@ -0,0 +1,69 @@
+"""
+Production server settings: gunicorn supervising uvicorn workers.
+
+    gunicorn -c gunicorn.conf.py server:app
+
+Gunicorn restarts workers that exit or hang (uvicorn's own --workers does not),
+which is what makes max_requests safe to use. Every value can be overridden
+through the environment; for local development use run.py, which reloads on
+changes.
+"""
+import os
+
+
+def available_cpus() -> int:
+    """CPUs this process may use, honouring affinity and a cgroup v2/v1 quota (containers see the host's count)"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+    quota = None
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+    if quota is not None:
+        cpus = min(cpus, max(1, int(quota + 0.5)))
+    return cpus
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# Each worker is a single-threaded event loop, so one per CPU keeps every core
+# busy; at least two, so a restarting worker never leaves the instance idle
+workers = int(os.environ.get("WEB_CONCURRENCY") or max(2, available_cpus()))
+# uvicorn picks uvloop and httptools when they are installed
+worker_class = "uvicorn.workers.UvicornWorker"
+
+# Recycle each worker after this many requests (staggered by the jitter) to contain slow leaks
+max_requests = int(os.environ.get("MAX_REQUESTS", "10000"))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", "1000"))
+
+# On SIGTERM workers stop accepting, finish in-flight requests and run the
+# lifespan shutdown; anything still running after graceful_timeout is killed
+graceful_timeout = int(os.environ.get("GRACEFUL_TIMEOUT", "30"))
+# A worker whose event loop stops answering the heartbeat for this long is restarted
+timeout = int(os.environ.get("WORKER_TIMEOUT", "60"))
+
+# Idle keep-alive, longer than the platform proxy's idle timeout so the proxy
+# always closes first and never reuses a connection we are closing
+keepalive = int(os.environ.get("KEEPALIVE_TIMEOUT", "75"))
+backlog = int(os.environ.get("LISTEN_BACKLOG", "2048"))
+
+# The app writes its own JSON access log (logs.AccessLogMiddleware)
+accesslog = None
+errorlog = "-"
+loglevel = os.environ.get("LOG_LEVEL", "info").lower()
+# Trust X-Forwarded-* from the platform's proxy
+forwarded_allow_ips = os.environ.get("FORWARDED_ALLOW_IPS", "*")
@@ -0,0 +1,142 @@
+"""
+Non-blocking logging: records are queued by request handlers and written to
+stdout by a background thread, as JSON lines or plain text. Also provides the
+ASGI access-log middleware.
+"""
+import atexit
+import copy
+import json
+import logging
+import queue
+import random
+import sys
+import time
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+
+TEXT_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+
+
+class JSONFormatter(logging.Formatter):
+    """One JSON object per line; structured values passed as extra={"fields": {...}} are merged in"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        fields = getattr(record, "fields", None)
+        if fields:
+            entry.update(fields)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, default=str, ensure_ascii=False)
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Enqueue without ever blocking the caller; records are dropped (and counted) when the queue is full"""
+
+    dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve the message and traceback now, while the caller's state is intact,
+        # but leave the final formatting to the writer thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            DroppingQueueHandler.dropped += 1
+
+
+def configure_logging(level: str = "INFO", fmt: str = "json", queue_size: int = 10000) -> QueueListener:
+    """Route all logging through a bounded queue drained by one writer thread"""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(JSONFormatter() if fmt == "json" else logging.Formatter(TEXT_FORMAT))
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(maxsize=queue_size)
+    listener = QueueListener(log_queue, handler, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(DroppingQueueHandler(log_queue))
+    root.setLevel(level.upper())
+
+    listener.start()
+    atexit.register(listener.stop)
+    return listener
+
+
+class AccessLogMiddleware:
+    """Pure ASGI access log: one record per request, written after the response completes.
+
+    Successful, fast requests are sampled at sample_rate; errors (status >= 500
+    or an exception) and requests slower than slow_ms are always logged.
+    """
+
+    def __init__(self, app, sample_rate: float = 1.0, slow_ms: float = 1000.0, logger: Optional[logging.Logger] = None):
+        self.app = app
+        self.sample_rate = sample_rate
+        self.slow_ms = slow_ms
+        self.logger = logger or logging.getLogger("access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        started = time.perf_counter()
+        status = 500
+        sent = 0
+
+        async def send_with_stats(message):
+            nonlocal status, sent
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                sent += len(message.get("body", b""))
+            await send(message)
+
+        error = None
+        try:
+            await self.app(scope, receive, send_with_stats)
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            duration_ms = (time.perf_counter() - started) * 1000
+            failed = error is not None or status >= 500
+            level = logging.ERROR if failed else logging.INFO
+            if self.logger.isEnabledFor(level) and (
+                failed or duration_ms >= self.slow_ms or random.random() < self.sample_rate
+            ):
+                client = scope.get("client")
+                fields = {
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(duration_ms, 2),
+                    "bytes": sent,
+                    "client": client[0] if client else None,
+                }
+                # Data-store spans recorded by TracingMiddleware, when it runs inside this one
+                trace = scope.get("trace")
+                if trace is not None and trace.spans:
+                    fields["store_calls"] = len(trace.spans)
+                    fields["store_ms"] = round(sum(span.duration_ms for span in trace.spans), 2)
+                message = f'{scope["method"]} {scope["path"]} {status} {duration_ms:.1f}ms'
+                if error is not None:
+                    message += f" {error!r}"
+                self.logger.log(level, message, exc_info=error, extra={"fields": fields})
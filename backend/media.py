@@ -0,0 +1,220 @@
+"""
+Upload handling: bounded spooling to disk, image type sniffing and
+responsive image derivatives.
+"""
+import base64
+import hashlib
+import io
+import os
+import tempfile
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, Optional, Sequence
+
+try:
+    from python_multipart import MultipartParser
+    from python_multipart.exceptions import MultipartParseError
+    from python_multipart.multipart import parse_options_header
+except ImportError:  # python-multipart < 0.0.13
+    from multipart import MultipartParser
+    from multipart.exceptions import MultipartParseError
+    from multipart.multipart import parse_options_header
+
+# Magic-byte prefixes of the image formats we accept, mapped to (content type, extension)
+IMAGE_SIGNATURES = (
+    (b"\xff\xd8\xff", ("image/jpeg", "jpg")),
+    (b"\x89PNG\r\n\x1a\n", ("image/png", "png")),
+    (b"GIF87a", ("image/gif", "gif")),
+    (b"GIF89a", ("image/gif", "gif")),
+)
+
+
+class UploadTooLarge(Exception):
+    pass
+
+
+class UnsupportedImageType(Exception):
+    pass
+
+
+class MalformedUpload(Exception):
+    """The body is not a multipart form carrying the expected file field"""
+
+
+@dataclass
+class SpooledUpload:
+    path: str
+    size: int
+    content_type: str
+    ext: str
+    sha256: str
+
+    def cleanup(self):
+        try:
+            os.unlink(self.path)
+        except FileNotFoundError:
+            pass
+
+
+def sniff_image_type(head: bytes):
+    """Return (content type, extension) from the first bytes of a file, or None"""
+    for signature, kind in IMAGE_SIGNATURES:
+        if head.startswith(signature):
+            return kind
+    if len(head) >= 12 and head[:4] == b"RIFF" and head[8:12] == b"WEBP":
+        return ("image/webp", "webp")
+    return None
+
+
+class _FilePartSpool:
+    """MultipartParser callbacks that write one file field of the form to an open file.
+
+    Every other part is dropped as it streams past. The image type is sniffed
+    from the first bytes and the size limit is checked on every chunk, so a
+    bad upload is refused while it is still being read.
+    """
+
+    # Enough leading bytes for every signature in IMAGE_SIGNATURES and WebP's
+    SNIFF_BYTES = 12
+
+    def __init__(self, out, field: str, max_bytes: int):
+        self.out = out
+        self.field = field.encode()
+        self.max_bytes = max_bytes
+        self.header_field = b""
+        self.header_value = b""
+        self.disposition = b""
+        self.in_file = False
+        self.found = False
+        self.head = b""
+        self.kind = None
+        self.size = 0
+        self.digest = hashlib.sha256()
+
+    def callbacks(self) -> Dict[str, Any]:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+    def on_part_begin(self):
+        self.disposition = b""
+
+    def on_header_field(self, data: bytes, start: int, end: int):
+        self.header_field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int):
+        self.header_value += data[start:end]
+
+    def on_header_end(self):
+        if self.header_field.lower() == b"content-disposition":
+            self.disposition = self.header_value
+        self.header_field = b""
+        self.header_value = b""
+
+    def on_headers_finished(self):
+        _, options = parse_options_header(self.disposition)
+        self.in_file = not self.found and options.get(b"name") == self.field and b"filename" in options
+        self.found = self.found or self.in_file
+
+    def on_part_data(self, data: bytes, start: int, end: int):
+        if not self.in_file:
+            return
+        chunk = data[start:end]
+        self.size += len(chunk)
+        if self.size > self.max_bytes:
+            raise UploadTooLarge()
+        if self.kind is None:
+            self.head += chunk[:self.SNIFF_BYTES - len(self.head)]
+            if len(self.head) >= self.SNIFF_BYTES:
+                self.sniff()
+        self.digest.update(chunk)
+        self.out.write(chunk)
+
+    def on_part_end(self):
+        if self.in_file and self.kind is None:
+            self.sniff()
+        self.in_file = False
+
+    def sniff(self):
+        self.kind = sniff_image_type(self.head)
+        if self.kind is None:
+            raise UnsupportedImageType()
+
+
+async def spool_multipart_upload(chunks: AsyncIterator[bytes], content_type: Optional[str], field: str,
+                                 max_bytes: int, form_overhead: int = 64 * 1024) -> SpooledUpload:
+    """Stream a multipart/form-data body straight to a temp file, enforcing max_bytes and sniffing its type.
+
+    The body is parsed as it arrives, so the file is written to disk once and
+    at most one network chunk is held in memory. Only the file field named field
+    is kept; a body more than form_overhead bytes (boundaries, part headers,
+    other fields) over max_bytes is refused as soon as that much has been read.
+    The SHA-256 of the content is computed along the way so the upload can be
+    stored content-addressed.
+    """
+    mime_type, params = parse_options_header(content_type or "")
+    if mime_type != b"multipart/form-data" or not params.get(b"boundary"):
+        raise MalformedUpload("Expected a multipart/form-data body")
+
+    fd, path = tempfile.mkstemp(prefix="upload-")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            spool = _FilePartSpool(out, field, max_bytes)
+            parser = MultipartParser(params[b"boundary"], spool.callbacks())
+            received = 0
+            async for chunk in chunks:
+                received += len(chunk)
+                if received > max_bytes + form_overhead:
+                    raise UploadTooLarge()
+                parser.write(chunk)
+            parser.finalize()
+        if not spool.found:
+            raise MalformedUpload(f"The form has no file field named '{field}'")
+        if spool.kind is None:
+            raise UnsupportedImageType()
+    except MultipartParseError as e:
+        os.unlink(path)
+        raise MalformedUpload(f"Malformed multipart body: {e}") from e
+    except BaseException:
+        os.unlink(path)
+        raise
+    return SpooledUpload(path=path, size=spool.size, content_type=spool.kind[0], ext=spool.kind[1],
+                         sha256=spool.digest.hexdigest())
+
+
+def generate_derivatives(src_path: str, widths: Sequence[int], quality: int = 80) -> Dict[str, Any]:
+    """Resize an image to WebP derivatives and a blurred placeholder.
+
+    Runs in a worker process, so it takes and returns only picklable values:
+    the derivatives are written next to src_path as "<src_path>-<width>.webp".
+    Widths at or above the original width are skipped; the original serves those.
+    """
+    from PIL import Image, ImageFilter, ImageOps
+
+    with Image.open(src_path) as original:
+        image = ImageOps.exif_transpose(original)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+        width, height = image.size
+
+        files = []
+        for target in sorted(set(widths)):
+            if target >= width:
+                continue
+            resized = image.resize((target, max(1, round(height * target / width))), Image.LANCZOS)
+            out_path = f"{src_path}-{target}.webp"
+            resized.save(out_path, "WEBP", quality=quality, method=4)
+            files.append((target, out_path))
+
+        # ~16px wide, blurred, inlined as a data URI for instant paint
+        tiny = image.resize((16, max(1, round(height * 16 / width))), Image.BILINEAR)
+        tiny = tiny.filter(ImageFilter.GaussianBlur(1))
+        buffer = io.BytesIO()
+        tiny.save(buffer, "WEBP", quality=40)
+        placeholder = "data:image/webp;base64," + base64.b64encode(buffer.getvalue()).decode()
+
+    return {"width": width, "height": height, "placeholder": placeholder, "files": files}
@@ -0,0 +1,330 @@
+"""
+Server-side HTML renderer for published school pages.
+
+Mirrors the markup of frontend/src/components/editor/ComponentRenderer.js in
+preview mode, but emits plain HTML with a small inline stylesheet so a visitor
+gets a fully painted page without loading the React bundle.
+"""
+import re
+from html import escape
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import quote
+
+
+# image URL -> srcset manifest ({"width", "height", "placeholder", "sources": [{"width", "url"}]})
+Images = Dict[str, Dict[str, Any]]
+
+
+def _e(value: Any) -> str:
+    return escape("" if value is None else str(value), quote=True)
+
+
+# Escaping keeps a value inside its attribute, but a javascript: link or a
+# "red;position:fixed" width is still live there, so URLs and CSS values are
+# checked against what the editor can produce and dropped otherwise
+URL_SCHEME = re.compile(r"^([^/?#]*):")
+LINK_SCHEMES = ("http", "https", "mailto", "tel")
+IMAGE_SCHEMES = ("http", "https")
+URL_SAFE_CHARACTERS = "/:?#[]@!$&*+,;=%~-._"
+CSS_LENGTH = re.compile(r"\d+(\.\d+)?(px|%|em|rem|vw|vh)|0|auto")
+CSS_COLOR = re.compile(r"#[0-9a-fA-F]{3,8}|[a-zA-Z]+|(rgb|hsl)a?\([\d\s.,%]+\)")
+FONT_NAME = re.compile(r"[\w -]+")
+
+
+def _url(value: Any, schemes: tuple = LINK_SCHEMES, default: str = "") -> str:
+    """An absolute URL with one of schemes, or a relative one; anything else becomes default"""
+    url = value.strip() if isinstance(value, str) else ""
+    # Browsers ignore control characters and whitespace inside a scheme ("java\tscript:")
+    scheme = URL_SCHEME.match(re.sub(r"[\x00-\x20]", "", url))
+    if not url or (scheme and scheme.group(1).lower() not in schemes):
+        return default
+    return url
+
+
+def _css_url(url: str) -> str:
+    """url() for a style attribute; quotes, parentheses and spaces are percent-encoded so they can't end it"""
+    return f"url('{_e(quote(url, safe=URL_SAFE_CHARACTERS))}')"
+
+
+def _css(value: Any, pattern: re.Pattern, default: str) -> str:
+    return value if isinstance(value, str) and pattern.fullmatch(value) else default
+
+
+def _align(align: Any) -> str:
+    return f" align-{align}" if align in ("center", "right") else ""
+
+
+def _img(src: Any, alt: Any, images: Images, sizes: str, css_class: str = "", style: str = "") -> str:
+    """<img> with a srcset, intrinsic size and blurred placeholder when the image has derivatives"""
+    attrs = f' class="{css_class}"' if css_class else ""
+    manifest = images.get(src) if isinstance(src, str) else None
+    if manifest:
+        srcset = ", ".join(f'{_e(source["url"])} {int(source["width"])}w' for source in manifest["sources"])
+        attrs += (
+            f' srcset="{srcset}" sizes="{sizes}" width="{int(manifest["width"])}" height="{int(manifest["height"])}"'
+        )
+        style += f"background:{_css_url(manifest['placeholder'])} center/cover"
+    if style:
+        attrs += f' style="{style}"'
+    return f'<img src="{_e(_url(src, IMAGE_SCHEMES))}" alt="{_e(alt)}"{attrs} loading="lazy" decoding="async">'
+
+
+def _background(src: Any, images: Images, max_width: int = 1600) -> str:
+    """CSS background for a full-width image, preferring a derivative no wider than max_width"""
+    manifest = images.get(src) if isinstance(src, str) else None
+    if not manifest:
+        url = _url(src, IMAGE_SCHEMES)
+        return f"background-image:{_css_url(url)}" if url else ""
+    fitting = [source for source in manifest["sources"] if source["width"] <= max_width]
+    best = max(fitting, key=lambda source: source["width"]) if fitting else manifest["sources"][0]
+    return f"background-image:{_css_url(best['url'])},{_css_url(manifest['placeholder'])}"
+
+
+def render_hero(props: Dict[str, Any], images: Images) -> str:
+    button = ""
+    if props.get("buttonText"):
+        button = f'<a class="btn btn-secondary" href="{_e(_url(props.get("buttonLink"), default="#"))}">{_e(props["buttonText"])}</a>'
+    return (
+        f'<section class="hero" style="{_background(props.get("backgroundImage"), images)}">'
+        '<div class="hero-overlay"></div>'
+        '<div class="hero-body">'
+        f'<h1>{_e(props.get("title"))}</h1>'
+        f'<p>{_e(props.get("subtitle"))}</p>'
+        f'{button}'
+        '</div></section>'
+    )
+
+
+def render_text(props: Dict[str, Any], images: Images) -> str:
+    size = props.get("fontSize") if props.get("fontSize") in ("sm", "base", "lg", "xl") else "base"
+    return (
+        f'<div class="narrow"><p class="text text-{size}{_align(props.get("align"))}">'
+        f'{_e(props.get("content"))}</p></div>'
+    )
+
+
+def render_heading(props: Dict[str, Any], images: Images) -> str:
+    tag = props.get("level") if props.get("level") in ("h1", "h2", "h3", "h4") else "h2"
+    return (
+        f'<div class="narrow"><{tag} class="heading{_align(props.get("align"))}">'
+        f'{_e(props.get("content"))}</{tag}></div>'
+    )
+
+
+def render_image(props: Dict[str, Any], images: Images) -> str:
+    image = _img(
+        props.get("src"), props.get("alt") or "Image", images, "100vw",
+        css_class="image", style=f'width:{_css(props.get("width"), CSS_LENGTH, "100%")};',
+    )
+    return f'<div class="block">{image}</div>'
+
+
+def render_button(props: Dict[str, Any], images: Images) -> str:
+    variant = props.get("variant") if props.get("variant") in ("primary", "secondary", "outline") else "primary"
+    return (
+        f'<div class="block align-center"><a class="btn btn-{variant}" href="{_e(_url(props.get("link"), default="#"))}">'
+        f'{_e(props.get("text"))}</a></div>'
+    )
+
+
+def render_features(props: Dict[str, Any], images: Images) -> str:
+    cards = "".join(
+        f'<div class="card"><h3>{_e(f.get("title"))}</h3><p>{_e(f.get("description"))}</p></div>'
+        for f in props.get("features") or []
+    )
+    return (
+        f'<section class="section muted"><div class="wide"><h2 class="section-title">{_e(props.get("title"))}</h2>'
+        f'<div class="grid grid-3">{cards}</div></div></section>'
+    )
+
+
+def render_gallery(props: Dict[str, Any], images: Images) -> str:
+    tiles = "".join(
+        f'<div class="tile">{_img(src, f"Gallery {idx + 1}", images, "(min-width: 768px) 25vw, 50vw")}</div>'
+        for idx, src in enumerate(props.get("images") or [])
+    )
+    return (
+        f'<section class="section"><div class="wide"><h2 class="section-title">{_e(props.get("title"))}</h2>'
+        f'<div class="grid grid-4">{tiles}</div></div></section>'
+    )
+
+
+def render_announcements(props: Dict[str, Any], images: Images) -> str:
+    items = "".join(
+        f'<div class="card muted"><span class="date">{_e(item.get("date"))}</span>'
+        f'<h3>{_e(item.get("title"))}</h3><p>{_e(item.get("excerpt"))}</p></div>'
+        for item in props.get("items") or []
+    )
+    return (
+        f'<section class="section"><div class="wide"><h2>{_e(props.get("title"))}</h2>'
+        f'<div class="grid grid-3">{items}</div></div></section>'
+    )
+
+
+def _event_date(value: Any):
+    try:
+        parsed = datetime.fromisoformat(str(value))
+        return str(parsed.day), parsed.strftime("%b")
+    except ValueError:
+        return _e(value), ""
+
+
+def render_events(props: Dict[str, Any], images: Images) -> str:
+    events = []
+    for event in props.get("events") or []:
+        day, month = _event_date(event.get("date"))
+        events.append(
+            f'<div class="card event"><div class="event-date"><strong>{day}</strong><span>{month}</span></div>'
+            f'<div><h3>{_e(event.get("title"))}</h3><p>{_e(event.get("time"))}</p></div></div>'
+        )
+    return (
+        f'<section class="section primary"><div class="wide"><h2>{_e(props.get("title"))}</h2>'
+        f'<div class="grid grid-3">{"".join(events)}</div></div></section>'
+    )
+
+
+DEFAULT_STAFF_IMAGE = "https://images.unsplash.com/photo-1573496359142-b8d87734a5a2?q=80&w=400"
+STAFF_SIZES = "(min-width: 768px) 33vw, 100vw"
+
+
+def render_staff(props: Dict[str, Any], images: Images) -> str:
+    people = "".join(
+        '<div class="card person">'
+        f'<div class="tile">{_img(person.get("image") or DEFAULT_STAFF_IMAGE, person.get("name"), images, STAFF_SIZES)}</div>'
+        f'<h3>{_e(person.get("name"))}</h3><p class="role">{_e(person.get("role"))}</p></div>'
+        for person in props.get("staff") or []
+    )
+    return (
+        f'<section class="section muted"><div class="wide"><h2 class="section-title">{_e(props.get("title"))}</h2>'
+        f'<div class="grid grid-3">{people}</div></div></section>'
+    )
+
+
+def render_contact(props: Dict[str, Any], images: Images) -> str:
+    rows = "".join(
+        f'<div><h3>{label}</h3><p>{_e(props.get(key))}</p></div>'
+        for label, key in (("Address", "address"), ("Phone", "phone"), ("Email", "email"))
+    )
+    return (
+        f'<section class="section" id="contact"><div class="wide"><h2 class="section-title">{_e(props.get("title"))}</h2>'
+        f'<div class="grid grid-3">{rows}</div></div></section>'
+    )
+
+
+def render_footer(props: Dict[str, Any], images: Images) -> str:
+    social = props.get("socialLinks") or {}
+    links = "".join(
+        f'<a href="{_e(_url(social.get(network), default="#"))}">{label}</a>'
+        for network, label in (("facebook", "Facebook"), ("twitter", "Twitter"), ("instagram", "Instagram"))
+    )
+    school_name = _e(props.get("schoolName"))
+    return (
+        '<footer class="footer"><div class="wide"><div class="grid grid-3">'
+        f'<div><strong>{school_name}</strong><p>Inspiring young minds and building bright futures through excellence in education.</p></div>'
+        f'<div><h4>Contact</h4><p>{_e(props.get("address"))}</p><p>{_e(props.get("phone"))}</p><p>{_e(props.get("email"))}</p></div>'
+        f'<div><h4>Follow Us</h4><p class="social">{links}</p></div>'
+        f'</div><p class="copyright">&copy; {datetime.now().year} {school_name}. All rights reserved.</p></div></footer>'
+    )
+
+
+def render_spacer(props: Dict[str, Any], images: Images) -> str:
+    try:
+        height = int(props.get("height") or 60)
+    except (TypeError, ValueError):
+        height = 60
+    return f'<div style="height:{height}px"></div>'
+
+
+COMPONENT_RENDERERS: Dict[str, Callable[[Dict[str, Any], Images], str]] = {
+    "hero": render_hero,
+    "text": render_text,
+    "heading": render_heading,
+    "image": render_image,
+    "button": render_button,
+    "features": render_features,
+    "gallery": render_gallery,
+    "announcements": render_announcements,
+    "events": render_events,
+    "staff": render_staff,
+    "contact": render_contact,
+    "footer": render_footer,
+    "spacer": render_spacer,
+}
+
+STYLESHEET = """
+*{box-sizing:border-box}body{margin:0;font-family:var(--font),system-ui,sans-serif;color:var(--text);background:var(--background);line-height:1.6}
+h1,h2,h3,h4{margin:0 0 .75rem;line-height:1.2}p{margin:0 0 .5rem}a{color:inherit}
+.narrow{max-width:56rem;margin:0 auto;padding:1rem 1.5rem}.wide{max-width:72rem;margin:0 auto}.block{padding:1rem 1.5rem}
+.section{padding:4rem 1.5rem}.section-title{text-align:center;font-size:2.25rem;margin-bottom:3rem}
+.muted{background:#F8FAFC}.primary{background:var(--primary);color:#fff}.primary .card{color:var(--text)}
+.align-center{text-align:center}.align-right{text-align:right}
+.text-sm{font-size:.875rem}.text-base{font-size:1rem}.text-lg{font-size:1.125rem}.text-xl{font-size:1.25rem}
+.hero{position:relative;min-height:500px;display:flex;align-items:center;justify-content:center;background-size:cover;background-position:center;color:#fff;text-align:center}
+.hero-overlay{position:absolute;inset:0;background:linear-gradient(to right,var(--primary),transparent);opacity:.9}
+.hero-body{position:relative;max-width:56rem;padding:3rem 1.5rem}.hero h1{font-size:3.5rem}.hero p{font-size:1.25rem;margin-bottom:2rem}
+.btn{display:inline-block;padding:.75rem 2rem;border-radius:9999px;font-weight:600;text-decoration:none}
+.btn-primary{background:var(--primary);color:#fff}.btn-secondary{background:var(--secondary);color:#0F172A}
+.btn-outline{border:2px solid var(--primary);color:var(--primary)}
+.image{display:block;margin:0 auto;max-width:100%;border-radius:.75rem}
+.grid{display:grid;gap:1.5rem}.grid-4{grid-template-columns:repeat(2,1fr)}
+@media(min-width:768px){.grid-3{grid-template-columns:repeat(3,1fr)}.grid-4{grid-template-columns:repeat(4,1fr)}}
+.card{background:#fff;border-radius:1rem;padding:2rem;box-shadow:0 1px 2px rgba(0,0,0,.06)}
+.tile{aspect-ratio:1;overflow:hidden;border-radius:.75rem}.tile img{width:100%;height:100%;object-fit:cover}
+.date,.role{color:var(--accent);font-size:.875rem;font-weight:500}
+.event{display:flex;gap:1rem;padding:1.5rem}.event-date{text-align:center;min-width:60px;color:var(--primary)}.event-date strong{display:block;font-size:1.5rem}
+.person{padding:0;overflow:hidden;text-align:center}.person h3{margin-top:1.5rem}.person .role{padding-bottom:1.5rem}
+.footer{background:#0F172A;color:#fff;padding:3rem 1.5rem}.footer p{color:#94A3B8}.social a{margin-right:.75rem}
+.copyright{border-top:1px solid #1E293B;padding-top:2rem;margin-top:2rem;text-align:center;font-size:.875rem}
+"""
+
+
+def collect_image_urls(components: List[Dict[str, Any]]) -> List[str]:
+    """Every image URL the renderer may emit for these components"""
+    urls = []
+    for component in components or []:
+        props = component.get("props") or {}
+        kind = component.get("type")
+        if kind == "hero":
+            urls.append(props.get("backgroundImage"))
+        elif kind == "image":
+            urls.append(props.get("src"))
+        elif kind == "gallery":
+            urls.extend(props.get("images") or [])
+        elif kind == "staff":
+            urls.extend(person.get("image") for person in props.get("staff") or [])
+    return [url for url in urls if isinstance(url, str) and url]
+
+
+def render_components(components: List[Dict[str, Any]], images: Optional[Images] = None) -> str:
+    """Render page components in their saved order, skipping unknown types"""
+    parts = []
+    for component in sorted(components or [], key=lambda c: c.get("order", 0)):
+        render = COMPONENT_RENDERERS.get(component.get("type"))
+        if render:
+            parts.append(render(component.get("props") or {}, images or {}))
+    return "".join(parts)
+
+
+def render_page(school: Dict[str, Any], page: Dict[str, Any], theme: Dict[str, Any],
+                images: Optional[Images] = None) -> str:
+    """Render a full HTML document for a published page"""
+    colors = theme.get("colors", {})
+    variables = ";".join(
+        f"--{name}:{_css(colors.get(name), CSS_COLOR, default)}"
+        for name, default in (
+            ("primary", "#1D4ED8"),
+            ("secondary", "#FBBF24"),
+            ("background", "#FFFFFF"),
+            ("text", "#1E293B"),
+            ("accent", "#3B82F6"),
+        )
+    )
+    font = _css(theme.get("fontFamily"), FONT_NAME, "Outfit")
+    return (
+        '<!DOCTYPE html><html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        f'<title>{_e(page.get("name"))} | {_e(school.get("name"))}</title>'
+        f'<style>:root{{{variables};--font:"{font}"}}{STYLESHEET}</style></head>'
+        f'<body>{render_components(page.get("components"), images)}</body></html>'
+    )
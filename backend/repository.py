@@ -0,0 +1,625 @@
+"""
+Data access for schools, pages and assets, behind one interface the routes call.
+
+PostgrestRepository goes through Supabase's REST API (an HTTP hop per query);
+PostgresRepository talks to the database directly over an asyncpg pool, so it
+skips the HTTP/JSON layer and can run multi-statement writes in a transaction.
+Both call the same server-side functions (patch_page_components,
+apply_page_batch, set_school_metadata_key, publish_page_snapshot,
+refresh_published_snapshot, unpublish_page, page_revision_chain,
+search_school_pages), so behaviour matches.
+"""
+import asyncio
+import json
+import time
+from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from tracing import Span, report_span
+
+try:
+    import asyncpg
+except ImportError:  # only needed for DATA_BACKEND=postgres
+    asyncpg = None
+
+TIMESTAMP_COLUMNS = {"created_at", "updated_at"}
+
+# Listing rows: everything but the components, whose count and size are
+# generated columns (schema_v8), so a listing never reads the components
+PAGE_SUMMARY_COLUMNS = ('id, school_id, name, slug, is_published, theme, version, '
+                        'created_at, updated_at, component_count, components_bytes')
+SCHOOL_SUMMARY_COLUMNS = 'id, name, slug, logo_url, primary_color, secondary_color, theme, created_at, page_count'
+
+# Position after the last row of a listing: its (created_at, id)
+Keyset = Tuple[Any, str]
+
+
+class DataStoreError(Exception):
+    """A failed query, carrying the SQLSTATE (or PostgREST error code) so routes can map it to a status"""
+
+    def __init__(self, code: Optional[str], message: str):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+def parse_json_column(value):
+    """Rows written by older clients hold JSON columns as a JSON-encoded string"""
+    return json.loads(value) if isinstance(value, str) else value
+
+
+def materialize_revision(chain: List[Dict[str, Any]]) -> List[Any]:
+    """Components at the last revision of a chain: a keyframe followed by the deltas after it (schema_v10)"""
+    components: List[Any] = []
+    for revision in chain:
+        data = parse_json_column(revision['data'])
+        if revision['kind'] == 'keyframe':
+            components = data
+        else:
+            by_id = {component['id']: component for component in components}
+            by_id.update(data['changed'])
+            components = [by_id[component_id] for component_id in data['order']]
+    return components
+
+
+class Repository(ABC):
+    # ---- Schools ----
+
+    @abstractmethod
+    async def create_school(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    async def update_school(self, school_id: str, data: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The updated row, or None when the school does not exist"""
+
+    @abstractmethod
+    async def delete_school(self, school_id: str) -> bool:
+        """Delete a school and its pages; False when the school does not exist"""
+
+    @abstractmethod
+    async def has_schools(self) -> bool:
+        ...
+
+    @abstractmethod
+    async def get_school(self, school_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def get_school_by_slug(self, slug: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def school_exists(self, school_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def list_schools(self, limit: int, after: Optional[Keyset] = None) -> List[Dict[str, Any]]:
+        """Up to limit school summaries (with page_count), newest first, starting after the given keyset"""
+
+    @abstractmethod
+    async def get_school_metadata(self, school_id: str) -> Optional[Dict[str, Any]]:
+        """Parsed metadata ({} when unset), or None when the school does not exist"""
+
+    @abstractmethod
+    async def set_school_metadata_key(self, school_id: str, key: str, value: Any) -> bool:
+        ...
+
+    # ---- Pages ----
+
+    @abstractmethod
+    async def create_page(self, doc: Dict[str, Any]) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    async def get_page(self, page_id: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def page_exists(self, page_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def get_published_snapshot(self, school_slug: str, page_slug: str) -> Optional[Dict[str, Any]]:
+        """hash, body, school_id, page_id and stale of the snapshot a public URL serves"""
+
+    @abstractmethod
+    async def publish_page_snapshot(self, page_id: str, version: int, digest: str,
+                                    body: str) -> Optional[Dict[str, Any]]:
+        """Store a snapshot built from the page at version and serve it (PT412 once the page moved past version)"""
+
+    @abstractmethod
+    async def refresh_published_snapshot(self, page_id: str, old_hash: str, stale: int, digest: str,
+                                         body: str) -> bool:
+        """Serve a rebuilt snapshot instead of a stale one; False when the page moved on since it was read"""
+
+    @abstractmethod
+    async def unpublish_page(self, page_id: str) -> bool:
+        ...
+
+    @abstractmethod
+    async def list_pages(self, school_id: str, limit: int, after: Optional[Keyset] = None,
+                         include_components: bool = False) -> List[Dict[str, Any]]:
+        """Up to limit page summaries of a school, newest first, starting after the given keyset"""
+
+    @abstractmethod
+    async def update_page(self, page_id: str, data: Dict[str, Any],
+                          expected_version: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """The updated row, or None when the page is missing or not at expected_version"""
+
+    @abstractmethod
+    async def patch_page_components(self, page_id: str, ops: List[Dict[str, Any]],
+                                    expected_version: Optional[int]) -> Optional[Dict[str, Any]]:
+        """id, version and updated_at after the patch, or None when the page does not exist"""
+
+    @abstractmethod
+    async def apply_page_batch(self, ops: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def delete_page(self, page_id: str) -> bool:
+        ...
+
+    # ---- Revisions ----
+
+    @abstractmethod
+    async def list_page_revisions(self, page_id: str, limit: int,
+                                  before: Optional[int] = None) -> List[Dict[str, Any]]:
+        """version, kind, bytes and created_at of up to limit revisions, newest first, older than before"""
+
+    @abstractmethod
+    async def get_page_revision(self, page_id: str, version: int) -> Optional[List[Any]]:
+        """The components as of a revision, or None when the page has no such revision"""
+
+    # ---- Search ----
+
+    @abstractmethod
+    async def search_pages(self, school_id: str, query: str, limit: int) -> List[Dict[str, Any]]:
+        """Up to limit page and component hits for a websearch query, best first (schema_v11)"""
+
+    # ---- Assets ----
+
+    @abstractmethod
+    async def find_asset(self, digest: str) -> Optional[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    async def record_asset(self, asset: Dict[str, Any]) -> None:
+        """Insert an asset row, leaving an existing row for the same digest untouched"""
+
+    async def close(self) -> None:
+        pass
+
+
+class PostgrestRepository(Repository):
+    """Queries through the Supabase client (PostgREST over HTTP)"""
+
+    def __init__(self, client):
+        from postgrest.exceptions import APIError
+        self.client = client
+        self.api_error = APIError
+
+    async def _execute(self, query):
+        try:
+            return await query.execute()
+        except self.api_error as e:
+            raise DataStoreError(e.code, e.message or str(e)) from e
+
+    def _table(self, name: str):
+        return self.client.table(name)
+
+    async def create_school(self, doc):
+        result = await self._execute(self._table('schools').insert(doc))
+        return result.data[0] if result.data else None
+
+    async def update_school(self, school_id, data):
+        result = await self._execute(self._table('schools').update(data).eq('id', school_id))
+        return result.data[0] if result.data else None
+
+    async def delete_school(self, school_id):
+        # Two requests: PostgREST can't wrap them in one transaction (CASCADE covers the gap)
+        await self._execute(self._table('pages').delete().eq('school_id', school_id))
+        result = await self._execute(self._table('schools').delete().eq('id', school_id))
+        return bool(result.data)
+
+    async def has_schools(self):
+        result = await self._execute(self._table('schools').select('id').limit(1))
+        return bool(result.data)
+
+    async def get_school(self, school_id):
+        result = await self._execute(self._table('schools').select('*').eq('id', school_id))
+        return result.data[0] if result.data else None
+
+    async def get_school_by_slug(self, slug):
+        result = await self._execute(self._table('schools').select('*').eq('slug', slug).limit(1))
+        return result.data[0] if result.data else None
+
+    async def school_exists(self, school_id):
+        result = await self._execute(self._table('schools').select('id').eq('id', school_id))
+        return bool(result.data)
+
+    @staticmethod
+    def _page_of(query, limit, after):
+        """Keyset pagination over (created_at DESC, id DESC)"""
+        if after is not None:
+            created_at, row_id = after
+            query = query.or_(f'created_at.lt."{created_at}",and(created_at.eq."{created_at}",id.lt.{row_id})')
+        return query.order('created_at', desc=True).order('id', desc=True).limit(limit)
+
+    async def list_schools(self, limit, after=None):
+        query = self._table('school_summaries').select(SCHOOL_SUMMARY_COLUMNS)
+        result = await self._execute(self._page_of(query, limit, after))
+        return result.data or []
+
+    async def get_school_metadata(self, school_id):
+        result = await self._execute(self._table('schools').select('metadata').eq('id', school_id).limit(1))
+        if not result.data:
+            return None
+        return parse_json_column(result.data[0].get('metadata')) or {}
+
+    async def set_school_metadata_key(self, school_id, key, value):
+        result = await self._execute(self.client.rpc('set_school_metadata_key', {
+            'p_school_id': school_id,
+            'p_key': key,
+            'p_value': value,
+        }))
+        return bool(result.data)
+
+    async def create_page(self, doc):
+        result = await self._execute(self._table('pages').insert(doc))
+        return result.data[0] if result.data else None
+
+    async def get_page(self, page_id):
+        result = await self._execute(self._table('pages').select('*').eq('id', page_id))
+        return result.data[0] if result.data else None
+
+    async def page_exists(self, page_id):
+        result = await self._execute(self._table('pages').select('id').eq('id', page_id))
+        return bool(result.data)
+
+    async def get_published_snapshot(self, school_slug, page_slug):
+        result = await self._execute(
+            self._table('published_snapshots').select('hash, body, school_id, page_id, stale')
+            .eq('school_slug', school_slug).eq('page_slug', page_slug).limit(1)
+        )
+        return result.data[0] if result.data else None
+
+    async def publish_page_snapshot(self, page_id, version, digest, body):
+        result = await self._execute(self.client.rpc('publish_page_snapshot', {
+            'p_page_id': page_id,
+            'p_version': version,
+            'p_hash': digest,
+            'p_body': body,
+        }))
+        if not result.data:
+            return None
+        return result.data[0] if isinstance(result.data, list) else result.data
+
+    async def refresh_published_snapshot(self, page_id, old_hash, stale, digest, body):
+        result = await self._execute(self.client.rpc('refresh_published_snapshot', {
+            'p_page_id': page_id,
+            'p_old_hash': old_hash,
+            'p_stale': stale,
+            'p_hash': digest,
+            'p_body': body,
+        }))
+        return bool(result.data)
+
+    async def unpublish_page(self, page_id):
+        result = await self._execute(self.client.rpc('unpublish_page', {'p_page_id': page_id}))
+        return bool(result.data)
+
+    async def list_pages(self, school_id, limit, after=None, include_components=False):
+        columns = PAGE_SUMMARY_COLUMNS + (', components' if include_components else '')
+        query = self._table('pages').select(columns).eq('school_id', school_id)
+        result = await self._execute(self._page_of(query, limit, after))
+        return result.data or []
+
+    async def update_page(self, page_id, data, expected_version=None):
+        query = self._table('pages').update(data).eq('id', page_id)
+        if expected_version is not None:
+            query = query.eq('version', expected_version)
+        result = await self._execute(query)
+        return result.data[0] if result.data else None
+
+    async def patch_page_components(self, page_id, ops, expected_version):
+        result = await self._execute(self.client.rpc('patch_page_components', {
+            'p_page_id': page_id,
+            'p_ops': ops,
+            'p_expected_version': expected_version,
+        }))
+        if not result.data:
+            return None
+        return result.data[0] if isinstance(result.data, list) else result.data
+
+    async def apply_page_batch(self, ops):
+        result = await self._execute(self.client.rpc('apply_page_batch', {'p_ops': ops}))
+        return result.data or []
+
+    async def delete_page(self, page_id):
+        result = await self._execute(self._table('pages').delete().eq('id', page_id))
+        return bool(result.data)
+
+    async def list_page_revisions(self, page_id, limit, before=None):
+        query = self._table('page_revisions').select('version, kind, bytes, created_at').eq('page_id', page_id)
+        if before is not None:
+            query = query.lt('version', before)
+        result = await self._execute(query.order('version', desc=True).limit(limit))
+        return result.data or []
+
+    async def get_page_revision(self, page_id, version):
+        result = await self._execute(self.client.rpc('page_revision_chain', {
+            'p_page_id': page_id,
+            'p_version': version,
+        }))
+        chain = result.data or []
+        if not chain or chain[-1]['version'] != version:
+            return None
+        return materialize_revision(chain)
+
+    async def search_pages(self, school_id, query, limit):
+        result = await self._execute(self.client.rpc('search_school_pages', {
+            'p_school_id': school_id,
+            'p_query': query,
+            'p_limit': limit,
+        }))
+        return result.data or []
+
+    async def find_asset(self, digest):
+        result = await self._execute(self._table('assets').select('*').eq('sha256', digest).limit(1))
+        return result.data[0] if result.data else None
+
+    async def record_asset(self, asset):
+        await self._execute(self._table('assets').upsert(asset, on_conflict='sha256', ignore_duplicates=True))
+
+
+class PostgresRepository(Repository):
+    """Queries over an asyncpg connection pool.
+
+    Statement texts are fixed per query shape, so asyncpg's per-connection
+    statement cache prepares each one once and reuses it. Set
+    statement_cache_size=0 behind a transaction-mode pooler (PgBouncer,
+    Supabase's port 6543), which can't keep prepared statements.
+    """
+
+    def __init__(self, dsn: str, min_size: int = 2, max_size: int = 10, statement_cache_size: int = 100,
+                 command_timeout: float = 30.0, slow_ms: float = 500.0,
+                 on_span: Sequence[Callable[[Span], None]] = ()):
+        if asyncpg is None:
+            raise RuntimeError("DATA_BACKEND=postgres needs the asyncpg package")
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.statement_cache_size = statement_cache_size
+        self.command_timeout = command_timeout
+        self.slow_ms = slow_ms
+        self.on_span = list(on_span)
+        self.pool = None
+        self._connecting = asyncio.Lock()
+
+    @staticmethod
+    async def _init_connection(conn) -> None:
+        # Same shapes PostgREST hands back: ids as strings, JSON columns decoded
+        for json_type in ('json', 'jsonb'):
+            await conn.set_type_codec(json_type, encoder=json.dumps, decoder=json.loads, schema='pg_catalog')
+        await conn.set_type_codec('uuid', encoder=str, decoder=str, schema='pg_catalog', format='text')
+
+    async def connect(self) -> None:
+        async with self._connecting:
+            if self.pool is not None:
+                return
+            self.pool = await asyncpg.create_pool(
+                self.dsn,
+                min_size=self.min_size,
+                max_size=self.max_size,
+                statement_cache_size=self.statement_cache_size,
+                command_timeout=self.command_timeout,
+                init=self._init_connection,
+            )
+
+    async def close(self) -> None:
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    async def _run(self, conn, method: str, target: str, operation: str, sql: str, *args):
+        """Run one statement on conn, recording it as a span"""
+        started = time.perf_counter()
+        status, rows = None, None
+        try:
+            result = await getattr(conn, method)(sql, *args)
+            status = 200
+            if isinstance(result, list):
+                rows = len(result)
+            elif method == 'fetchrow':
+                rows = int(result is not None)
+            elif method == 'execute':
+                # Command tag, e.g. "DELETE 3"
+                rows = int(result.rsplit(' ', 1)[-1]) if result[-1:].isdigit() else None
+            return result
+        except asyncpg.PostgresError as e:
+            raise DataStoreError(e.sqlstate, str(e)) from e
+        finally:
+            report_span(Span(
+                service='postgres', target=target, operation=operation, status=status, rows=rows,
+                bytes_sent=0, bytes_received=0, duration_ms=(time.perf_counter() - started) * 1000,
+            ), self.on_span, self.slow_ms)
+
+    async def _query(self, method: str, target: str, operation: str, sql: str, *args):
+        if self.pool is None:
+            await self.connect()
+        async with self.pool.acquire() as conn:
+            return await self._run(conn, method, target, operation, sql, *args)
+
+    @staticmethod
+    def _params(doc: Dict[str, Any]) -> List[Any]:
+        """Column values as asyncpg expects them (ISO timestamps become datetimes)"""
+        return [
+            datetime.fromisoformat(value) if key in TIMESTAMP_COLUMNS and isinstance(value, str) else value
+            for key, value in doc.items()
+        ]
+
+    async def _insert(self, table: str, doc: Dict[str, Any], conflict: str = '') -> Optional[Dict[str, Any]]:
+        columns = ', '.join(f'"{key}"' for key in doc)
+        placeholders = ', '.join(f'${i}' for i in range(1, len(doc) + 1))
+        row = await self._query(
+            'fetchrow', table, 'insert',
+            f'INSERT INTO {table} ({columns}) VALUES ({placeholders}) {conflict} RETURNING *',
+            *self._params(doc),
+        )
+        return dict(row) if row is not None else None
+
+    async def _update(self, table: str, row_id: str, data: Dict[str, Any], version: Optional[int] = None):
+        assignments = ', '.join(f'"{key}" = ${i}' for i, key in enumerate(data, start=2))
+        sql = f'UPDATE {table} SET {assignments} WHERE id = $1'
+        args = [row_id, *self._params(data)]
+        if version is not None:
+            sql += f' AND version = ${len(args) + 1}'
+            args.append(version)
+        row = await self._query('fetchrow', table, 'update', sql + ' RETURNING *', *args)
+        return dict(row) if row is not None else None
+
+    async def create_school(self, doc):
+        return await self._insert('schools', doc)
+
+    async def update_school(self, school_id, data):
+        return await self._update('schools', school_id, data)
+
+    async def delete_school(self, school_id):
+        # One transaction, so a failure can't leave a school without its pages or the reverse
+        if self.pool is None:
+            await self.connect()
+        async with self.pool.acquire() as conn, conn.transaction():
+            await self._run(conn, 'execute', 'pages', 'delete', 'DELETE FROM pages WHERE school_id = $1', school_id)
+            row = await self._run(conn, 'fetchrow', 'schools', 'delete',
+                                  'DELETE FROM schools WHERE id = $1 RETURNING id', school_id)
+        return row is not None
+
+    async def has_schools(self):
+        return await self._query('fetchval', 'schools', 'select', 'SELECT EXISTS (SELECT 1 FROM schools)')
+
+    async def get_school(self, school_id):
+        row = await self._query('fetchrow', 'schools', 'select', 'SELECT * FROM schools WHERE id = $1', school_id)
+        return dict(row) if row is not None else None
+
+    async def get_school_by_slug(self, slug):
+        row = await self._query('fetchrow', 'schools', 'select', 'SELECT * FROM schools WHERE slug = $1', slug)
+        return dict(row) if row is not None else None
+
+    async def school_exists(self, school_id):
+        return await self._query('fetchval', 'schools', 'select',
+                                 'SELECT EXISTS (SELECT 1 FROM schools WHERE id = $1)', school_id)
+
+    async def _list(self, target: str, columns: str, where: List[str], args: List[Any],
+                    limit: int, after: Optional[Keyset]) -> List[Dict[str, Any]]:
+        """Keyset pagination over (created_at DESC, id DESC)"""
+        where, args = list(where), list(args)
+        # The first page and later pages are separate statements, so each keeps a plan that uses the index
+        if after is not None:
+            created_at, row_id = after
+            if isinstance(created_at, str):
+                created_at = datetime.fromisoformat(created_at)
+            where.append(f'(created_at, id) < (${len(args) + 1}, ${len(args) + 2})')
+            args += [created_at, row_id]
+        sql = f'SELECT {columns} FROM {target}'
+        if where:
+            sql += ' WHERE ' + ' AND '.join(where)
+        sql += f' ORDER BY created_at DESC, id DESC LIMIT ${len(args) + 1}'
+        rows = await self._query('fetch', target, 'select', sql, *args, limit)
+        return [dict(row) for row in rows]
+
+    async def list_schools(self, limit, after=None):
+        return await self._list('school_summaries', SCHOOL_SUMMARY_COLUMNS, [], [], limit, after)
+
+    async def get_school_metadata(self, school_id):
+        row = await self._query('fetchrow', 'schools', 'select',
+                                'SELECT metadata FROM schools WHERE id = $1', school_id)
+        if row is None:
+            return None
+        return parse_json_column(row['metadata']) or {}
+
+    async def set_school_metadata_key(self, school_id, key, value):
+        return await self._query('fetchval', 'set_school_metadata_key', 'rpc',
+                                 'SELECT set_school_metadata_key($1, $2, $3)', school_id, key, value)
+
+    async def create_page(self, doc):
+        return await self._insert('pages', doc)
+
+    async def get_page(self, page_id):
+        row = await self._query('fetchrow', 'pages', 'select', 'SELECT * FROM pages WHERE id = $1', page_id)
+        return dict(row) if row is not None else None
+
+    async def page_exists(self, page_id):
+        return await self._query('fetchval', 'pages', 'select',
+                                 'SELECT EXISTS (SELECT 1 FROM pages WHERE id = $1)', page_id)
+
+    async def get_published_snapshot(self, school_slug, page_slug):
+        row = await self._query(
+            'fetchrow', 'published_snapshots', 'select',
+            'SELECT hash, body, school_id, page_id, stale FROM published_snapshots '
+            'WHERE school_slug = $1 AND page_slug = $2 LIMIT 1',
+            school_slug, page_slug,
+        )
+        return dict(row) if row is not None else None
+
+    async def publish_page_snapshot(self, page_id, version, digest, body):
+        row = await self._query('fetchrow', 'publish_page_snapshot', 'rpc',
+                                'SELECT * FROM publish_page_snapshot($1, $2, $3, $4)', page_id, version, digest, body)
+        return dict(row) if row is not None else None
+
+    async def refresh_published_snapshot(self, page_id, old_hash, stale, digest, body):
+        return await self._query('fetchval', 'refresh_published_snapshot', 'rpc',
+                                 'SELECT refresh_published_snapshot($1, $2, $3, $4, $5)',
+                                 page_id, old_hash, stale, digest, body)
+
+    async def unpublish_page(self, page_id):
+        return await self._query('fetchval', 'unpublish_page', 'rpc', 'SELECT unpublish_page($1)', page_id)
+
+    async def list_pages(self, school_id, limit, after=None, include_components=False):
+        columns = PAGE_SUMMARY_COLUMNS + (', components' if include_components else '')
+        return await self._list('pages', columns, ['school_id = $1'], [school_id], limit, after)
+
+    async def update_page(self, page_id, data, expected_version=None):
+        return await self._update('pages', page_id, data, expected_version)
+
+    async def patch_page_components(self, page_id, ops, expected_version):
+        row = await self._query('fetchrow', 'patch_page_components', 'rpc',
+                                'SELECT * FROM patch_page_components($1, $2, $3)', page_id, ops, expected_version)
+        return dict(row) if row is not None else None
+
+    async def apply_page_batch(self, ops):
+        return await self._query('fetchval', 'apply_page_batch', 'rpc', 'SELECT apply_page_batch($1)', ops) or []
+
+    async def delete_page(self, page_id):
+        row = await self._query('fetchrow', 'pages', 'delete', 'DELETE FROM pages WHERE id = $1 RETURNING id', page_id)
+        return row is not None
+
+    async def list_page_revisions(self, page_id, limit, before=None):
+        sql = 'SELECT version, kind, bytes, created_at FROM page_revisions WHERE page_id = $1'
+        args = [page_id]
+        if before is not None:
+            sql += ' AND version < $2'
+            args.append(before)
+        sql += f' ORDER BY version DESC LIMIT ${len(args) + 1}'
+        rows = await self._query('fetch', 'page_revisions', 'select', sql, *args, limit)
+        return [dict(row) for row in rows]
+
+    async def get_page_revision(self, page_id, version):
+        chain = await self._query('fetch', 'page_revision_chain', 'rpc',
+                                  'SELECT * FROM page_revision_chain($1, $2)', page_id, version)
+        if not chain or chain[-1]['version'] != version:
+            return None
+        return materialize_revision(chain)
+
+    async def search_pages(self, school_id, query, limit):
+        rows = await self._query('fetch', 'search_school_pages', 'rpc',
+                                 'SELECT * FROM search_school_pages($1, $2, $3)', school_id, query, limit)
+        return [dict(row) for row in rows]
+
+    async def find_asset(self, digest):
+        row = await self._query('fetchrow', 'assets', 'select', 'SELECT * FROM assets WHERE sha256 = $1', digest)
+        return dict(row) if row is not None else None
+
+    async def record_asset(self, asset):
+        await self._insert('assets', asset, conflict='ON CONFLICT (sha256) DO NOTHING')
@@ -1,6 +1,7 @@
 #!/usr/bin/env python3
 """
-Simple script to run the FastAPI server locally
+Simple script to run the FastAPI server locally, reloading on code changes.
+Production uses gunicorn with uvicorn workers instead (see gunicorn.conf.py).
 """
 import uvicorn
 
@@ -10,5 +11,7 @@ if __name__ == "__main__":
         host="0.0.0.0",
         port=8000,
         reload=True,
-        log_level="info"
+        log_level="info",
+        # server.py writes its own access log
+        access_log=False
     )
@@ -0,0 +1,97 @@
+-- Supabase/PostgreSQL Schema v10 Migration for Clever Box CMS
+-- Records every change to a page's components as a revision: a delta against the
+-- previous revision (the component ids in order plus the components that changed),
+-- with a full keyframe every few revisions so any version materializes from one
+-- keyframe and a handful of deltas
+-- Run this in your Supabase SQL Editor after schema_v9.sql
+
+-- Step 1: Revisions, keyed by the page version that introduced them
+--   keyframe: data is the components array
+--   delta:    data is {"order": [component ids], "changed": {id: component}} against the
+--             previous revision; components not in "changed" are carried over unchanged
+CREATE TABLE IF NOT EXISTS page_revisions (
+    page_id UUID NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+    version INTEGER NOT NULL,
+    kind TEXT NOT NULL CHECK (kind IN ('keyframe', 'delta')),
+    data JSONB NOT NULL,
+    bytes INTEGER GENERATED ALWAYS AS (octet_length(data::text)) STORED,
+    created_at TIMESTAMPTZ DEFAULT NOW(),
+    PRIMARY KEY (page_id, version)
+);
+
+-- Step 2: Record a revision whenever the components change, whoever writes them
+-- (the API, the RPCs or the frontend's direct table updates)
+CREATE OR REPLACE FUNCTION record_page_revision()
+RETURNS TRIGGER AS $$
+DECLARE
+    -- At most this many deltas follow a keyframe
+    keyframe_interval CONSTANT INTEGER := 20;
+    new_doc JSONB := page_components_array(NEW.components);
+    old_doc JSONB;
+    since_keyframe INTEGER;
+    ids JSONB;
+    changed JSONB;
+    delta JSONB;
+BEGIN
+    IF TG_OP = 'UPDATE' THEN
+        old_doc := page_components_array(OLD.components);
+        IF old_doc = new_doc THEN
+            RETURN NULL;
+        END IF;
+        SELECT COUNT(*) INTO since_keyframe FROM page_revisions r
+        WHERE r.page_id = NEW.id
+          AND r.version >= COALESCE(
+              (SELECT MAX(k.version) FROM page_revisions k WHERE k.page_id = NEW.id AND k.kind = 'keyframe'), 0);
+    END IF;
+
+    -- Deltas address components by id, so every component needs a distinct one
+    SELECT jsonb_agg(c->'id' ORDER BY ord) INTO ids FROM jsonb_array_elements(new_doc) WITH ORDINALITY AS e(c, ord);
+    IF TG_OP = 'UPDATE' AND since_keyframe BETWEEN 1 AND keyframe_interval
+       AND NOT EXISTS (
+           SELECT 1 FROM jsonb_array_elements(new_doc || old_doc) c
+           WHERE jsonb_typeof(c) <> 'object' OR jsonb_typeof(c->'id') <> 'string')
+       AND (SELECT COUNT(DISTINCT c->>'id') = COUNT(*) FROM jsonb_array_elements(new_doc) c)
+       AND (SELECT COUNT(DISTINCT c->>'id') = COUNT(*) FROM jsonb_array_elements(old_doc) c)
+    THEN
+        SELECT COALESCE(jsonb_object_agg(n->>'id', n), '{}'::jsonb) INTO changed
+        FROM jsonb_array_elements(new_doc) n
+        WHERE NOT EXISTS (SELECT 1 FROM jsonb_array_elements(old_doc) o WHERE o = n);
+        delta := jsonb_build_object('order', COALESCE(ids, '[]'::jsonb), 'changed', changed);
+        -- A delta that saves nothing over the full array isn't worth a replay step
+        IF octet_length(delta::text) < octet_length(new_doc::text) THEN
+            INSERT INTO page_revisions (page_id, version, kind, data) VALUES (NEW.id, NEW.version, 'delta', delta)
+            ON CONFLICT (page_id, version) DO UPDATE SET kind = EXCLUDED.kind, data = EXCLUDED.data;
+            RETURN NULL;
+        END IF;
+    END IF;
+
+    INSERT INTO page_revisions (page_id, version, kind, data) VALUES (NEW.id, NEW.version, 'keyframe', new_doc)
+    ON CONFLICT (page_id, version) DO UPDATE SET kind = EXCLUDED.kind, data = EXCLUDED.data;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS record_page_revision_on_insert ON pages;
+CREATE TRIGGER record_page_revision_on_insert AFTER INSERT ON pages
+    FOR EACH ROW EXECUTE FUNCTION record_page_revision();
+
+DROP TRIGGER IF EXISTS record_page_revision_on_update ON pages;
+CREATE TRIGGER record_page_revision_on_update AFTER UPDATE OF components ON pages
+    FOR EACH ROW WHEN (OLD.components IS DISTINCT FROM NEW.components)
+    EXECUTE FUNCTION record_page_revision();
+
+-- Step 3: The rows needed to materialize a version: the nearest keyframe at or
+-- before it and the deltas after that keyframe, oldest first
+CREATE OR REPLACE FUNCTION page_revision_chain(p_page_id UUID, p_version INTEGER)
+RETURNS TABLE (version INTEGER, kind TEXT, data JSONB) AS $$
+    SELECT r.version, r.kind, r.data
+    FROM page_revisions r
+    WHERE r.page_id = p_page_id
+      AND r.version <= p_version
+      AND r.version >= (
+          SELECT MAX(k.version) FROM page_revisions k
+          WHERE k.page_id = p_page_id AND k.version <= p_version AND k.kind = 'keyframe')
+    ORDER BY r.version;
+$$ language 'sql' STABLE;
+
+-- Migration complete!
@@ -0,0 +1,122 @@
+-- Supabase/PostgreSQL Schema v11 Migration for Clever Box CMS
+-- Full-text search over pages: whenever a page's name or components change, the
+-- readable text of each component's props (titles, content, items, events, staff
+-- names...) is extracted into one row per component with an indexed tsvector, so
+-- GET /api/schools/{id}/search never has to load or scan the components
+-- Run this in your Supabase SQL Editor after schema_v10.sql
+
+-- Step 1: Readable text of a component's props
+-- Skips values that aren't prose: URLs and paths, and keys naming images, links,
+-- icons, colors or layout settings
+CREATE OR REPLACE FUNCTION component_search_text(doc JSONB, doc_key TEXT DEFAULT NULL)
+RETURNS TEXT AS $$
+BEGIN
+    CASE jsonb_typeof(doc)
+        WHEN 'string' THEN
+            IF doc_key ~* '(^id|src|url|link|href|image|icon|color|variant|align|size|width|height|style)s?$'
+               OR (doc #>> '{}') ~* '^(https?:|mailto:|tel:|/|#)' THEN
+                RETURN NULL;
+            END IF;
+            RETURN doc #>> '{}';
+        WHEN 'object' THEN
+            RETURN (SELECT string_agg(component_search_text(e.value, e.key), ' ') FROM jsonb_each(doc) e);
+        WHEN 'array' THEN
+            RETURN (SELECT string_agg(component_search_text(e.value, doc_key), ' ') FROM jsonb_array_elements(doc) e);
+        ELSE
+            RETURN NULL;
+    END CASE;
+END;
+$$ language 'plpgsql' IMMUTABLE;
+
+-- Step 2: One searchable row per component, plus one for the page name (component_id NULL)
+CREATE TABLE IF NOT EXISTS page_search_entries (
+    page_id UUID NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+    school_id UUID NOT NULL,
+    component_id TEXT,
+    component_type TEXT NOT NULL,
+    position INTEGER NOT NULL,
+    content TEXT NOT NULL,
+    search_vector TSVECTOR GENERATED ALWAYS AS (to_tsvector('english', content)) STORED
+);
+
+CREATE INDEX IF NOT EXISTS idx_page_search_entries_page ON page_search_entries(page_id);
+CREATE INDEX IF NOT EXISTS idx_page_search_entries_vector ON page_search_entries USING GIN (search_vector);
+CREATE INDEX IF NOT EXISTS idx_page_search_entries_school ON page_search_entries(school_id);
+
+-- Step 3: Rebuild a page's rows from its current name and components
+CREATE OR REPLACE FUNCTION refresh_page_search(p_page_id UUID)
+RETURNS VOID AS $$
+BEGIN
+    DELETE FROM page_search_entries WHERE page_id = p_page_id;
+
+    INSERT INTO page_search_entries (page_id, school_id, component_id, component_type, position, content)
+    SELECT p.id, p.school_id, NULL, 'page', -1, p.name
+    FROM pages p WHERE p.id = p_page_id AND p.name <> '';
+
+    INSERT INTO page_search_entries (page_id, school_id, component_id, component_type, position, content)
+    SELECT p.id, p.school_id, c.value->>'id', COALESCE(c.value->>'type', 'unknown'), (c.ordinality - 1)::INTEGER, t.content
+    FROM pages p
+    CROSS JOIN LATERAL jsonb_array_elements(page_components_array(p.components)) WITH ORDINALITY AS c(value, ordinality)
+    CROSS JOIN LATERAL (SELECT component_search_text(c.value->'props') AS content) t
+    WHERE p.id = p_page_id AND jsonb_typeof(c.value) = 'object' AND COALESCE(t.content, '') <> '';
+END;
+$$ language 'plpgsql';
+
+CREATE OR REPLACE FUNCTION refresh_page_search_trigger()
+RETURNS TRIGGER AS $$
+BEGIN
+    PERFORM refresh_page_search(NEW.id);
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS refresh_page_search_on_insert ON pages;
+CREATE TRIGGER refresh_page_search_on_insert AFTER INSERT ON pages
+    FOR EACH ROW EXECUTE FUNCTION refresh_page_search_trigger();
+
+DROP TRIGGER IF EXISTS refresh_page_search_on_update ON pages;
+CREATE TRIGGER refresh_page_search_on_update AFTER UPDATE OF components, name, school_id ON pages
+    FOR EACH ROW WHEN (OLD.components IS DISTINCT FROM NEW.components OR OLD.name IS DISTINCT FROM NEW.name
+                       OR OLD.school_id IS DISTINCT FROM NEW.school_id)
+    EXECUTE FUNCTION refresh_page_search_trigger();
+
+-- Step 4: Index the pages that already exist
+SELECT refresh_page_search(id) FROM pages;
+
+-- Step 5: The best p_limit hits in a school, with snippets
+-- websearch syntax: words, "quoted phrases", OR, -excluded. Matches in snippets are
+-- wrapped in U+E000 / U+E001 so the API can escape the text before marking them up.
+CREATE OR REPLACE FUNCTION search_school_pages(p_school_id UUID, p_query TEXT, p_limit INTEGER DEFAULT 50)
+RETURNS TABLE (
+    page_id UUID,
+    page_name TEXT,
+    page_slug TEXT,
+    is_published BOOLEAN,
+    component_id TEXT,
+    component_type TEXT,
+    "position" INTEGER,
+    rank REAL,
+    snippet TEXT
+) AS $$
+    WITH query AS (
+        SELECT websearch_to_tsquery('english', p_query) AS q
+    ),
+    hits AS (
+        SELECT e.*, ts_rank_cd(e.search_vector, query.q) AS rank
+        FROM page_search_entries e, query
+        WHERE e.school_id = p_school_id AND e.search_vector @@ query.q
+        ORDER BY rank DESC, e.page_id, e.position
+        LIMIT p_limit
+    )
+    -- ts_headline is the expensive part, so it only runs on the hits returned
+    SELECT h.page_id, p.name, p.slug, p.is_published, h.component_id, h.component_type, h.position, h.rank,
+           ts_headline('english', h.content, query.q, format(
+               'StartSel=%s, StopSel=%s, MaxWords=24, MinWords=8, MaxFragments=2, FragmentDelimiter=" … "',
+               chr(57344), chr(57345)))
+    FROM hits h
+    JOIN pages p ON p.id = h.page_id
+    CROSS JOIN query
+    ORDER BY h.rank DESC, h.page_id, h.position;
+$$ language 'sql' STABLE;
+
+-- Migration complete!
@@ -0,0 +1,122 @@
+-- Supabase/PostgreSQL Schema v3 Migration for Clever Box CMS
+-- Adds a page version counter and an RPC that applies JSON-Patch style
+-- operations to a page's components in a single atomic statement
+-- Run this in your Supabase SQL Editor after schema_v2.sql
+
+-- Step 1: Version counter bumped on every page update
+ALTER TABLE pages
+  ADD COLUMN IF NOT EXISTS version INTEGER NOT NULL DEFAULT 1;
+
+CREATE OR REPLACE FUNCTION bump_page_version()
+RETURNS TRIGGER AS $$
+BEGIN
+    NEW.version = OLD.version + 1;
+    RETURN NEW;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS bump_pages_version ON pages;
+CREATE TRIGGER bump_pages_version BEFORE UPDATE ON pages
+    FOR EACH ROW EXECUTE FUNCTION bump_page_version();
+
+-- Step 2: Apply patch operations to pages.components
+-- p_ops is an array of {"op": "add|remove|replace|move", "path": [...], "from": [...], "value": ...}
+-- where paths are already split into segments relative to the components array.
+-- Returns no row when the page does not exist.
+CREATE OR REPLACE FUNCTION patch_page_components(p_page_id UUID, p_ops JSONB)
+RETURNS TABLE (id UUID, version INTEGER, updated_at TIMESTAMPTZ) AS $$
+DECLARE
+    doc JSONB;
+    op JSONB;
+    path TEXT[];
+    from_path TEXT[];
+    depth INTEGER;
+    parent JSONB;
+    insert_at INTEGER;
+    value JSONB;
+BEGIN
+    SELECT p.components INTO doc FROM pages p WHERE p.id = p_page_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+
+    -- Rows written by older clients hold the components as a JSON-encoded string
+    IF jsonb_typeof(doc) = 'string' THEN
+        doc := (doc #>> '{}')::jsonb;
+    END IF;
+    doc := COALESCE(doc, '[]'::jsonb);
+
+    FOR op IN SELECT * FROM jsonb_array_elements(p_ops) LOOP
+        path := ARRAY(SELECT jsonb_array_elements_text(op->'path'));
+        depth := array_length(path, 1);
+        value := op->'value';
+
+        IF op->>'op' = 'move' THEN
+            from_path := ARRAY(SELECT jsonb_array_elements_text(op->'from'));
+            value := doc #> from_path;
+            IF value IS NULL THEN
+                RAISE EXCEPTION 'Path /% does not exist', array_to_string(from_path, '/') USING ERRCODE = '22023';
+            END IF;
+            doc := doc #- from_path;
+        END IF;
+
+        IF op->>'op' IN ('add', 'move') THEN
+            parent := doc #> path[1:depth - 1];
+            IF parent IS NULL THEN
+                RAISE EXCEPTION 'Parent of /% does not exist', array_to_string(path, '/') USING ERRCODE = '22023';
+            END IF;
+            IF path[depth] = '-' THEN
+                IF jsonb_typeof(parent) <> 'array' THEN
+                    RAISE EXCEPTION 'Parent of /% is not an array', array_to_string(path, '/') USING ERRCODE = '22023';
+                END IF;
+                IF depth = 1 THEN
+                    doc := doc || jsonb_build_array(value);
+                ELSE
+                    doc := jsonb_set(doc, path[1:depth - 1], parent || jsonb_build_array(value));
+                END IF;
+            ELSIF jsonb_typeof(parent) = 'array' THEN
+                -- jsonb_insert would append past the end and count negative indexes from it
+                insert_at := CASE WHEN path[depth] ~ '^\d{1,9}$' THEN path[depth]::INTEGER END;
+                IF insert_at IS NULL OR insert_at > jsonb_array_length(parent) THEN
+                    RAISE EXCEPTION 'Path index % out of range', path[depth] USING ERRCODE = '22023';
+                END IF;
+                doc := jsonb_insert(doc, path, value);
+            ELSE
+                doc := jsonb_set(doc, path, value, true);
+            END IF;
+        ELSIF op->>'op' IN ('remove', 'replace') THEN
+            IF doc #> path IS NULL THEN
+                RAISE EXCEPTION 'Path /% does not exist', array_to_string(path, '/') USING ERRCODE = '22023';
+            END IF;
+            IF op->>'op' = 'remove' THEN
+                doc := doc #- path;
+            ELSE
+                doc := jsonb_set(doc, path, value, false);
+            END IF;
+        ELSE
+            RAISE EXCEPTION 'Unsupported patch operation %', op->>'op' USING ERRCODE = '22023';
+        END IF;
+    END LOOP;
+
+    IF jsonb_typeof(doc) <> 'array' THEN
+        RAISE EXCEPTION 'Components must remain an array' USING ERRCODE = '22023';
+    END IF;
+
+    -- Keep each component's "order" in step with its array position, as the editor does
+    SELECT COALESCE(
+        jsonb_agg(
+            CASE WHEN jsonb_typeof(elem) = 'object' THEN jsonb_set(elem, '{order}', to_jsonb(idx - 1)) ELSE elem END
+            ORDER BY idx
+        ),
+        '[]'::jsonb
+    )
+    INTO doc
+    FROM jsonb_array_elements(doc) WITH ORDINALITY AS t(elem, idx);
+
+    RETURN QUERY
+    UPDATE pages p SET components = doc WHERE p.id = p_page_id
+    RETURNING p.id, p.version, p.updated_at;
+END;
+$$ language 'plpgsql';
+
+-- Migration complete!
@@ -0,0 +1,84 @@
+-- Supabase/PostgreSQL Schema v5 Migration for Clever Box CMS
+-- Adds an RPC that applies a batch of page create/update/delete operations
+-- in one transaction, reporting a result per operation
+-- Run this in your Supabase SQL Editor after schema_v4.sql
+
+-- p_ops is an array of
+--   {"op": "create", "data": {"id", "school_id", "name", "slug", "components", "is_published"}}
+--   {"op": "update", "id": ..., "version": <optional If-Match>, "data": {"name", "slug", "components", "is_published"}}
+--   {"op": "delete", "id": ...}
+-- Each operation runs in its own savepoint, so one failure (e.g. a duplicate slug)
+-- is reported in its result without rolling back the others.
+CREATE OR REPLACE FUNCTION apply_page_batch(p_ops JSONB)
+RETURNS JSONB AS $$
+DECLARE
+    op JSONB;
+    idx INTEGER := -1;
+    results JSONB := '[]'::jsonb;
+    row_id UUID;
+    row_version INTEGER;
+    status INTEGER;
+BEGIN
+    FOR op IN SELECT * FROM jsonb_array_elements(p_ops) LOOP
+        idx := idx + 1;
+        row_id := NULL;
+        row_version := NULL;
+        BEGIN
+            IF op->>'op' = 'create' THEN
+                INSERT INTO pages (id, school_id, name, slug, components, is_published)
+                VALUES (
+                    (op->'data'->>'id')::uuid,
+                    (op->'data'->>'school_id')::uuid,
+                    op->'data'->>'name',
+                    op->'data'->>'slug',
+                    COALESCE(op->'data'->'components', '[]'::jsonb),
+                    COALESCE((op->'data'->>'is_published')::boolean, FALSE)
+                )
+                RETURNING pages.id, pages.version INTO row_id, row_version;
+                status := 201;
+            ELSIF op->>'op' = 'update' THEN
+                UPDATE pages p SET
+                    name = COALESCE(op->'data'->>'name', p.name),
+                    slug = COALESCE(op->'data'->>'slug', p.slug),
+                    components = COALESCE(op->'data'->'components', p.components),
+                    is_published = COALESCE((op->'data'->>'is_published')::boolean, p.is_published)
+                WHERE p.id = (op->>'id')::uuid
+                  AND (op->>'version' IS NULL OR p.version = (op->>'version')::integer)
+                RETURNING p.id, p.version INTO row_id, row_version;
+                IF FOUND THEN
+                    status := 200;
+                ELSIF EXISTS (SELECT 1 FROM pages WHERE pages.id = (op->>'id')::uuid) THEN
+                    status := 412;
+                ELSE
+                    status := 404;
+                END IF;
+            ELSIF op->>'op' = 'delete' THEN
+                DELETE FROM pages WHERE pages.id = (op->>'id')::uuid RETURNING pages.id INTO row_id;
+                status := CASE WHEN FOUND THEN 200 ELSE 404 END;
+            ELSE
+                RAISE EXCEPTION 'Unsupported batch operation %', op->>'op' USING ERRCODE = '22023';
+            END IF;
+
+            results := results || jsonb_build_object(
+                'index', idx, 'op', op->>'op', 'status', status,
+                'id', COALESCE(row_id::text, op->>'id'), 'version', row_version
+            );
+        EXCEPTION WHEN OTHERS THEN
+            results := results || jsonb_build_object(
+                'index', idx, 'op', op->>'op', 'id', COALESCE(op->>'id', op->'data'->>'id'),
+                'status', CASE SQLSTATE
+                    WHEN '23505' THEN 409  -- unique_violation (slug already used)
+                    WHEN '23503' THEN 422  -- foreign_key_violation (unknown school)
+                    WHEN '22P02' THEN 422  -- invalid_text_representation (bad id)
+                    ELSE 400
+                END,
+                'error', SQLERRM
+            );
+        END;
+    END LOOP;
+
+    RETURN results;
+END;
+$$ language 'plpgsql';
+
+-- Migration complete!
@@ -0,0 +1,17 @@
+-- Supabase/PostgreSQL Schema v6 Migration for Clever Box CMS
+-- Adds an RPC that replaces a single top-level key of schools.metadata in place,
+-- so editor component/theme saves no longer read and rewrite the whole blob
+-- Run this in your Supabase SQL Editor after schema_v5.sql
+
+-- Returns FALSE when the school does not exist
+CREATE OR REPLACE FUNCTION set_school_metadata_key(p_school_id UUID, p_key TEXT, p_value JSONB)
+RETURNS BOOLEAN AS $$
+BEGIN
+    UPDATE schools
+    SET metadata = jsonb_set(COALESCE(metadata, '{}'::jsonb), ARRAY[p_key], p_value, true)
+    WHERE id = p_school_id;
+    RETURN FOUND;
+END;
+$$ language 'plpgsql';
+
+-- Migration complete!
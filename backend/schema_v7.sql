@@ -0,0 +1,15 @@
+-- Supabase/PostgreSQL Schema v7 Migration for Clever Box CMS
+-- Adds an index of uploaded assets keyed by the SHA-256 of their content,
+-- so re-uploading an identical image reuses the stored object
+-- Run this in your Supabase SQL Editor after schema_v6.sql
+
+CREATE TABLE IF NOT EXISTS assets (
+    sha256 TEXT PRIMARY KEY CHECK (sha256 ~ '^[0-9a-f]{64}$'),
+    path TEXT NOT NULL,
+    url TEXT NOT NULL,
+    content_type TEXT NOT NULL,
+    size BIGINT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+-- Migration complete!
@@ -0,0 +1,52 @@
+-- Supabase/PostgreSQL Schema v8 Migration for Clever Box CMS
+-- Adds what the paginated listing endpoints (GET /api/schools, GET /api/schools/{id}/pages)
+-- read instead of whole rows: per-page component count and size kept in generated
+-- columns, a school summary view with page counts, and indexes matching the
+-- (created_at DESC, id DESC) keyset order
+-- Run this in your Supabase SQL Editor after schema_v7.sql
+
+-- Step 1: Components as an array, whatever shape the row stores them in
+-- Rows written by older clients hold the components as a JSON-encoded string;
+-- anything that isn't (or doesn't decode to) an array counts as empty
+CREATE OR REPLACE FUNCTION page_components_array(doc JSONB)
+RETURNS JSONB AS $$
+BEGIN
+    IF jsonb_typeof(doc) = 'string' THEN
+        doc := (doc #>> '{}')::jsonb;
+    END IF;
+    IF jsonb_typeof(doc) = 'array' THEN
+        RETURN doc;
+    END IF;
+    RETURN '[]'::jsonb;
+EXCEPTION WHEN invalid_text_representation THEN
+    RETURN '[]'::jsonb;
+END;
+$$ language 'plpgsql' IMMUTABLE;
+
+-- Step 2: Summary columns, computed on write so listings never read the components
+ALTER TABLE pages
+  ADD COLUMN IF NOT EXISTS component_count INTEGER
+    GENERATED ALWAYS AS (jsonb_array_length(page_components_array(components))) STORED,
+  ADD COLUMN IF NOT EXISTS components_bytes INTEGER
+    GENERATED ALWAYS AS (octet_length(page_components_array(components)::text)) STORED;
+
+-- Step 3: Keyset pagination indexes (newest first, id breaks ties)
+CREATE INDEX IF NOT EXISTS idx_pages_school_created ON pages(school_id, created_at DESC, id DESC);
+CREATE INDEX IF NOT EXISTS idx_schools_created ON schools(created_at DESC, id DESC);
+
+-- Step 4: Schools with their page count, for the dashboard listing
+-- (security_invoker: the caller's row level security applies, not the view owner's)
+CREATE OR REPLACE VIEW school_summaries WITH (security_invoker = true) AS
+SELECT
+    s.id,
+    s.name,
+    s.slug,
+    s.logo_url,
+    s.primary_color,
+    s.secondary_color,
+    s.theme,
+    s.created_at,
+    (SELECT COUNT(*) FROM pages p WHERE p.school_id = s.id)::INTEGER AS page_count
+FROM schools s;
+
+-- Migration complete!
@@ -0,0 +1,141 @@
+-- Supabase/PostgreSQL Schema v9 Migration for Clever Box CMS
+-- Publishing writes an immutable, pre-serialized snapshot of the page bundle keyed
+-- by the SHA-256 of its body, and points the page's public URL at it; public reads
+-- only touch the snapshot, never the pages row editors are rewriting
+-- Run this in your Supabase SQL Editor after schema_v8.sql
+
+-- Step 1: Snapshots, content-addressed and never updated
+CREATE TABLE IF NOT EXISTS page_snapshots (
+    hash TEXT PRIMARY KEY CHECK (hash ~ '^[0-9a-f]{64}$'),
+    page_id UUID NOT NULL REFERENCES pages(id) ON DELETE CASCADE,
+    body TEXT NOT NULL,
+    created_at TIMESTAMPTZ DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_page_snapshots_page ON page_snapshots(page_id, created_at DESC);
+
+CREATE OR REPLACE FUNCTION reject_page_snapshot_update()
+RETURNS TRIGGER AS $$
+BEGIN
+    RAISE EXCEPTION 'Page snapshots are immutable' USING ERRCODE = 'PT409';
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS page_snapshots_immutable ON page_snapshots;
+CREATE TRIGGER page_snapshots_immutable BEFORE UPDATE ON page_snapshots
+    FOR EACH ROW EXECUTE FUNCTION reject_page_snapshot_update();
+
+-- Step 2: The snapshot each published page serves, under the slug it was published with
+-- stale counts the school branding changes since the snapshot was built (0 = current)
+CREATE TABLE IF NOT EXISTS published_pages (
+    page_id UUID PRIMARY KEY REFERENCES pages(id) ON DELETE CASCADE,
+    school_id UUID NOT NULL REFERENCES schools(id) ON DELETE CASCADE,
+    slug TEXT NOT NULL,
+    snapshot_hash TEXT NOT NULL REFERENCES page_snapshots(hash),
+    published_at TIMESTAMPTZ DEFAULT NOW(),
+    stale INTEGER NOT NULL DEFAULT 0,
+    UNIQUE(school_id, slug)
+);
+
+-- Step 3: Public lookup by school and page slug in one query
+CREATE OR REPLACE VIEW published_snapshots WITH (security_invoker = true) AS
+SELECT
+    s.slug AS school_slug,
+    pp.slug AS page_slug,
+    pp.school_id,
+    pp.page_id,
+    ps.hash,
+    ps.body,
+    pp.published_at,
+    pp.stale
+FROM published_pages pp
+JOIN schools s ON s.id = pp.school_id
+JOIN page_snapshots ps ON ps.hash = pp.snapshot_hash;
+
+-- Step 4: Publish a snapshot built from the page at p_version
+-- Raises PT412 when the page has moved on since the snapshot was built, and
+-- returns no row when the page does not exist
+CREATE OR REPLACE FUNCTION publish_page_snapshot(p_page_id UUID, p_version INTEGER, p_hash TEXT, p_body TEXT)
+RETURNS TABLE (hash TEXT, version INTEGER, published_at TIMESTAMPTZ) AS $$
+#variable_conflict use_column
+DECLARE
+    page_row pages%ROWTYPE;
+BEGIN
+    SELECT * INTO page_row FROM pages p WHERE p.id = p_page_id FOR UPDATE;
+    IF NOT FOUND THEN
+        RETURN;
+    END IF;
+    IF page_row.version <> p_version THEN
+        RAISE EXCEPTION 'Page version is %, expected %', page_row.version, p_version USING ERRCODE = 'PT412';
+    END IF;
+
+    INSERT INTO page_snapshots (hash, page_id, body) VALUES (p_hash, p_page_id, p_body)
+    ON CONFLICT (hash) DO NOTHING;
+
+    -- A page published under a slug another (renamed) page still holds takes it over
+    DELETE FROM published_pages pp
+    WHERE pp.school_id = page_row.school_id AND pp.slug = page_row.slug AND pp.page_id <> p_page_id;
+
+    INSERT INTO published_pages (page_id, school_id, slug, snapshot_hash, published_at)
+    VALUES (p_page_id, page_row.school_id, page_row.slug, p_hash, NOW())
+    ON CONFLICT (page_id) DO UPDATE
+    SET slug = EXCLUDED.slug, snapshot_hash = EXCLUDED.snapshot_hash, published_at = EXCLUDED.published_at, stale = 0;
+
+    -- The flag the editor shows; written only when it changes, so the version stays put otherwise
+    UPDATE pages p SET is_published = TRUE WHERE p.id = p_page_id AND p.is_published IS DISTINCT FROM TRUE;
+
+    RETURN QUERY SELECT p_hash, p.version, NOW() FROM pages p WHERE p.id = p_page_id;
+END;
+$$ language 'plpgsql';
+
+-- Step 5: Take a page offline; its snapshots stay for the history
+-- Returns FALSE when the page does not exist
+CREATE OR REPLACE FUNCTION unpublish_page(p_page_id UUID)
+RETURNS BOOLEAN AS $$
+BEGIN
+    DELETE FROM published_pages WHERE page_id = p_page_id;
+    UPDATE pages SET is_published = FALSE WHERE id = p_page_id AND is_published IS DISTINCT FROM FALSE;
+    RETURN EXISTS (SELECT 1 FROM pages WHERE id = p_page_id);
+END;
+$$ language 'plpgsql';
+
+-- Step 6: Snapshots include the school's branding and resolved theme, so changing
+-- those marks the school's published pages stale; the API rebuilds a stale
+-- snapshot from its published content on the next public read
+CREATE OR REPLACE FUNCTION mark_published_pages_stale()
+RETURNS TRIGGER AS $$
+BEGIN
+    UPDATE published_pages SET stale = stale + 1 WHERE school_id = NEW.id;
+    RETURN NULL;
+END;
+$$ language 'plpgsql';
+
+DROP TRIGGER IF EXISTS mark_published_pages_stale ON schools;
+CREATE TRIGGER mark_published_pages_stale AFTER UPDATE ON schools
+    FOR EACH ROW WHEN (
+        OLD.name IS DISTINCT FROM NEW.name OR OLD.slug IS DISTINCT FROM NEW.slug
+        OR OLD.logo_url IS DISTINCT FROM NEW.logo_url OR OLD.theme IS DISTINCT FROM NEW.theme
+        OR OLD.primary_color IS DISTINCT FROM NEW.primary_color
+        OR OLD.secondary_color IS DISTINCT FROM NEW.secondary_color
+        OR OLD.metadata IS DISTINCT FROM NEW.metadata
+    )
+    EXECUTE FUNCTION mark_published_pages_stale();
+
+-- Step 7: Point a stale page at its rebuilt snapshot
+-- Returns FALSE, changing nothing, when the page was republished or its school
+-- changed again since p_old_hash / p_stale were read
+CREATE OR REPLACE FUNCTION refresh_published_snapshot(
+    p_page_id UUID, p_old_hash TEXT, p_stale INTEGER, p_hash TEXT, p_body TEXT
+)
+RETURNS BOOLEAN AS $$
+BEGIN
+    INSERT INTO page_snapshots (hash, page_id, body) VALUES (p_hash, p_page_id, p_body)
+    ON CONFLICT (hash) DO NOTHING;
+
+    UPDATE published_pages SET snapshot_hash = p_hash, stale = 0
+    WHERE page_id = p_page_id AND snapshot_hash = p_old_hash AND stale = p_stale;
+    RETURN FOUND;
+END;
+$$ language 'plpgsql';
+
+-- Migration complete!
@@ -1,85 +1,312 @@
-from fastapi import FastAPI, APIRouter, HTTPException, UploadFile, File
+from fastapi import FastAPI, APIRouter, HTTPException, Header, Query, BackgroundTasks
+from fastapi.responses import HTMLResponse, JSONResponse, Response, FileResponse, StreamingResponse
 from dotenv import load_dotenv
 from starlette.middleware.cors import CORSMiddleware
-from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
-from supabase import create_client, Client
+import httpx
 import os
 import logging
-import traceback
 from pathlib import Path
-from pydantic import BaseModel, Field, ConfigDict
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, ConfigDict, ValidationError
+from typing import List, Optional, Dict, Any, Literal
 import uuid
 from datetime import datetime, timezone
 import json
+import re
+import hashlib
+import base64
+from html import escape
+import mimetypes
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from cache import LRUCache, PrecomputedJSON
+from compression import CompressionMiddleware, PrecompressedBody, negotiate_encoding
+from renderer import render_page, collect_image_urls
+from media import spool_multipart_upload, generate_derivatives, SpooledUpload, UploadTooLarge, UnsupportedImageType, MalformedUpload
+from storage import StorageBackend, SupabaseStorage, LocalStorage
+from repository import Repository, PostgrestRepository, PostgresRepository, DataStoreError, parse_json_column
+from logs import configure_logging, AccessLogMiddleware, DroppingQueueHandler
+from metrics import Registry, Counter, Gauge, Histogram, CallbackMetric, MetricsMiddleware
+from tracing import InstrumentedTransport, TracingMiddleware, Span
 
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+ROOT_DIR = Path(__file__).parent
+load_dotenv(ROOT_DIR / '.env')
+
+# Configure logging: records are queued and written by a background thread
+configure_logging(
+    level=os.environ.get('LOG_LEVEL', 'INFO'),
+    fmt=os.environ.get('LOG_FORMAT', 'json'),
+    queue_size=int(os.environ.get('LOG_QUEUE_SIZE', '10000')),
 )
 logger = logging.getLogger(__name__)
 
 def log_info(msg):
     logger.info(msg)
-    print(f"[BACKEND] {msg}")
 
 def log_error(msg, exc=None):
     logger.error(msg, exc_info=exc)
-    print(f"[BACKEND ERROR] {msg}")
-    if exc:
-        print(f"[BACKEND ERROR] Traceback: {traceback.format_exc()}")
-
-log_info("=" * 60)
-log_info("Initializing FastAPI backend server...")
-log_info("=" * 60)
 
-ROOT_DIR = Path(__file__).parent
-log_info(f"Root directory: {ROOT_DIR}")
-
-log_info("Loading environment variables...")
-load_dotenv(ROOT_DIR / '.env')
-log_info(f"Environment file exists: {(ROOT_DIR / '.env').exists()}")
+# ============ CONFIGURATION ============
 
-# Supabase connection with error handling
-log_info("Checking Supabase environment variables...")
+# Only configuration is read at import time. Clients are built by the lifespan
+# handler and open their connections on first use, so importing this module
+# (and a cold start) does no network I/O.
 supabase_url = os.environ.get('SUPABASE_URL')
 supabase_key = os.environ.get('SUPABASE_KEY')
 
-log_info(f"SUPABASE_URL present: {bool(supabase_url)}")
-log_info(f"SUPABASE_KEY present: {bool(supabase_key)}")
-
-if supabase_url:
-    log_info(f"SUPABASE_URL: {supabase_url[:30]}..." if len(supabase_url) > 30 else f"SUPABASE_URL: {supabase_url}")
-else:
-    log_error("SUPABASE_URL is missing!")
-
-if supabase_key:
-    log_info(f"SUPABASE_KEY: {supabase_key[:20]}..." if len(supabase_key) > 20 else f"SUPABASE_KEY: {supabase_key[:10]}...")
-else:
-    log_error("SUPABASE_KEY is missing!")
+# Routes read and write through the repository: PostgREST over HTTP by default,
+# or a direct asyncpg pool when DATABASE_URL points at the same database
+DATA_BACKEND = os.environ.get('DATA_BACKEND', 'postgrest')
+if DATA_BACKEND not in ('postgrest', 'postgres'):
+    raise ValueError(f"Unknown DATA_BACKEND {DATA_BACKEND!r}; expected 'postgrest' or 'postgres'")
+
+# Uploaded objects live in Supabase Storage by default; STORAGE_BACKEND=local keeps
+# them under LOCAL_STORAGE_DIR and serves them from /uploads on this API.
+STORAGE_BACKEND = os.environ.get('STORAGE_BACKEND', 'supabase')
+if STORAGE_BACKEND not in ('supabase', 'local'):
+    raise ValueError(f"Unknown STORAGE_BACKEND {STORAGE_BACKEND!r}; expected 'supabase' or 'local'")
+
+# Shared keep-alive connection pool for PostgREST and Storage. Every route awaits
+# the async client, so a slow round trip no longer blocks the event loop.
+http_limits = httpx.Limits(
+    max_connections=int(os.environ.get('SUPABASE_MAX_CONNECTIONS', '100')),
+    max_keepalive_connections=int(os.environ.get('SUPABASE_MAX_KEEPALIVE', '20')),
+    keepalive_expiry=float(os.environ.get('SUPABASE_KEEPALIVE_EXPIRY', '30')),
+)
+http_timeout = httpx.Timeout(float(os.environ.get('SUPABASE_TIMEOUT', '30')), connect=10.0)
+# Times every round trip and records it on the current request's trace. The
+# underlying transport is created on startup unless one was installed first
+# (load_test.py installs its in-memory stand-in this way).
+datastore_transport = InstrumentedTransport(None, slow_ms=float(os.environ.get('DATASTORE_SLOW_MS', '500')))
+
+# Set by create_clients() on startup
+http_client: Optional[httpx.AsyncClient] = None
+supabase = None
+repository: Optional[Repository] = None
+storage: Optional[StorageBackend] = None
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    create_clients()
+    warm_up = asyncio.create_task(warm_up_datastore())
+    log_info(f"CleverBox API started: data backend {DATA_BACKEND}, storage {STORAGE_BACKEND}, "
+             f"{len(app.routes)} routes")
+    try:
+        yield
+    finally:
+        warm_up.cancel()
+        await close_clients()
 
-if not supabase_url or not supabase_key:
-    error_msg = (
-        "Missing required environment variables: SUPABASE_URL and SUPABASE_KEY must be set. "
-        "Please set them in Railway Dashboard → Settings → Environment Variables"
-    )
-    log_error(error_msg)
-    raise ValueError(error_msg)
-
-log_info("Creating Supabase client...")
-try:
-    supabase: Client = create_client(supabase_url, supabase_key)
-    log_info("✓ Supabase client created successfully")
-except Exception as e:
-    log_error(f"Failed to create Supabase client: {e}", e)
-    raise
-
-log_info("Creating FastAPI app...")
-app = FastAPI(title="CleverBox API", version="1.0.0")
+app = FastAPI(title="CleverBox API", version="1.0.0", lifespan=lifespan)
 api_router = APIRouter(prefix="/api")
-log_info("✓ FastAPI app and router created")
+site_router = APIRouter(prefix="/sites")
+media_router = APIRouter(prefix="/uploads")
+
+# ============ METRICS ============
+
+metrics = Registry()
+http_requests = metrics.register(Counter(
+    'http_requests_total', 'HTTP requests by method, route template and status', ('method', 'route', 'status')
+))
+http_latency = metrics.register(Histogram(
+    'http_request_duration_seconds', 'HTTP request latency by method and route template', ('method', 'route')
+))
+http_in_flight = metrics.register(Gauge('http_requests_in_flight', 'HTTP requests being handled', ('method',)))
+uploads_total = metrics.register(Counter(
+    'uploads_total', 'Image uploads by result (stored, deduplicated, rejected)', ('result',)
+))
+upload_bytes = metrics.register(Counter(
+    'upload_bytes_total', 'Bytes of accepted image uploads by result (stored, deduplicated)', ('result',)
+))
+datastore_calls = metrics.register(Counter(
+    'datastore_calls_total', 'Supabase round trips by service, target (table, RPC or bucket), operation and status',
+    ('service', 'target', 'operation', 'status')
+))
+datastore_latency = metrics.register(Histogram(
+    'datastore_call_duration_seconds', 'Supabase round-trip latency by service, target and operation',
+    ('service', 'target', 'operation')
+))
+metrics.register(CallbackMetric(
+    'log_records_dropped_total', 'Log records dropped because the log queue was full', (),
+    lambda: {(): DroppingQueueHandler.dropped}, type='counter'
+))
+
+def record_datastore_span(span: Span):
+    datastore_calls.inc(span.service, span.target, span.operation, str(span.status or 'error'))
+    datastore_latency.observe(span.duration_ms / 1000, span.service, span.target, span.operation)
+
+datastore_transport.on_span.append(record_datastore_span)
+
+# ============ DATA ACCESS ============
+
+def create_clients():
+    """Build the HTTP client, repository and storage backend; connections open on first use"""
+    global http_client, supabase, repository, storage
+    if datastore_transport.transport is None:
+        datastore_transport.transport = httpx.AsyncHTTPTransport(limits=http_limits)
+    http_client = httpx.AsyncClient(transport=datastore_transport, timeout=http_timeout)
+
+    if DATA_BACKEND == 'postgrest' or STORAGE_BACKEND == 'supabase':
+        if not supabase_url or not supabase_key:
+            raise ValueError(
+                "Missing required environment variables: SUPABASE_URL and SUPABASE_KEY must be set. "
+                "Please set them in Railway Dashboard → Settings → Environment Variables"
+            )
+        # Imported here: the client library is the slowest import, and not every configuration needs it
+        from supabase import AsyncClient, AsyncClientOptions
+        supabase = AsyncClient(supabase_url, supabase_key, options=AsyncClientOptions(httpx_client=http_client))
+
+    if DATA_BACKEND == 'postgres':
+        database_url = os.environ.get('DATABASE_URL')
+        if not database_url:
+            raise ValueError("DATA_BACKEND=postgres requires DATABASE_URL")
+        repository = PostgresRepository(
+            database_url,
+            min_size=int(os.environ.get('DATABASE_POOL_MIN', '2')),
+            max_size=int(os.environ.get('DATABASE_POOL_MAX', '10')),
+            statement_cache_size=int(os.environ.get('DATABASE_STATEMENT_CACHE_SIZE', '100')),
+            command_timeout=float(os.environ.get('DATABASE_TIMEOUT', '30')),
+            slow_ms=datastore_transport.slow_ms,
+            on_span=[record_datastore_span],
+        )
+    else:
+        repository = PostgrestRepository(supabase)
+
+    if STORAGE_BACKEND == 'local':
+        storage = LocalStorage(
+            os.environ.get('LOCAL_STORAGE_DIR', str(ROOT_DIR)),
+            os.environ.get('PUBLIC_BASE_URL', 'http://localhost:8000'),
+        )
+    else:
+        storage = SupabaseStorage(supabase, http_client, supabase_url)
+
+async def close_clients():
+    await http_client.aclose()
+    await repository.close()
+    if image_pool is not None:
+        image_pool.shutdown(wait=False)
+
+# Readiness: set once the data store has answered a query. Requests are served
+# before that (connections open on demand); this only tells the platform when
+# the instance is warm.
+datastore_ready = asyncio.Event()
+datastore_error: Optional[str] = None
+
+async def warm_up_datastore():
+    """Open the first data-store connection in the background, retrying with backoff until it answers"""
+    global datastore_error
+    delay = 0.5
+    while True:
+        started = time.perf_counter()
+        try:
+            await repository.has_schools()
+        except Exception as e:
+            datastore_error = str(e) or type(e).__name__
+            logger.warning(f"Data store not reachable yet, retrying in {delay:.1f}s: {datastore_error}")
+            await asyncio.sleep(delay)
+            delay = min(delay * 2, 30.0)
+            continue
+        datastore_error = None
+        datastore_ready.set()
+        log_info(f"Data store ready in {(time.perf_counter() - started) * 1000:.0f}ms")
+        return
+
+# ============ HTTP CACHING HELPERS ============
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Check an If-None-Match header (list, weak or wildcard) against an ETag"""
+    header = request.headers.get('if-none-match')
+    if not header:
+        return False
+    candidates = [tag.strip() for tag in header.split(',')]
+    return '*' in candidates or any(tag.removeprefix('W/') == etag for tag in candidates)
+
+def cached_body_response(body: PrecompressedBody, etag: str, request: Request, cache_control: str,
+                         media_type: str = 'application/json'):
+    """Serve a precompressed body under its ETag, answering conditional requests with 304"""
+    headers = {'ETag': etag, 'Cache-Control': cache_control, 'Vary': 'Accept-Encoding'}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+    encoding = negotiate_encoding(request.headers.get('accept-encoding'))
+    if encoding:
+        headers['Content-Encoding'] = encoding
+    return Response(body.encoded(encoding), media_type=media_type, headers=headers)
+
+async def precompressed(body: bytes) -> PrecompressedBody:
+    """A body with its encoded variants built in a worker thread, before any request waits on them"""
+    return await asyncio.to_thread(PrecompressedBody(body).precompress)
+
+def catalog_response(catalog: PrecomputedJSON, request: Request, cache_control: str = 'public, max-age=300'):
+    """Serve a precomputed JSON body, answering conditional requests with 304"""
+    return cached_body_response(catalog, catalog.etag, request, cache_control)
+
+def parse_byte_range(header: str, size: int) -> Optional[tuple]:
+    """Parse a single "bytes=start-end" Range into inclusive offsets.
+
+    Returns None for unsatisfiable ranges and (0, size - 1) for anything we
+    don't split (multiple ranges, other units), which serves the whole file.
+    """
+    unit, _, spec = header.partition('=')
+    if unit.strip().lower() != 'bytes' or ',' in spec:
+        return (0, size - 1)
+    first, _, last = spec.strip().partition('-')
+    try:
+        if not first:
+            length = int(last)
+            if length <= 0:
+                return None
+            return (max(0, size - length), size - 1)
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+    except ValueError:
+        return (0, size - 1)
+    if start >= size or end < start:
+        return None
+    return (start, end)
+
+def iter_file_range(path: Path, start: int, end: int, chunk_size: int = 64 * 1024):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = f.read(min(chunk_size, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+def serve_file(request: Request, path: Path, cache_control: str):
+    """Serve a file with ETag/304 and single-range support.
+
+    Whole files go out as a FileResponse, which servers offering the ASGI
+    pathsend extension send with sendfile(); ranges are streamed in chunks.
+    """
+    stat_result = path.stat()
+    size = stat_result.st_size
+    etag = f'"{stat_result.st_mtime_ns:x}-{size:x}"'
+    media_type = mimetypes.guess_type(path.name)[0] or 'application/octet-stream'
+    headers = {'ETag': etag, 'Cache-Control': cache_control, 'Accept-Ranges': 'bytes'}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    range_header = request.headers.get('range')
+    if_range = request.headers.get('if-range')
+    if range_header and size and (if_range is None or if_range == etag):
+        byte_range = parse_byte_range(range_header, size)
+        if byte_range is None:
+            headers['Content-Range'] = f'bytes */{size}'
+            return Response(status_code=416, headers=headers)
+        start, end = byte_range
+        if (start, end) != (0, size - 1):
+            headers['Content-Range'] = f'bytes {start}-{end}/{size}'
+            headers['Content-Length'] = str(end - start + 1)
+            return StreamingResponse(
+                iter_file_range(path, start, end), status_code=206, media_type=media_type, headers=headers
+            )
+    return FileResponse(path, media_type=media_type, headers=headers, stat_result=stat_result)
 
 # ============ MODELS (for seed endpoint) ============
 
@@ -98,9 +325,18 @@ class PageData(BaseModel):
     components: List[ComponentData] = []
     is_published: bool = False
     theme: str = "default"
+    version: int = 1
     created_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
     updated_at: datetime = Field(default_factory=lambda: datetime.now(timezone.utc))
 
+class StoredPage(PageData):
+    # Components come back exactly as saved: no generated ids or defaults on read
+    components: List[Any] = []
+
+class PageUpdateResult(StoredPage):
+    # Set when the update was saved but publishing it failed
+    publish_error: Optional[str] = None
+
 class School(BaseModel):
     model_config = ConfigDict(extra="ignore")
     id: str = Field(default_factory=lambda: str(uuid.uuid4()))
@@ -131,6 +367,23 @@ class PageUpdate(BaseModel):
     components: Optional[List[Dict[str, Any]]] = None
     is_published: Optional[bool] = None
 
+class PageBatchOperation(BaseModel):
+    op: Literal["create", "update", "delete"]
+    id: Optional[str] = None
+    version: Optional[int] = None
+    data: Dict[str, Any] = {}
+
+class PageBatchRequest(BaseModel):
+    operations: List[PageBatchOperation]
+
+class PatchOperation(BaseModel):
+    """RFC 6902 operation on a page's components, e.g. /components/0/props/title"""
+    model_config = ConfigDict(populate_by_name=True)
+    op: Literal["add", "remove", "replace", "move"]
+    path: str
+    from_: Optional[str] = Field(default=None, alias="from")
+    value: Any = None
+
 class LoginRequest(BaseModel):
     email: str
     password: str
@@ -165,6 +418,86 @@ async def get_current_user():
         "role": "admin"
     }
 
+# ============ LISTINGS ============
+
+# Listings page by keyset: rows come newest first (created_at DESC, id DESC) and
+# the cursor names the last row returned, so a page costs the same however deep
+# it is and rows inserted meanwhile neither repeat nor go missing
+LIST_DEFAULT_LIMIT = int(os.environ.get('LIST_DEFAULT_LIMIT', '50'))
+LIST_MAX_LIMIT = int(os.environ.get('LIST_MAX_LIMIT', '200'))
+
+def encode_cursor(row: Dict[str, Any]) -> str:
+    created_at = row['created_at']
+    if isinstance(created_at, datetime):
+        created_at = created_at.isoformat()
+    raw = json.dumps([created_at, str(row['id'])], separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip('=')
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    if not cursor:
+        return None
+    try:
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        datetime.fromisoformat(created_at)
+        uuid.UUID(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    return created_at, row_id
+
+def parse_include(include: Optional[str]) -> set:
+    fields = {field.strip() for field in (include or '').split(',') if field.strip()}
+    unknown = fields - {'components'}
+    if unknown:
+        raise HTTPException(status_code=422, detail=f"Unknown include: {', '.join(sorted(unknown))}")
+    return fields
+
+def listing(rows: List[Dict[str, Any]], limit: int) -> Dict[str, Any]:
+    """Rows were fetched with limit + 1; the extra one only tells whether there is a next page"""
+    items = rows[:limit]
+    next_cursor = encode_cursor(items[-1]) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+@api_router.get("/schools")
+async def list_schools(limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+                       cursor: Optional[str] = None):
+    """Schools with their page count, newest first, one page at a time"""
+    after = decode_cursor(cursor)
+    try:
+        rows = await repository.list_schools(limit + 1, after)
+    except Exception as e:
+        log_error(f"Error listing schools: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to list schools: {str(e)}")
+    return listing(rows, limit)
+
+@api_router.get("/schools/{school_id}/pages")
+async def list_school_pages(school_id: str,
+                            limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+                            cursor: Optional[str] = None, include: Optional[str] = None):
+    """Page summaries of a school, newest first; include=components adds the components"""
+    after = decode_cursor(cursor)
+    include_components = 'components' in parse_include(include)
+    try:
+        rows = await repository.list_pages(school_id, limit + 1, after, include_components)
+        # An empty first page needs one more query to tell a missing school apart
+        if not rows and after is None and not await repository.school_exists(school_id):
+            raise HTTPException(status_code=404, detail="School not found")
+    except HTTPException:
+        raise
+    except DataStoreError as e:
+        if e.code == '22P02':
+            raise HTTPException(status_code=404, detail="School not found")
+        log_error(f"Error listing pages: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to list pages: {str(e)}")
+    except Exception as e:
+        log_error(f"Error listing pages: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to list pages: {str(e)}")
+
+    if include_components:
+        for row in rows:
+            if isinstance(row.get('components'), str):
+                row['components'] = json.loads(row['components'])
+    return listing(rows, limit)
+
 # ============ SCHOOL ROUTES ============
 
 @api_router.post("/schools", response_model=School)
@@ -176,12 +509,9 @@ async def create_school(school: SchoolCreate):
         doc['created_at'] = doc['created_at'].isoformat()
         doc['metadata'] = {}  # Initialize metadata
 
-        result = supabase.table('schools').insert(doc).execute()
-
-        if not result.data:
+        created_school = await repository.create_school(doc)
+        if not created_school:
             raise HTTPException(status_code=500, detail="Failed to create school")
-
-        created_school = result.data[0] if isinstance(result.data, list) else result.data
         return created_school
     except Exception as e:
         log_error(f"Error creating school: {e}", e)
@@ -191,16 +521,11 @@ async def create_school(school: SchoolCreate):
 async def delete_school(school_id: str):
     """Delete a school and all its pages"""
     try:
-        # Check if school exists
-        result = supabase.table('schools').select('id').eq('id', school_id).execute()
-        if not result.data:
+        # Deletes the school's pages too (explicitly, though CASCADE would cover it)
+        if not await repository.delete_school(school_id):
             raise HTTPException(status_code=404, detail="School not found")
-
-        # Delete all pages for this school (CASCADE should handle this, but explicit is better)
-        supabase.table('pages').delete().eq('school_id', school_id).execute()
-
-        # Delete the school
-        supabase.table('schools').delete().eq('id', school_id).execute()
+        school_metadata_cache.pop(school_id)
+        invalidate_published_pages(school_id=school_id)
 
         return {"message": "School deleted"}
     except HTTPException:
@@ -222,18 +547,16 @@ async def create_page(page: PageCreate):
             slug=page.slug,
             components=components
         )
-        doc = page_obj.model_dump()
+        doc = page_obj.model_dump(exclude={'version'})
         doc['created_at'] = doc['created_at'].isoformat()
         doc['updated_at'] = doc['updated_at'].isoformat()
         # Convert components to JSON for PostgreSQL
         doc['components'] = json.dumps([c.model_dump() for c in page_obj.components])
 
-        result = supabase.table('pages').insert(doc).execute()
-
-        if not result.data:
+        created_page = await repository.create_page(doc)
+        if not created_page:
             raise HTTPException(status_code=500, detail="Failed to create page")
 
-        created_page = result.data[0] if isinstance(result.data, list) else result.data
         # Parse components back from JSONB
         if isinstance(created_page.get('components'), str):
             created_page['components'] = json.loads(created_page['components'])
@@ -243,15 +566,121 @@ async def create_page(page: PageCreate):
         log_error(f"Error creating page: {e}", e)
         raise HTTPException(status_code=500, detail=f"Failed to create page: {str(e)}")
 
-@api_router.put("/pages/{page_id}", response_model=PageData)
-async def update_page(page_id: str, page_update: PageUpdate):
-    """Update a page"""
+def page_etag(version: int) -> str:
+    return f'"{version}"'
+
+def parse_if_match(if_match: Optional[str]) -> Optional[int]:
+    """Return the page version named by an If-Match header, or None when any version is acceptable"""
+    if if_match is None or if_match.strip() == '*':
+        return None
     try:
-        # Check if page exists
-        existing = supabase.table('pages').select('*').eq('id', page_id).execute()
-        if not existing.data:
+        return int(if_match.split(',')[0].strip().removeprefix('W/').strip('"'))
+    except ValueError:
+        raise HTTPException(status_code=412, detail="If-Match does not name a page version")
+
+async def raise_page_precondition_failed(page_id: str):
+    """Tell a missing page (404) apart from a stale If-Match (412) after a conditional write matched nothing"""
+    if not await repository.page_exists(page_id):
+        raise HTTPException(status_code=404, detail="Page not found")
+    raise HTTPException(status_code=412, detail="Page was modified by someone else; reload and retry")
+
+@api_router.get("/pages/{page_id}", response_model=StoredPage)
+async def get_page(page_id: str, response: Response):
+    """Get a page with its version as ETag"""
+    try:
+        page = await repository.get_page(page_id)
+        if page is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+
+        if isinstance(page.get('components'), str):
+            page['components'] = json.loads(page['components'])
+        response.headers['ETag'] = page_etag(page.get('version', 1))
+        return page
+    except HTTPException:
+        raise
+    except DataStoreError as e:
+        if e.code == '22P02':
             raise HTTPException(status_code=404, detail="Page not found")
+        log_error(f"Error fetching page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to fetch page: {str(e)}")
+    except Exception as e:
+        log_error(f"Error fetching page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to fetch page: {str(e)}")
+
+PAGE_BATCH_LIMIT = int(os.environ.get('PAGE_BATCH_LIMIT', '100'))
+
+def build_batch_operation(operation: PageBatchOperation) -> Dict[str, Any]:
+    """Validate one batch operation and shape it for the apply_page_batch RPC"""
+    if operation.op == 'create':
+        page = PageCreate(**operation.data)
+        components = [ComponentData(**c).model_dump() for c in page.components]
+        page_obj = PageData(school_id=page.school_id, name=page.name, slug=page.slug)
+        return {'op': 'create', 'data': {
+            'id': page_obj.id,
+            'school_id': page.school_id,
+            'name': page.name,
+            'slug': page.slug,
+            'components': components,
+            'is_published': bool(operation.data.get('is_published', False)),
+        }}
+
+    if not operation.id:
+        raise ValueError(f"'{operation.op}' operations require an id")
+    if operation.op == 'update':
+        update = PageUpdate(**operation.data)
+        return {'op': 'update', 'id': operation.id, 'version': operation.version,
+                'data': update.model_dump(exclude_none=True)}
+    return {'op': 'delete', 'id': operation.id}
+
+@api_router.post("/pages/batch")
+async def batch_pages(batch: PageBatchRequest):
+    """Create, update and delete many pages in one transaction with per-item results"""
+    if len(batch.operations) > PAGE_BATCH_LIMIT:
+        raise HTTPException(status_code=413, detail=f"A batch may contain at most {PAGE_BATCH_LIMIT} operations")
+
+    # Validate everything up front so a bad item never leaves a half-applied batch
+    ops, errors = [], []
+    for index, operation in enumerate(batch.operations):
+        try:
+            ops.append(build_batch_operation(operation))
+        except (TypeError, ValueError) as e:
+            errors.append({"index": index, "op": operation.op, "error": str(e)})
+    if errors:
+        raise HTTPException(status_code=422, detail=errors)
 
+    try:
+        results = await repository.apply_page_batch(ops)
+    except Exception as e:
+        log_error(f"Error applying page batch: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to apply page batch: {str(e)}")
+
+    # Publishing state changes go through snapshots, as on PUT /pages/{id}
+    for item in results:
+        if item.get('status') not in (200, 201):
+            continue
+        if item.get('op') == 'delete':
+            invalidate_published_pages(page_id=item['id'])
+            continue
+        is_published = ops[item['index']].get('data', {}).get('is_published')
+        try:
+            if is_published:
+                page = await repository.get_page(item['id'])
+                item['snapshot'] = (await publish_page(page))['hash']
+            elif is_published is False and item.get('op') == 'update':
+                await unpublish_page(item['id'])
+        except HTTPException as e:
+            item['publish_error'] = e.detail
+        except Exception as e:
+            log_error(f"Error publishing page {item['id']}: {e}", e)
+            item['publish_error'] = str(e)
+    return {"results": results}
+
+@api_router.put("/pages/{page_id}", response_model=PageUpdateResult)
+async def update_page(page_id: str, page_update: PageUpdate, response: Response,
+                      if_match: Optional[str] = Header(default=None)):
+    """Update a page, optionally only if it is still at the version named by If-Match"""
+    expected_version = parse_if_match(if_match)
+    try:
         update_data = {}
         if page_update.name is not None:
             update_data['name'] = page_update.name
@@ -266,362 +695,747 @@ async def update_page(page_id: str, page_update: PageUpdate):
         # updated_at is handled by database trigger, but we can set it explicitly
         update_data['updated_at'] = datetime.now(timezone.utc).isoformat()
 
-        result = supabase.table('pages').update(update_data).eq('id', page_id).select().execute()
-
-        if not result.data:
-            raise HTTPException(status_code=500, detail="Failed to update page")
+        # Single conditional statement; the version trigger bumps the counter
+        updated_page = await repository.update_page(page_id, update_data, expected_version)
+        if updated_page is None:
+            await raise_page_precondition_failed(page_id)
 
-        updated_page = result.data[0] if isinstance(result.data, list) else result.data
         # Parse components back from JSONB
         if isinstance(updated_page.get('components'), str):
             updated_page['components'] = json.loads(updated_page['components'])
-
+        # Publishing snapshots the page as just written; other edits leave the public page alone.
+        # The update is saved by now, so a failed publish is reported rather than failing the request.
+        if page_update.is_published:
+            try:
+                await publish_page(updated_page)
+            except HTTPException as e:
+                updated_page['publish_error'] = e.detail
+            except Exception as e:
+                log_error(f"Error publishing page {page_id}: {e}", e)
+                updated_page['publish_error'] = str(e)
+        elif page_update.is_published is False:
+            await unpublish_page(page_id)
+
+        response.headers['ETag'] = page_etag(updated_page.get('version', 1))
         return updated_page
     except HTTPException:
         raise
+    except DataStoreError as e:
+        if e.code == '22P02':
+            raise HTTPException(status_code=404, detail="Page not found")
+        log_error(f"Error updating page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to update page: {str(e)}")
     except Exception as e:
         log_error(f"Error updating page: {e}", e)
         raise HTTPException(status_code=500, detail=f"Failed to update page: {str(e)}")
 
+def parse_component_pointer(pointer: Optional[str]) -> List[str]:
+    """Split a JSON pointer under /components into segments relative to the components array"""
+    if not pointer or not pointer.startswith('/components/'):
+        raise HTTPException(status_code=422, detail=f"Patch paths must point inside /components: {pointer}")
+    return [seg.replace('~1', '/').replace('~0', '~') for seg in pointer.split('/')[2:]]
+
+@api_router.patch("/pages/{page_id}")
+async def patch_page(page_id: str, operations: List[PatchOperation], response: Response,
+                     if_match: Optional[str] = Header(default=None)):
+    """Apply JSON-Patch operations to a page's components"""
+    expected_version = parse_if_match(if_match)
+    ops = []
+    for operation in operations:
+        path = parse_component_pointer(operation.path)
+        value = operation.value
+        if operation.op in ('add', 'replace') and len(path) == 1:
+            # Whole components are validated and get the same defaults as on create
+            try:
+                value = ComponentData(**value).model_dump()
+            except (TypeError, ValidationError) as e:
+                raise HTTPException(status_code=422, detail=f"Invalid component: {e}")
+        op = {'op': operation.op, 'path': path, 'value': value}
+        if operation.op == 'move':
+            op['from'] = parse_component_pointer(operation.from_)
+        ops.append(op)
+
+    try:
+        patched = await repository.patch_page_components(page_id, ops, expected_version)
+    except DataStoreError as e:
+        if e.code == 'PT412':
+            raise HTTPException(status_code=412, detail="Page was modified by someone else; reload and retry")
+        if e.code == '22023':
+            raise HTTPException(status_code=422, detail=e.message)
+        if e.code == '22P02':
+            raise HTTPException(status_code=404, detail="Page not found")
+        log_error(f"Error patching page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to patch page: {str(e)}")
+    except Exception as e:
+        log_error(f"Error patching page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to patch page: {str(e)}")
+
+    if patched is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+
+    response.headers['ETag'] = page_etag(patched['version'])
+    return {"id": patched['id'], "version": patched['version'], "updated_at": patched['updated_at']}
+
 @api_router.delete("/pages/{page_id}")
 async def delete_page(page_id: str):
     """Delete a page"""
     try:
-        # Check if page exists
-        result = supabase.table('pages').select('id').eq('id', page_id).execute()
-        if not result.data:
+        if not await repository.delete_page(page_id):
             raise HTTPException(status_code=404, detail="Page not found")
-
-        # Delete the page
-        supabase.table('pages').delete().eq('id', page_id).execute()
+        invalidate_published_pages(page_id=page_id)
 
         return {"message": "Page deleted"}
     except HTTPException:
         raise
+    except DataStoreError as e:
+        if e.code == '22P02':
+            raise HTTPException(status_code=404, detail="Page not found")
+        log_error(f"Error deleting page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to delete page: {str(e)}")
     except Exception as e:
         log_error(f"Error deleting page: {e}", e)
         raise HTTPException(status_code=500, detail=f"Failed to delete page: {str(e)}")
 
+# ============ PAGE REVISIONS ============
+
+# Every change to a page's components is recorded by a database trigger
+# (schema_v10) as a delta against the previous revision, with a full keyframe at
+# least every 20 revisions, so any revision materializes from one short chain.
+
+@api_router.get("/pages/{page_id}/revisions")
+async def list_page_revisions(page_id: str, limit: int = Query(LIST_DEFAULT_LIMIT, ge=1, le=LIST_MAX_LIMIT),
+                              cursor: Optional[str] = None):
+    """Revisions of a page, newest first: version, kind (keyframe or delta), stored bytes and time"""
+    try:
+        before = int(cursor) if cursor else None
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+    try:
+        rows = await repository.list_page_revisions(page_id, limit + 1, before)
+        if not rows and before is None and not await repository.page_exists(page_id):
+            raise HTTPException(status_code=404, detail="Page not found")
+    except HTTPException:
+        raise
+    except DataStoreError as e:
+        if e.code == '22P02':
+            raise HTTPException(status_code=404, detail="Page not found")
+        log_error(f"Error listing revisions: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to list revisions: {str(e)}")
+    except Exception as e:
+        log_error(f"Error listing revisions: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to list revisions: {str(e)}")
+
+    items = rows[:limit]
+    next_cursor = str(items[-1]['version']) if len(rows) > limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+async def load_page_revision(page_id: str, version: int) -> List[Any]:
+    try:
+        components = await repository.get_page_revision(page_id, version)
+    except DataStoreError as e:
+        if e.code != '22P02':
+            raise
+        components = None
+    if components is None:
+        raise HTTPException(status_code=404, detail="Revision not found")
+    return components
+
+@api_router.get("/pages/{page_id}/revisions/{version}")
+async def get_page_revision(page_id: str, version: int):
+    """A page's components as of a revision"""
+    try:
+        components = await load_page_revision(page_id, version)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(f"Error loading revision: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to load revision: {str(e)}")
+    return {"page_id": page_id, "version": version, "components": components}
+
+@api_router.post("/pages/{page_id}/revisions/{version}/restore", response_model=StoredPage)
+async def restore_page_revision(page_id: str, version: int, response: Response,
+                                if_match: Optional[str] = Header(default=None)):
+    """Make a revision's components the page's current ones (recorded as a new revision)"""
+    expected_version = parse_if_match(if_match)
+    try:
+        components = await load_page_revision(page_id, version)
+        update_data = {
+            # Serialized as on PUT /pages/{id}
+            'components': json.dumps(components),
+            'updated_at': datetime.now(timezone.utc).isoformat(),
+        }
+        restored = await repository.update_page(page_id, update_data, expected_version)
+        if restored is None:
+            await raise_page_precondition_failed(page_id)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(f"Error restoring revision: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to restore revision: {str(e)}")
+
+    if isinstance(restored.get('components'), str):
+        restored['components'] = json.loads(restored['components'])
+    response.headers['ETag'] = page_etag(restored.get('version', 1))
+    return restored
+
+# ============ SEARCH ============
+
+# Searchable text is extracted from each component's props on every write by a
+# database trigger (schema_v11) into a GIN-indexed tsvector, one row per
+# component plus one for the page name, so a search never reads the components.
+SEARCH_DEFAULT_LIMIT = int(os.environ.get('SEARCH_DEFAULT_LIMIT', '50'))
+SEARCH_MAX_LIMIT = int(os.environ.get('SEARCH_MAX_LIMIT', '200'))
+
+# search_school_pages marks matches with these private-use characters, so the
+# snippet text can be escaped before the marks become <mark> tags
+SNIPPET_START, SNIPPET_STOP = '\ue000', '\ue001'
+
+def snippet_html(snippet: Optional[str]) -> str:
+    return escape(snippet or '').replace(SNIPPET_START, '<mark>').replace(SNIPPET_STOP, '</mark>')
+
+def group_search_hits(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Hits (best first) grouped by page; a page ranks by its best hit"""
+    pages: Dict[str, Dict[str, Any]] = {}
+    for row in rows:
+        page = pages.get(row['page_id'])
+        if page is None:
+            page = pages[row['page_id']] = {
+                "page_id": row['page_id'],
+                "name": row['page_name'],
+                "slug": row['page_slug'],
+                "is_published": row['is_published'],
+                "rank": row['rank'],
+                "hits": [],
+            }
+        page['hits'].append({
+            "component_id": row['component_id'],
+            "component_type": row['component_type'],
+            "position": row['position'],
+            "rank": row['rank'],
+            "snippet": snippet_html(row['snippet']),
+        })
+    for page in pages.values():
+        page['hits'].sort(key=lambda hit: hit['position'])
+    return list(pages.values())
+
+@api_router.get("/schools/{school_id}/search")
+async def search_school_pages(school_id: str, q: str = Query(..., min_length=1, max_length=200),
+                              limit: int = Query(SEARCH_DEFAULT_LIMIT, ge=1, le=SEARCH_MAX_LIMIT)):
+    """Pages and components of a school matching q (words, "phrases", OR, -word), best first.
+
+    limit caps the component hits; each page lists its hits in page order, with
+    matches in the snippets wrapped in <mark>. A hit on the page name has
+    component_type "page" and no component_id.
+    """
+    if not q.strip():
+        raise HTTPException(status_code=422, detail="Search query is empty")
+    try:
+        rows = await repository.search_pages(school_id, q, limit)
+        if not rows and not await repository.school_exists(school_id):
+            raise HTTPException(status_code=404, detail="School not found")
+    except HTTPException:
+        raise
+    except DataStoreError as e:
+        if e.code == '22P02':
+            raise HTTPException(status_code=404, detail="School not found")
+        log_error(f"Error searching pages: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to search pages: {str(e)}")
+    except Exception as e:
+        log_error(f"Error searching pages: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to search pages: {str(e)}")
+    return {"query": q, "results": group_search_hits(rows)}
+
 # ============ TEMPLATE COMPONENTS ============
 
-@api_router.get("/templates/components")
-async def get_component_templates():
-    return {
-        "widgets": [
-            {
-                "type": "hero",
-                "name": "Hero Section",
-                "icon": "Image",
-                "category": "sections",
-                "defaultProps": {
-                    "title": "Welcome to Our School",
-                    "subtitle": "Inspiring young minds since 1990",
-                    "backgroundImage": "https://images.unsplash.com/photo-1523050854058-8df90110c9f1?q=80&w=2070&auto=format&fit=crop",
-                    "buttonText": "Learn More",
-                    "buttonLink": "#about"
-                }
-            },
-            {
-                "type": "text",
-                "name": "Text Block",
-                "icon": "Type",
-                "category": "basic",
-                "defaultProps": {
-                    "content": "Enter your text here...",
-                    "align": "left",
-                    "fontSize": "base"
-                }
-            },
-            {
-                "type": "heading",
-                "name": "Heading",
-                "icon": "Heading",
-                "category": "basic",
-                "defaultProps": {
-                    "content": "Section Title",
-                    "level": "h2",
-                    "align": "center"
-                }
-            },
-            {
-                "type": "image",
-                "name": "Image",
-                "icon": "ImageIcon",
-                "category": "basic",
-                "defaultProps": {
-                    "src": "https://images.unsplash.com/photo-1509062522246-3755977927d7?q=80&w=2132&auto=format&fit=crop",
-                    "alt": "School image",
-                    "width": "100%"
-                }
-            },
-            {
-                "type": "button",
-                "name": "Button",
-                "icon": "MousePointerClick",
-                "category": "basic",
-                "defaultProps": {
-                    "text": "Click Me",
-                    "link": "#",
-                    "variant": "primary"
-                }
-            },
-            {
-                "type": "features",
-                "name": "Features Grid",
-                "icon": "Grid3X3",
-                "category": "sections",
-                "defaultProps": {
-                    "title": "Why Choose Us",
-                    "features": [
-                        {"icon": "GraduationCap", "title": "Excellence in Education", "description": "Award-winning curriculum designed for success"},
-                        {"icon": "Users", "title": "Dedicated Teachers", "description": "Experienced educators who care about every student"},
-                        {"icon": "Building", "title": "Modern Facilities", "description": "State-of-the-art classrooms and sports facilities"}
-                    ]
-                }
-            },
-            {
-                "type": "gallery",
-                "name": "Image Gallery",
-                "icon": "Images",
-                "category": "sections",
-                "defaultProps": {
-                    "title": "School Gallery",
-                    "images": [
-                        "https://images.unsplash.com/photo-1509062522246-3755977927d7?q=80&w=2132&auto=format&fit=crop",
-                        "https://images.unsplash.com/photo-1427504494785-3a9ca28497b1?q=80&w=2070&auto=format&fit=crop",
-                        "https://images.unsplash.com/photo-1592280771884-f25f2b8423f5?q=80&w=1974&auto=format&fit=crop",
-                        "https://images.unsplash.com/photo-1564981797816-1043664bf78d?q=80&w=1974&auto=format&fit=crop"
-                    ]
-                }
-            },
-            {
-                "type": "announcements",
-                "name": "Announcements",
-                "icon": "Bell",
-                "category": "school",
-                "defaultProps": {
-                    "title": "Latest News",
-                    "items": [
-                        {"title": "Parent-Teacher Conference", "date": "Jan 15, 2026", "excerpt": "Join us for our upcoming parent-teacher conference..."},
-                        {"title": "Spring Break Schedule", "date": "Jan 10, 2026", "excerpt": "Important dates for the upcoming spring break..."},
-                        {"title": "Science Fair Winners", "date": "Jan 5, 2026", "excerpt": "Congratulations to all our science fair participants..."}
-                    ]
-                }
-            },
-            {
-                "type": "events",
-                "name": "Events Calendar",
-                "icon": "Calendar",
-                "category": "school",
-                "defaultProps": {
-                    "title": "Upcoming Events",
-                    "events": [
-                        {"title": "Open House", "date": "2026-01-20", "time": "10:00 AM"},
-                        {"title": "Sports Day", "date": "2026-01-25", "time": "9:00 AM"},
-                        {"title": "Art Exhibition", "date": "2026-02-01", "time": "2:00 PM"}
-                    ]
-                }
-            },
-            {
-                "type": "staff",
-                "name": "Staff Directory",
-                "icon": "Users",
-                "category": "school",
-                "defaultProps": {
-                    "title": "Meet Our Team",
-                    "staff": [
-                        {"name": "Dr. Sarah Johnson", "role": "Principal", "image": "https://images.unsplash.com/photo-1573496359142-b8d87734a5a2?q=80&w=1976&auto=format&fit=crop"},
-                        {"name": "Mr. James Wilson", "role": "Vice Principal", "image": "https://images.unsplash.com/photo-1544717305-2782549b5136?q=80&w=1974&auto=format&fit=crop"},
-                        {"name": "Ms. Emily Davis", "role": "Head of Elementary", "image": "https://images.unsplash.com/photo-1573496359142-b8d87734a5a2?q=80&w=1976&auto=format&fit=crop"}
-                    ]
-                }
-            },
-            {
-                "type": "contact",
-                "name": "Contact Section",
-                "icon": "Mail",
-                "category": "sections",
-                "defaultProps": {
-                    "title": "Contact Us",
-                    "address": "123 Education Lane, Learning City, LC 12345",
-                    "phone": "(555) 123-4567",
-                    "email": "info@school.edu",
-                    "showMap": True
-                }
-            },
-            {
-                "type": "footer",
-                "name": "Footer",
-                "icon": "PanelBottom",
-                "category": "sections",
-                "defaultProps": {
-                    "schoolName": "Elementary School",
-                    "address": "123 Education Lane",
-                    "phone": "(555) 123-4567",
-                    "email": "info@school.edu",
-                    "socialLinks": {
-                        "facebook": "#",
-                        "twitter": "#",
-                        "instagram": "#"
-                    }
-                }
-            },
-            {
-                "type": "spacer",
-                "name": "Spacer",
-                "icon": "SeparatorHorizontal",
-                "category": "basic",
-                "defaultProps": {
-                    "height": "60"
+COMPONENT_TEMPLATES = {
+    "widgets": [
+        {
+            "type": "hero",
+            "name": "Hero Section",
+            "icon": "Image",
+            "category": "sections",
+            "defaultProps": {
+                "title": "Welcome to Our School",
+                "subtitle": "Inspiring young minds since 1990",
+                "backgroundImage": "https://images.unsplash.com/photo-1523050854058-8df90110c9f1?q=80&w=2070&auto=format&fit=crop",
+                "buttonText": "Learn More",
+                "buttonLink": "#about"
+            }
+        },
+        {
+            "type": "text",
+            "name": "Text Block",
+            "icon": "Type",
+            "category": "basic",
+            "defaultProps": {
+                "content": "Enter your text here...",
+                "align": "left",
+                "fontSize": "base"
+            }
+        },
+        {
+            "type": "heading",
+            "name": "Heading",
+            "icon": "Heading",
+            "category": "basic",
+            "defaultProps": {
+                "content": "Section Title",
+                "level": "h2",
+                "align": "center"
+            }
+        },
+        {
+            "type": "image",
+            "name": "Image",
+            "icon": "ImageIcon",
+            "category": "basic",
+            "defaultProps": {
+                "src": "https://images.unsplash.com/photo-1509062522246-3755977927d7?q=80&w=2132&auto=format&fit=crop",
+                "alt": "School image",
+                "width": "100%"
+            }
+        },
+        {
+            "type": "button",
+            "name": "Button",
+            "icon": "MousePointerClick",
+            "category": "basic",
+            "defaultProps": {
+                "text": "Click Me",
+                "link": "#",
+                "variant": "primary"
+            }
+        },
+        {
+            "type": "features",
+            "name": "Features Grid",
+            "icon": "Grid3X3",
+            "category": "sections",
+            "defaultProps": {
+                "title": "Why Choose Us",
+                "features": [
+                    {"icon": "GraduationCap", "title": "Excellence in Education", "description": "Award-winning curriculum designed for success"},
+                    {"icon": "Users", "title": "Dedicated Teachers", "description": "Experienced educators who care about every student"},
+                    {"icon": "Building", "title": "Modern Facilities", "description": "State-of-the-art classrooms and sports facilities"}
+                ]
+            }
+        },
+        {
+            "type": "gallery",
+            "name": "Image Gallery",
+            "icon": "Images",
+            "category": "sections",
+            "defaultProps": {
+                "title": "School Gallery",
+                "images": [
+                    "https://images.unsplash.com/photo-1509062522246-3755977927d7?q=80&w=2132&auto=format&fit=crop",
+                    "https://images.unsplash.com/photo-1427504494785-3a9ca28497b1?q=80&w=2070&auto=format&fit=crop",
+                    "https://images.unsplash.com/photo-1592280771884-f25f2b8423f5?q=80&w=1974&auto=format&fit=crop",
+                    "https://images.unsplash.com/photo-1564981797816-1043664bf78d?q=80&w=1974&auto=format&fit=crop"
+                ]
+            }
+        },
+        {
+            "type": "announcements",
+            "name": "Announcements",
+            "icon": "Bell",
+            "category": "school",
+            "defaultProps": {
+                "title": "Latest News",
+                "items": [
+                    {"title": "Parent-Teacher Conference", "date": "Jan 15, 2026", "excerpt": "Join us for our upcoming parent-teacher conference..."},
+                    {"title": "Spring Break Schedule", "date": "Jan 10, 2026", "excerpt": "Important dates for the upcoming spring break..."},
+                    {"title": "Science Fair Winners", "date": "Jan 5, 2026", "excerpt": "Congratulations to all our science fair participants..."}
+                ]
+            }
+        },
+        {
+            "type": "events",
+            "name": "Events Calendar",
+            "icon": "Calendar",
+            "category": "school",
+            "defaultProps": {
+                "title": "Upcoming Events",
+                "events": [
+                    {"title": "Open House", "date": "2026-01-20", "time": "10:00 AM"},
+                    {"title": "Sports Day", "date": "2026-01-25", "time": "9:00 AM"},
+                    {"title": "Art Exhibition", "date": "2026-02-01", "time": "2:00 PM"}
+                ]
+            }
+        },
+        {
+            "type": "staff",
+            "name": "Staff Directory",
+            "icon": "Users",
+            "category": "school",
+            "defaultProps": {
+                "title": "Meet Our Team",
+                "staff": [
+                    {"name": "Dr. Sarah Johnson", "role": "Principal", "image": "https://images.unsplash.com/photo-1573496359142-b8d87734a5a2?q=80&w=1976&auto=format&fit=crop"},
+                    {"name": "Mr. James Wilson", "role": "Vice Principal", "image": "https://images.unsplash.com/photo-1544717305-2782549b5136?q=80&w=1974&auto=format&fit=crop"},
+                    {"name": "Ms. Emily Davis", "role": "Head of Elementary", "image": "https://images.unsplash.com/photo-1573496359142-b8d87734a5a2?q=80&w=1976&auto=format&fit=crop"}
+                ]
+            }
+        },
+        {
+            "type": "contact",
+            "name": "Contact Section",
+            "icon": "Mail",
+            "category": "sections",
+            "defaultProps": {
+                "title": "Contact Us",
+                "address": "123 Education Lane, Learning City, LC 12345",
+                "phone": "(555) 123-4567",
+                "email": "info@school.edu",
+                "showMap": True
+            }
+        },
+        {
+            "type": "footer",
+            "name": "Footer",
+            "icon": "PanelBottom",
+            "category": "sections",
+            "defaultProps": {
+                "schoolName": "Elementary School",
+                "address": "123 Education Lane",
+                "phone": "(555) 123-4567",
+                "email": "info@school.edu",
+                "socialLinks": {
+                    "facebook": "#",
+                    "twitter": "#",
+                    "instagram": "#"
                 }
             }
-        ],
-        "categories": [
-            {"id": "basic", "name": "Basic Elements"},
-            {"id": "sections", "name": "Page Sections"},
-            {"id": "school", "name": "School Specific"}
-        ]
-    }
+        },
+        {
+            "type": "spacer",
+            "name": "Spacer",
+            "icon": "SeparatorHorizontal",
+            "category": "basic",
+            "defaultProps": {
+                "height": "60"
+            }
+        }
+    ],
+    "categories": [
+        {"id": "basic", "name": "Basic Elements"},
+        {"id": "sections", "name": "Page Sections"},
+        {"id": "school", "name": "School Specific"}
+    ]
+}
+COMPONENT_CATALOG = PrecomputedJSON(COMPONENT_TEMPLATES)
 
-# ============ IMAGE UPLOAD (Supabase Storage) ============
+@api_router.get("/templates/components")
+async def get_component_templates(request: Request):
+    """Get the global component catalog"""
+    return catalog_response(COMPONENT_CATALOG, request)
 
-@api_router.post("/upload")
-async def upload_image(file: UploadFile = File(...)):
-    """Upload an image to Supabase Storage and return the URL"""
-    # Validate file type
-    allowed_types = ["image/jpeg", "image/png", "image/gif", "image/webp"]
-    if file.content_type not in allowed_types:
-        raise HTTPException(status_code=400, detail="Invalid file type. Only JPEG, PNG, GIF, WebP allowed.")
+# ============ IMAGE UPLOAD ============
 
-    # Read file content
-    file_content = await file.read()
 
-    # Generate unique filename
-    ext = file.filename.split(".")[-1] if "." in file.filename else "jpg"
-    filename = f"{uuid.uuid4()}.{ext}"
-    file_path = f"uploads/{filename}"
+# ---- Responsive derivatives ----
 
+IMAGE_DERIVATIVE_WIDTHS = tuple(
+    int(w) for w in os.environ.get('IMAGE_DERIVATIVE_WIDTHS', '320,640,1024,1600').split(',')
+)
+IMAGE_WORKERS = int(os.environ.get('IMAGE_WORKERS', '2'))
+image_pool: Optional[ProcessPoolExecutor] = None
+# public image URL -> srcset manifest
+image_manifests = LRUCache(maxsize=int(os.environ.get('IMAGE_MANIFEST_CACHE_SIZE', '2048')), ttl=3600)
+
+def get_image_pool() -> ProcessPoolExecutor:
+    global image_pool
+    if image_pool is None:
+        image_pool = ProcessPoolExecutor(max_workers=IMAGE_WORKERS)
+    return image_pool
+
+def manifest_path_for(file_path: str) -> str:
+    return file_path.rsplit('.', 1)[0] + '.json'
+
+async def build_image_derivatives(spooled: SpooledUpload, file_path: str, public_url: str):
+    """Background task: resize an upload in the process pool and store the derivatives and their srcset manifest"""
+    derivatives = []
     try:
-        # Upload to Supabase Storage
-        # The Python client uses a different API than JavaScript
-        result = supabase.storage.from_("uploads").upload(
-            file_path,
-            file_content,
-            file_options={
-                "content-type": file.content_type,
-                "cache-control": "3600",
-                "upsert": False
-            }
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(
+            get_image_pool(), generate_derivatives, spooled.path, IMAGE_DERIVATIVE_WIDTHS
         )
+        derivatives = result['files']
+        stem = file_path.rsplit('.', 1)[0]
+
+        async def store(width: int, path: str):
+            derivative_path = f"{stem}-{width}w.webp"
+            await storage.put_file(derivative_path, path, "image/webp")
+            return {"width": width, "url": await storage.public_url(derivative_path)}
+
+        sources = list(await asyncio.gather(*(store(width, path) for width, path in derivatives)))
+        sources.append({"width": result['width'], "url": public_url})
+        manifest = {
+            "src": public_url,
+            "width": result['width'],
+            "height": result['height'],
+            "placeholder": result['placeholder'],
+            "sources": sources,
+        }
+        await storage.put_bytes(manifest_path_for(file_path), json.dumps(manifest).encode(), "application/json")
+        image_manifests.set(public_url, manifest)
+        log_info(f"Image derivatives stored for {public_url}: {[w for w, _ in derivatives]}")
+    except Exception as e:
+        log_error(f"Error building image derivatives for {public_url}: {e}", e)
+    finally:
+        for _, path in derivatives:
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        spooled.cleanup()
+
+async def load_image_manifests(urls: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Fetch srcset manifests for uploaded images; URLs without one are left out"""
+    manifests, missing = {}, []
+    for url in set(urls):
+        if storage.key_for_url(url) is None:
+            continue
+        manifest = image_manifests.get(url)
+        if manifest is not None:
+            manifests[url] = manifest
+        else:
+            missing.append(url)
 
-        # Check for errors (Python client returns data/error tuple)
-        if hasattr(result, 'error') and result.error:
-            log_error(f"Supabase Storage upload error: {result.error}")
-            raise HTTPException(status_code=500, detail=f"Failed to upload image: {result.error}")
+    async def fetch(url: str):
+        try:
+            body = await storage.read(manifest_path_for(storage.key_for_url(url)))
+            if body is not None:
+                manifests[url] = json.loads(body)
+                image_manifests.set(url, manifests[url])
+        except Exception as e:
+            log_error(f"Error fetching image manifest for {url}: {e}")
+
+    await asyncio.gather(*(fetch(url) for url in missing))
+    return manifests
+
+UPLOAD_MAX_BYTES = int(os.environ.get('UPLOAD_MAX_BYTES', str(10 * 1024 * 1024)))
+# Room in an upload's body for the multipart boundaries, part headers and other form fields
+UPLOAD_FORM_OVERHEAD = 64 * 1024
+
+def format_byte_size(size: int) -> str:
+    for unit, scale in (('MB', 1024 * 1024), ('KB', 1024)):
+        if size >= scale:
+            return f"{size / scale:.1f}".removesuffix('.0') + f" {unit}"
+    return f"{size} bytes"
+
+# ---- Content-addressed assets ----
+
+# Uploads are stored as uploads/<sha256>.<ext> and indexed in the assets table,
+# so identical files share one object. Objects never change once written.
+asset_index = LRUCache(maxsize=int(os.environ.get('ASSET_INDEX_CACHE_SIZE', '4096')))
+SHA256_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+def asset_response(asset: Dict[str, Any], deduplicated: bool) -> Dict[str, Any]:
+    response = {
+        "url": asset['url'],
+        "filename": asset['path'].rsplit('/', 1)[-1],
+        "path": asset['path'],
+        "sha256": asset['sha256'],
+        "deduplicated": deduplicated
+    }
+    if asset['content_type'] != "image/gif":
+        response["manifest"] = manifest_path_for(asset['url'])
+    return response
+
+async def find_asset(digest: str) -> Optional[Dict[str, Any]]:
+    """Look up a stored upload by content hash; index failures count as a miss"""
+    asset = asset_index.get(digest)
+    if asset is not None:
+        return asset
+    try:
+        asset = await repository.find_asset(digest)
+    except Exception as e:
+        log_error(f"Error reading asset index for {digest}: {e}")
+        return None
+    if asset is not None:
+        asset_index.set(digest, asset)
+    return asset
+
+async def record_asset(asset: Dict[str, Any]):
+    asset_index.set(asset['sha256'], asset)
+    try:
+        await repository.record_asset(asset)
+    except Exception as e:
+        # The object is stored either way; the next identical upload just re-sends it
+        log_error(f"Error recording asset {asset['sha256']}: {e}")
+
+@api_router.get("/upload/{digest}")
+async def get_uploaded_asset(digest: str):
+    """Look up an upload by the SHA-256 of its content, so clients can skip sending known files"""
+    digest = digest.lower()
+    if not SHA256_PATTERN.match(digest):
+        raise HTTPException(status_code=400, detail="Expected a hex SHA-256 digest")
+    asset = await find_asset(digest)
+    if asset is None:
+        raise HTTPException(status_code=404, detail="Asset not found")
+    return asset_response(asset, deduplicated=True)
+
+@api_router.post("/upload", openapi_extra={"requestBody": {"required": True, "content": {"multipart/form-data": {
+    "schema": {"type": "object", "required": ["file"], "properties": {"file": {"type": "string", "format": "binary"}}},
+}}}})
+async def upload_image(request: Request, background_tasks: BackgroundTasks):
+    """Upload an image to the storage backend and return the URL and its srcset manifest location"""
+    too_large = HTTPException(status_code=413, detail=f"File too large. Maximum size is {format_byte_size(UPLOAD_MAX_BYTES)}.")
+    # A declared length over the limit is refused before any of the body is read
+    content_length = request.headers.get('content-length', '')
+    if content_length.isdigit() and int(content_length) > UPLOAD_MAX_BYTES + UPLOAD_FORM_OVERHEAD:
+        uploads_total.inc('rejected')
+        raise too_large
+
+    # The body is parsed as it streams in and the file part written straight to a
+    # bounded spool; the type is sniffed from the first bytes, not the header
+    try:
+        spooled = await spool_multipart_upload(request.stream(), request.headers.get('content-type'), 'file',
+                                               UPLOAD_MAX_BYTES, UPLOAD_FORM_OVERHEAD)
+    except MalformedUpload as e:
+        uploads_total.inc('rejected')
+        raise HTTPException(status_code=422, detail=str(e))
+    except UnsupportedImageType:
+        uploads_total.inc('rejected')
+        raise HTTPException(status_code=400, detail="Invalid file type. Only JPEG, PNG, GIF, WebP allowed.")
+    except UploadTooLarge:
+        uploads_total.inc('rejected')
+        raise too_large
 
-        # Get public URL
-        public_url_result = supabase.storage.from_("uploads").get_public_url(file_path)
+    # Name the object after its content
+    filename = f"{spooled.sha256}.{spooled.ext}"
+    file_path = f"uploads/{filename}"
+    hand_off = False
 
-        # Python client returns a response object with data attribute
-        if hasattr(public_url_result, 'data'):
-            public_url = public_url_result.data.get("publicUrl")
-        elif isinstance(public_url_result, dict):
-            public_url = public_url_result.get("publicUrl")
-        else:
-            # Fallback: construct URL manually
-            public_url = f"{supabase_url}/storage/v1/object/public/uploads/{file_path}"
+    try:
+        existing = await find_asset(spooled.sha256)
+        if existing is not None:
+            log_info(f"Image already stored, reusing {existing['url']}")
+            uploads_total.inc('deduplicated')
+            upload_bytes.inc('deduplicated', amount=spooled.size)
+            return asset_response(existing, deduplicated=True)
+
+        # Same key for the same bytes, so a concurrent identical upload is harmless
+        await storage.put_file(file_path, spooled.path, spooled.content_type)
+        public_url = await storage.public_url(file_path)
 
         if not public_url:
             raise HTTPException(status_code=500, detail="Failed to get public URL")
 
         log_info(f"Image uploaded successfully: {public_url}")
-        return {
+        asset = {
+            "sha256": spooled.sha256,
+            "path": file_path,
             "url": public_url,
-            "filename": filename,
-            "path": file_path
+            "content_type": spooled.content_type,
+            "size": spooled.size
         }
+        await record_asset(asset)
+        # Animated GIFs would lose their frames, so only stills get derivatives
+        if spooled.content_type != "image/gif":
+            # Derivatives are built after the response; the manifest appears at its URL when done
+            background_tasks.add_task(build_image_derivatives, spooled, file_path, public_url)
+            hand_off = True
+        uploads_total.inc('stored')
+        upload_bytes.inc('stored', amount=spooled.size)
+        return asset_response(asset, deduplicated=False)
     except HTTPException:
         raise
     except Exception as e:
         log_error(f"Error uploading image: {e}", e)
         raise HTTPException(status_code=500, detail=f"Failed to upload image: {str(e)}")
+    finally:
+        if not hand_off:
+            spooled.cleanup()
+
+@media_router.api_route("/{name:path}", methods=["GET", "HEAD"])
+async def serve_upload(name: str, request: Request):
+    """Serve an uploaded object from the local storage backend"""
+    if not isinstance(storage, LocalStorage):
+        raise HTTPException(status_code=404, detail="Not found")
+    path = storage.path_for(f"uploads/{name}")
+    if (path is None or not path.is_relative_to(storage.root / 'uploads')
+            or not path.is_file() or path.name.startswith('.')):
+        raise HTTPException(status_code=404, detail="Not found")
+    # Keys are content hashes (or derived from one), so a URL never changes meaning
+    return serve_file(request, path, 'public, max-age=31536000, immutable')
 
 # ============ THEMES ============
 
-@api_router.get("/themes")
-async def get_themes():
-    """Get available themes for school websites"""
-    return {
-        "themes": [
-            {
-                "id": "default",
-                "name": "Classic Blue",
-                "description": "Professional blue theme with warm amber accents",
-                "preview": "https://images.unsplash.com/photo-1523050854058-8df90110c9f1?w=400",
-                "colors": {
-                    "primary": "#1D4ED8",
-                    "secondary": "#FBBF24",
-                    "background": "#FFFFFF",
-                    "text": "#1E293B",
-                    "accent": "#3B82F6"
-                },
-                "heroStyle": "gradient",
-                "fontFamily": "Outfit"
+THEMES = {
+    "themes": [
+        {
+            "id": "default",
+            "name": "Classic Blue",
+            "description": "Professional blue theme with warm amber accents",
+            "preview": "https://images.unsplash.com/photo-1523050854058-8df90110c9f1?w=400",
+            "colors": {
+                "primary": "#1D4ED8",
+                "secondary": "#FBBF24",
+                "background": "#FFFFFF",
+                "text": "#1E293B",
+                "accent": "#3B82F6"
             },
-            {
-                "id": "forest",
-                "name": "Forest Green",
-                "description": "Natural green theme perfect for eco-conscious schools",
-                "preview": "https://images.unsplash.com/photo-1509062522246-3755977927d7?w=400",
-                "colors": {
-                    "primary": "#166534",
-                    "secondary": "#FCD34D",
-                    "background": "#F0FDF4",
-                    "text": "#14532D",
-                    "accent": "#22C55E"
-                },
-                "heroStyle": "nature",
-                "fontFamily": "DM Sans"
+            "heroStyle": "gradient",
+            "fontFamily": "Outfit"
+        },
+        {
+            "id": "forest",
+            "name": "Forest Green",
+            "description": "Natural green theme perfect for eco-conscious schools",
+            "preview": "https://images.unsplash.com/photo-1509062522246-3755977927d7?w=400",
+            "colors": {
+                "primary": "#166534",
+                "secondary": "#FCD34D",
+                "background": "#F0FDF4",
+                "text": "#14532D",
+                "accent": "#22C55E"
             },
-            {
-                "id": "sunset",
-                "name": "Sunset Orange",
-                "description": "Warm and energetic theme with vibrant colors",
-                "preview": "https://images.unsplash.com/photo-1580582932707-520aed937b7b?w=400",
-                "colors": {
-                    "primary": "#EA580C",
-                    "secondary": "#0EA5E9",
-                    "background": "#FFFBEB",
-                    "text": "#431407",
-                    "accent": "#F97316"
-                },
-                "heroStyle": "warm",
-                "fontFamily": "Nunito"
-            }
-        ]
-    }
+            "heroStyle": "nature",
+            "fontFamily": "DM Sans"
+        },
+        {
+            "id": "sunset",
+            "name": "Sunset Orange",
+            "description": "Warm and energetic theme with vibrant colors",
+            "preview": "https://images.unsplash.com/photo-1580582932707-520aed937b7b?w=400",
+            "colors": {
+                "primary": "#EA580C",
+                "secondary": "#0EA5E9",
+                "background": "#FFFBEB",
+                "text": "#431407",
+                "accent": "#F97316"
+            },
+            "heroStyle": "warm",
+            "fontFamily": "Nunito"
+        }
+    ]
+}
+THEMES_CATALOG = PrecomputedJSON(THEMES)
+
+@api_router.get("/themes")
+async def get_themes(request: Request):
+    """Get available themes for school websites"""
+    return catalog_response(THEMES_CATALOG, request)
 
 @api_router.put("/schools/{school_id}/theme")
 async def update_school_theme(school_id: str, theme_data: Dict[str, Any]):
     """Update school theme"""
     try:
-        # Check if school exists
-        result = supabase.table('schools').select('id').eq('id', school_id).execute()
-        if not result.data:
-            raise HTTPException(status_code=404, detail="School not found")
-
         update_data = {
             "theme": theme_data.get("theme", "default"),
             "primary_color": theme_data.get("primary_color", "#1D4ED8"),
             "secondary_color": theme_data.get("secondary_color", "#FBBF24")
         }
 
-        result = supabase.table('schools').update(update_data).eq('id', school_id).select().execute()
-
-        if not result.data:
-            raise HTTPException(status_code=500, detail="Failed to update school theme")
+        updated_school = await repository.update_school(school_id, update_data)
+        if updated_school is None:
+            raise HTTPException(status_code=404, detail="School not found")
 
-        updated_school = result.data[0] if isinstance(result.data, list) else result.data
+        school_metadata_cache.pop(school_id)
+        # Published pages are rebuilt with the new theme on their next visit
+        invalidate_published_pages(school_id=school_id)
         return updated_school
     except HTTPException:
         raise
@@ -631,23 +1445,43 @@ async def update_school_theme(school_id: str, theme_data: Dict[str, Any]):
 
 # ============ SCHOOL-SPECIFIC COMPONENTS & THEMES ============
 
+# Parsed school metadata keyed by school id; writes below invalidate their entry,
+# but only in the worker that handled them, so the TTL bounds how long the other
+# gunicorn workers can serve a school's previous components and themes
+school_metadata_cache = LRUCache(
+    maxsize=int(os.environ.get('SCHOOL_METADATA_CACHE_SIZE', '512')),
+    ttl=float(os.environ.get('SCHOOL_METADATA_CACHE_TTL', '30')),
+)
+
+async def get_school_metadata(school_id: str) -> Dict[str, Any]:
+    """Return a school's parsed metadata, reading through the metadata cache"""
+    metadata = school_metadata_cache.get(school_id)
+    if metadata is not None:
+        return metadata
+
+    metadata = await repository.get_school_metadata(school_id)
+    if metadata is None:
+        raise HTTPException(status_code=404, detail="School not found")
+    school_metadata_cache.set(school_id, metadata)
+    return metadata
+
+async def set_school_metadata_key(school_id: str, key: str, value: Any):
+    """Replace one top-level metadata key in place with a single RPC round trip"""
+    if not await repository.set_school_metadata_key(school_id, key, value):
+        raise HTTPException(status_code=404, detail="School not found")
+    school_metadata_cache.pop(school_id)
+
 @api_router.get("/editor/{school_id}/components")
-async def get_school_components(school_id: str):
+async def get_school_components(school_id: str, request: Request):
     """Get components/widgets for a specific school"""
     try:
-        result = supabase.table('schools').select('metadata').eq('id', school_id).single().execute()
-
-        if not result.data:
-            raise HTTPException(status_code=404, detail="School not found")
-
-        metadata = result.data.get('metadata', {})
+        metadata = await get_school_metadata(school_id)
         components = metadata.get('components', None)
 
         # If no school-specific components, return global templates
         if components is None:
             # Return the same structure as templates/components but from metadata
-            templates_result = await get_component_templates()
-            return templates_result
+            return catalog_response(COMPONENT_CATALOG, request, 'no-cache')
 
         return {
             "widgets": components.get('widgets', []),
@@ -658,25 +1492,18 @@ async def get_school_components(school_id: str):
     except Exception as e:
         log_error(f"Error fetching school components: {e}", e)
         # Fallback to global templates
-        templates_result = await get_component_templates()
-        return templates_result
+        return catalog_response(COMPONENT_CATALOG, request, 'no-cache')
 
 @api_router.get("/editor/{school_id}/themes")
-async def get_school_themes(school_id: str):
+async def get_school_themes(school_id: str, request: Request):
     """Get themes for a specific school"""
     try:
-        result = supabase.table('schools').select('metadata').eq('id', school_id).single().execute()
-
-        if not result.data:
-            raise HTTPException(status_code=404, detail="School not found")
-
-        metadata = result.data.get('metadata', {})
+        metadata = await get_school_metadata(school_id)
         themes = metadata.get('themes', None)
 
         # If no school-specific themes, return global themes
         if themes is None:
-            themes_result = await get_themes()
-            return themes_result
+            return catalog_response(THEMES_CATALOG, request, 'no-cache')
 
         return {"themes": themes}
     except HTTPException:
@@ -684,24 +1511,13 @@ async def get_school_themes(school_id: str):
     except Exception as e:
         log_error(f"Error fetching school themes: {e}", e)
         # Fallback to global themes
-        themes_result = await get_themes()
-        return themes_result
+        return catalog_response(THEMES_CATALOG, request, 'no-cache')
 
 @api_router.put("/editor/{school_id}/components")
 async def update_school_components(school_id: str, components_data: Dict[str, Any]):
     """Update components/widgets for a specific school"""
     try:
-        # Get current school data
-        result = supabase.table('schools').select('metadata').eq('id', school_id).single().execute()
-
-        if not result.data:
-            raise HTTPException(status_code=404, detail="School not found")
-
-        metadata = result.data.get('metadata', {})
-        metadata['components'] = components_data
-
-        # Update school metadata
-        supabase.table('schools').update({'metadata': metadata}).eq('id', school_id).execute()
+        await set_school_metadata_key(school_id, 'components', components_data)
 
         return {"message": "Components updated successfully", "components": components_data}
     except HTTPException:
@@ -714,24 +1530,237 @@ async def update_school_components(school_id: str, components_data: Dict[str, An
 async def update_school_themes(school_id: str, themes_data: Dict[str, Any]):
     """Update themes for a specific school"""
     try:
-        # Get current school data
-        result = supabase.table('schools').select('metadata').eq('id', school_id).single().execute()
+        themes = themes_data.get('themes', [])
+        await set_school_metadata_key(school_id, 'themes', themes)
+        invalidate_published_pages(school_id=school_id)
 
-        if not result.data:
-            raise HTTPException(status_code=404, detail="School not found")
+        return {"message": "Themes updated successfully", "themes": themes}
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(f"Error updating school themes: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to update themes: {str(e)}")
+
+# ============ PUBLISHED SITES ============
+
+# Publishing serializes the page's bundle (school branding, resolved theme, ordered
+# components) once and stores it as an immutable snapshot keyed by the SHA-256 of
+# its bytes. Public reads serve only snapshots: editor writes reach visitors when
+# the page is next published, and every public response can be cached by a CDN.
+PUBLIC_CACHE_CONTROL = (
+    f"public, max-age={int(os.environ.get('PUBLIC_MAX_AGE', '60'))}, "
+    f"stale-while-revalidate={int(os.environ.get('PUBLIC_STALE_WHILE_REVALIDATE', '3600'))}"
+)
 
-        metadata = result.data.get('metadata', {})
-        metadata['themes'] = themes_data.get('themes', [])
+# (school_slug, page_slug) -> {"hash", "body", "school_id", "page_id"}, the snapshot a
+# public URL serves; the TTL bounds how long another worker can keep serving the
+# previous snapshot after a publish it did not see.
+published_snapshots = LRUCache(
+    maxsize=int(os.environ.get('SNAPSHOT_CACHE_SIZE', '1024')),
+    ttl=float(os.environ.get('SITE_CACHE_TTL', '60')),
+)
+# (school_slug, page_slug) -> {"hash", "school_id", "page_id"} of the rendered HTML
+site_routes = LRUCache(
+    maxsize=int(os.environ.get('SITE_ROUTE_CACHE_SIZE', '1024')),
+    ttl=float(os.environ.get('SITE_CACHE_TTL', '60')),
+)
+# content hash -> rendered HTML, compressed once per encoding on first request
+rendered_pages = LRUCache(maxsize=int(os.environ.get('SITE_RENDER_CACHE_SIZE', '256')))
+# Bumped by every invalidation; an entry read before the latest one may be
+# stale, so it is served but not cached
+publish_generation = 0
+
+def invalidate_published_pages(school_id: Optional[str] = None, page_id: Optional[str] = None):
+    """Forget cached routes for a school or page so the next visit re-reads its snapshot"""
+    global publish_generation
+    publish_generation += 1
+
+    def affected(_, entry):
+        return (school_id is not None and entry['school_id'] == school_id) \
+            or (page_id is not None and entry['page_id'] == page_id)
+    published_snapshots.discard_where(affected)
+    site_routes.discard_where(affected)
+
+def resolve_school_theme(school: Dict[str, Any]) -> Dict[str, Any]:
+    """Resolve a school's theme from its metadata or the global catalog, applying its brand colors"""
+    metadata = parse_json_column(school.get('metadata')) or {}
+    themes = metadata.get('themes') or THEMES['themes']
+    theme_id = school.get('theme') or 'default'
+    theme = next((t for t in themes if t.get('id') == theme_id), themes[0] if themes else {})
+    colors = dict(theme.get('colors', {}))
+    if school.get('primary_color'):
+        colors['primary'] = school['primary_color']
+    if school.get('secondary_color'):
+        colors['secondary'] = school['secondary_color']
+    return {**theme, 'colors': colors}
+
+def build_page_bundle(school: Dict[str, Any], page: Dict[str, Any], theme: Dict[str, Any]) -> bytes:
+    """The serialized bundle a published page serves"""
+    bundle = {
+        'school': {key: school.get(key) for key in ('id', 'name', 'slug', 'logo_url', 'primary_color', 'secondary_color')},
+        'theme': {key: theme.get(key) for key in ('id', 'name', 'colors', 'fontFamily', 'heroStyle')},
+        'page': {
+            'id': page['id'],
+            'name': page.get('name'),
+            'slug': page.get('slug'),
+            'components': sorted(parse_json_column(page.get('components')) or [], key=lambda c: c.get('order', 0)),
+        },
+    }
+    return json.dumps(bundle, separators=(',', ':'), default=str).encode()
 
-        # Update school metadata
-        supabase.table('schools').update({'metadata': metadata}).eq('id', school_id).execute()
+async def publish_page(page: Dict[str, Any]) -> Dict[str, Any]:
+    """Snapshot a page as read and make it what its public URL serves"""
+    school = await repository.get_school(page['school_id'])
+    if school is None:
+        raise HTTPException(status_code=404, detail="School not found")
 
-        return {"message": "Themes updated successfully", "themes": metadata['themes']}
+    body = build_page_bundle(school, page, resolve_school_theme(school))
+    digest = hashlib.sha256(body).hexdigest()
+    try:
+        published = await repository.publish_page_snapshot(page['id'], page['version'], digest, body.decode())
+    except DataStoreError as e:
+        if e.code == 'PT412':
+            raise HTTPException(status_code=412, detail="Page was modified by someone else; reload and retry")
+        raise
+    if published is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+
+    compressed = await precompressed(body)
+    invalidate_published_pages(page_id=page['id'])
+    published_snapshots.set((school['slug'], page['slug']), {
+        'hash': digest, 'body': compressed, 'school_id': school['id'], 'page_id': page['id'],
+    })
+    return {
+        'page_id': page['id'],
+        'hash': digest,
+        'version': published['version'],
+        'published_at': published['published_at'],
+        'url': f"/api/public/{school['slug']}/{page['slug']}",
+    }
+
+async def unpublish_page(page_id: str):
+    if not await repository.unpublish_page(page_id):
+        raise HTTPException(status_code=404, detail="Page not found")
+    invalidate_published_pages(page_id=page_id)
+
+@api_router.post("/pages/{page_id}/publish")
+async def publish_page_route(page_id: str, response: Response, if_match: Optional[str] = Header(default=None)):
+    """Publish a page's current content, optionally only if it is still at the version named by If-Match"""
+    expected_version = parse_if_match(if_match)
+    try:
+        page = await repository.get_page(page_id)
+        if page is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+        if expected_version is not None and page.get('version') != expected_version:
+            raise HTTPException(status_code=412, detail="Page was modified by someone else; reload and retry")
+        published = await publish_page(page)
     except HTTPException:
         raise
+    except DataStoreError as e:
+        if e.code == '22P02':
+            raise HTTPException(status_code=404, detail="Page not found")
+        log_error(f"Error publishing page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to publish page: {str(e)}")
     except Exception as e:
-        log_error(f"Error updating school themes: {e}", e)
-        raise HTTPException(status_code=500, detail=f"Failed to update themes: {str(e)}")
+        log_error(f"Error publishing page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to publish page: {str(e)}")
+
+    response.headers['ETag'] = page_etag(published['version'])
+    return published
+
+@api_router.delete("/pages/{page_id}/publish")
+async def unpublish_page_route(page_id: str):
+    """Take a page offline (its snapshots are kept)"""
+    try:
+        await unpublish_page(page_id)
+        return {"message": "Page unpublished"}
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(f"Error unpublishing page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to unpublish page: {str(e)}")
+
+async def rebuild_stale_snapshot(row: Dict[str, Any]):
+    """The page as published, rebundled with its school's current branding and theme.
+
+    Returns the body, its hash and whether it now is the stored snapshot (not when
+    the page was republished or the school changed again in the meantime).
+    """
+    school = await repository.get_school(row['school_id'])
+    if school is None:
+        raise HTTPException(status_code=404, detail="Page not found")
+    body = build_page_bundle(school, json.loads(row['body'])['page'], resolve_school_theme(school))
+    digest = hashlib.sha256(body).hexdigest()
+    stored = await repository.refresh_published_snapshot(row['page_id'], row['hash'], row['stale'], digest,
+                                                         body.decode())
+    return body, digest, stored
+
+async def get_published_snapshot(school_slug: str, page_slug: str) -> Dict[str, Any]:
+    """The snapshot a public URL serves, from memory when warm"""
+    entry = published_snapshots.get((school_slug, page_slug))
+    if entry is None:
+        generation = publish_generation
+        row = await repository.get_published_snapshot(school_slug, page_slug)
+        if row is None:
+            raise HTTPException(status_code=404, detail="Page not found")
+        body, digest, current = row['body'].encode(), row['hash'], True
+        # The school's branding or theme changed since the page was published
+        if row.get('stale'):
+            body, digest, current = await rebuild_stale_snapshot(row)
+        entry = {'hash': digest, 'body': await precompressed(body),
+                 'school_id': row['school_id'], 'page_id': row['page_id']}
+        if current and generation == publish_generation:
+            published_snapshots.set((school_slug, page_slug), entry)
+    return entry
+
+@api_router.get("/public/{school_slug}/{page_slug}")
+async def get_public_page(school_slug: str, page_slug: str, request: Request):
+    """A published page with its school's branding and resolved theme, in one response"""
+    try:
+        snapshot = await get_published_snapshot(school_slug, page_slug)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(f"Error loading public page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to load page: {str(e)}")
+    return cached_body_response(snapshot['body'], f'"{snapshot["hash"]}"', request, PUBLIC_CACHE_CONTROL)
+
+async def build_published_page(school_slug: str, page_slug: str):
+    """Render a published page's snapshot and return its route entry and HTML"""
+    generation = publish_generation
+    snapshot = await get_published_snapshot(school_slug, page_slug)
+    bundle = json.loads(snapshot['body'].body)
+    images = await load_image_manifests(collect_image_urls(bundle['page']['components']))
+    # The snapshot is immutable; only the image derivatives can change under it
+    content_hash = hashlib.sha256(
+        (snapshot['hash'] + json.dumps(images, sort_keys=True, separators=(',', ':'))).encode()
+    ).hexdigest()[:32]
+
+    html = rendered_pages.get(content_hash)
+    if html is None:
+        html = await precompressed(render_page(bundle['school'], bundle['page'], bundle['theme'], images).encode())
+        rendered_pages.set(content_hash, html)
+
+    entry = {'hash': content_hash, 'school_id': snapshot['school_id'], 'page_id': snapshot['page_id']}
+    if generation == publish_generation:
+        site_routes.set((school_slug, page_slug), entry)
+    return entry, html
+
+@site_router.get("/{school_slug}/{page_slug}", response_class=HTMLResponse)
+async def get_published_page(school_slug: str, page_slug: str, request: Request):
+    """Serve a published page as static HTML"""
+    try:
+        entry = site_routes.get((school_slug, page_slug))
+        html = rendered_pages.get(entry['hash']) if entry else None
+        if html is None:
+            entry, html = await build_published_page(school_slug, page_slug)
+    except HTTPException:
+        raise
+    except Exception as e:
+        log_error(f"Error rendering published page: {e}", e)
+        raise HTTPException(status_code=500, detail=f"Failed to render page: {str(e)}")
+
+    return cached_body_response(html, f'"{entry["hash"]}"', request, PUBLIC_CACHE_CONTROL, media_type='text/html')
 
 # ============ SEED DATA ============
 
@@ -740,13 +1769,12 @@ async def seed_data():
     """Seed demo data into Supabase"""
     try:
         # Check if data already exists
-        existing = supabase.table('schools').select('id').limit(1).execute()
-        if existing.data:
+        if await repository.has_schools():
             return {"message": "Data already seeded"}
 
         # Get component templates and themes for seeding
-        templates_data = await get_component_templates()
-        themes_data = await get_themes()
+        templates_data = COMPONENT_TEMPLATES
+        themes_data = THEMES
 
         # Create demo school with components and themes in metadata
         school = School(
@@ -764,7 +1792,7 @@ async def seed_data():
             'components': templates_data,
             'themes': themes_data.get('themes', [])
         }
-        supabase.table('schools').insert(doc).execute()
+        await repository.create_school(doc)
 
         # Create demo page with components
         page = PageData(
@@ -840,18 +1868,53 @@ async def seed_data():
                 )
             ]
         )
-        page_doc = page.model_dump()
+        page_doc = page.model_dump(exclude={'version'})
         page_doc['created_at'] = page_doc['created_at'].isoformat()
         page_doc['updated_at'] = page_doc['updated_at'].isoformat()
         # Convert components to JSON for PostgreSQL
         page_doc['components'] = json.dumps([c.model_dump() for c in page.components])
-        supabase.table('pages').insert(page_doc).execute()
+        created_page = await repository.create_page(page_doc)
+        await publish_page(created_page)
 
         return {"message": "Demo data seeded successfully", "school_id": school.id, "page_id": page.id}
     except Exception as e:
         log_error(f"Error seeding data: {e}", e)
         raise HTTPException(status_code=500, detail=f"Failed to seed data: {str(e)}")
 
+# ============ CACHE STATS ============
+
+CACHES = {
+    "school_metadata": school_metadata_cache,
+    "site_routes": site_routes,
+    "rendered_pages": rendered_pages,
+    "published_snapshots": published_snapshots,
+    "image_manifests": image_manifests,
+    "asset_index": asset_index,
+}
+
+def cache_stat(field: str):
+    return lambda: {(name,): cache.stats()[field] for name, cache in CACHES.items()}
+
+for field, metric_type, documentation in (
+    ('hits', 'counter', 'Cache lookups that found a live entry'),
+    ('misses', 'counter', 'Cache lookups that found nothing or an expired entry'),
+    ('evictions', 'counter', 'Entries evicted to stay within the cache size'),
+    ('hit_ratio', 'gauge', 'Hits over lookups since startup'),
+    ('size', 'gauge', 'Entries currently cached'),
+):
+    name = f"cache_{field}_total" if metric_type == 'counter' else f"cache_{field}"
+    metrics.register(CallbackMetric(name, documentation, ('cache',), cache_stat(field), type=metric_type))
+
+@api_router.get("/cache/stats")
+async def get_cache_stats():
+    """Hit/miss/eviction counters for the in-process caches"""
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+@api_router.get("/metrics")
+async def get_metrics():
+    """Request, upload and cache metrics for this process in Prometheus text format"""
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 # ============ ROOT ============
 
 @api_router.get("/")
@@ -859,40 +1922,46 @@ async def root():
     log_info("Root endpoint called")
     return {"message": "CleverBox CMS API", "version": "1.0.0"}
 
-# Include router
-log_info("Including API router...")
-app.include_router(api_router)
-log_info(f"✓ API router included with {len(app.routes)} total routes")
-log_info(f"Registered routes: {[r.path for r in app.routes if hasattr(r, 'path')]}")
-
-# Add request logging middleware
-class LoggingMiddleware(BaseHTTPMiddleware):
-    async def dispatch(self, request: Request, call_next):
-        log_info(f"→ {request.method} {request.url.path}")
-        try:
-            response = await call_next(request)
-            log_info(f"← {request.method} {request.url.path} → {response.status_code}")
-            return response
-        except Exception as e:
-            log_error(f"Request handler error for {request.method} {request.url.path}: {e}", e)
-            raise
+@api_router.get("/health")
+async def health():
+    """Liveness: the process is up and serving"""
+    return {"status": "ok"}
+
+@api_router.get("/ready")
+async def ready():
+    """Readiness: 200 once the data store has answered, 503 while it is still warming up"""
+    if datastore_ready.is_set():
+        return {"status": "ready", "data_backend": DATA_BACKEND}
+    return JSONResponse(
+        {"status": "starting", "data_backend": DATA_BACKEND, "error": datastore_error},
+        status_code=503, headers={"Retry-After": "1"},
+    )
 
-app.add_middleware(LoggingMiddleware)
+app.include_router(api_router)
+app.include_router(site_router)
+app.include_router(media_router)
+
+# Open a trace per request for the data-store spans (innermost, so every call lands in it)
+app.add_middleware(TracingMiddleware)
+# Compress dynamic JSON/HTML; cached bodies arrive precompressed and pass straight through
+app.add_middleware(CompressionMiddleware, minimum_size=int(os.environ.get('COMPRESSION_MIN_SIZE', '1024')))
+# Add request logging middleware (outside compression, so it records bytes actually sent)
+app.add_middleware(
+    AccessLogMiddleware,
+    sample_rate=float(os.environ.get('ACCESS_LOG_SAMPLE_RATE', '1.0')),
+    slow_ms=float(os.environ.get('ACCESS_LOG_SLOW_MS', '1000')),
+)
+app.add_middleware(MetricsMiddleware, requests=http_requests, latency=http_latency, in_flight=http_in_flight)
 
-log_info("Adding CORS middleware...")
 # Get frontend URL from environment, fallback to wildcard
 frontend_url = os.environ.get('FRONTEND_URL', '*')
 cors_origins = [frontend_url] if frontend_url != '*' else ['*']
-log_info(f"CORS origins: {cors_origins}")
 app.add_middleware(
     CORSMiddleware,
     allow_credentials=True,
     allow_origins=cors_origins,
     allow_methods=["*"],
     allow_headers=["*"],
+    # The editor reads a page's version from its ETag to send back as If-Match
+    expose_headers=["ETag"],
 )
-log_info("✓ CORS middleware added")
-
-log_info("=" * 60)
-log_info("FastAPI backend server initialized successfully!")
-log_info("=" * 60)
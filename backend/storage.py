@@ -0,0 +1,139 @@
+"""
+Object storage backends for uploaded images: Supabase Storage or a local directory.
+"""
+import asyncio
+import os
+import shutil
+import tempfile
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Optional
+
+import httpx
+
+
+class StorageBackend(ABC):
+    """Stores objects under slash-separated keys and maps them to public URLs"""
+
+    @abstractmethod
+    async def put_file(self, key: str, local_path: str, content_type: str, cache_control: str = "31536000") -> None:
+        ...
+
+    @abstractmethod
+    async def put_bytes(self, key: str, data: bytes, content_type: str, cache_control: str = "31536000") -> None:
+        ...
+
+    @abstractmethod
+    async def read(self, key: str) -> Optional[bytes]:
+        """Object contents, or None when it does not exist"""
+
+    @abstractmethod
+    async def public_url(self, key: str) -> str:
+        ...
+
+    @abstractmethod
+    def key_for_url(self, url: str) -> Optional[str]:
+        """Inverse of public_url; None for URLs this backend did not hand out"""
+
+
+class SupabaseStorage(StorageBackend):
+    def __init__(self, client, http_client: httpx.AsyncClient, supabase_url: str, bucket: str = "uploads"):
+        self.client = client
+        self.http_client = http_client
+        self.bucket = bucket
+        self.url_prefix = f"{supabase_url}/storage/v1/object/public/{bucket}/"
+
+    async def _upload(self, key: str, source, content_type: str, cache_control: str) -> None:
+        # Objects are written once per key, so overwriting with the same bytes is harmless
+        result = await self.client.storage.from_(self.bucket).upload(
+            key,
+            source,
+            file_options={"content-type": content_type, "cache-control": cache_control, "upsert": "true"}
+        )
+        # Check for errors (older clients return a data/error tuple instead of raising)
+        if hasattr(result, 'error') and result.error:
+            raise RuntimeError(f"Supabase Storage upload error: {result.error}")
+
+    async def put_file(self, key: str, local_path: str, content_type: str, cache_control: str = "31536000") -> None:
+        # httpx streams the file in chunks
+        with open(local_path, 'rb') as source:
+            await self._upload(key, source, content_type, cache_control)
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str, cache_control: str = "31536000") -> None:
+        await self._upload(key, data, content_type, cache_control)
+
+    async def read(self, key: str) -> Optional[bytes]:
+        response = await self.http_client.get(await self.public_url(key))
+        return response.content if response.status_code == 200 else None
+
+    async def public_url(self, key: str) -> str:
+        result = await self.client.storage.from_(self.bucket).get_public_url(key)
+
+        # Async storage client returns the URL directly, older clients wrap it
+        if isinstance(result, str):
+            return result
+        if hasattr(result, 'data'):
+            return result.data.get("publicUrl")
+        if isinstance(result, dict):
+            return result.get("publicUrl")
+        # Fallback: construct URL manually
+        return self.url_prefix + key
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        if isinstance(url, str) and url.startswith(self.url_prefix):
+            return url[len(self.url_prefix):].split('?', 1)[0]
+        return None
+
+
+class LocalStorage(StorageBackend):
+    """Objects as files under root, served by the API itself at {base_url}/{key}"""
+
+    def __init__(self, root: str, base_url: str):
+        self.root = Path(root).resolve()
+        self.base_url = base_url.rstrip('/')
+
+    def path_for(self, key: str) -> Optional[Path]:
+        """Filesystem path of a key, or None if it would escape root"""
+        path = (self.root / key).resolve()
+        return path if path.is_relative_to(self.root) and path != self.root else None
+
+    def _write(self, key: str, fill) -> None:
+        path = self.path_for(key)
+        if path is None:
+            raise ValueError(f"Invalid storage key: {key}")
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write next to the target and rename, so readers never see a partial file
+        fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        os.close(fd)
+        try:
+            fill(tmp_path)
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+
+    async def put_file(self, key: str, local_path: str, content_type: str, cache_control: str = "31536000") -> None:
+        # copyfile uses sendfile() on Linux, so the bytes stay in the kernel
+        await asyncio.to_thread(self._write, key, lambda tmp_path: shutil.copyfile(local_path, tmp_path))
+
+    async def put_bytes(self, key: str, data: bytes, content_type: str, cache_control: str = "31536000") -> None:
+        await asyncio.to_thread(self._write, key, lambda tmp_path: Path(tmp_path).write_bytes(data))
+
+    async def read(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        if path is None:
+            return None
+        try:
+            return await asyncio.to_thread(path.read_bytes)
+        except (FileNotFoundError, IsADirectoryError):
+            return None
+
+    async def public_url(self, key: str) -> str:
+        return f"{self.base_url}/{key}"
+
+    def key_for_url(self, url: str) -> Optional[str]:
+        prefix = self.base_url + '/'
+        if isinstance(url, str) and url.startswith(prefix):
+            return url[len(prefix):].split('?', 1)[0]
+        return None
@@ -0,0 +1,200 @@
+"""
+Per-request spans for data-store round trips.
+
+Every PostgREST and Storage call goes through the shared httpx client, so an
+instrumented transport sees all of them without touching the call sites. Each
+call becomes a Span on the current request's trace; slow calls are logged and
+the totals are reported in a Server-Timing header. The direct Postgres
+repository reports its queries through report_span the same way.
+"""
+import logging
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Callable, List, Optional, Sequence
+
+import httpx
+
+logger = logging.getLogger("datastore")
+
+TABLE_OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "PUT": "upsert", "DELETE": "delete"}
+STORAGE_OPERATIONS = {"GET": "download", "HEAD": "info", "POST": "upload", "PUT": "update", "DELETE": "remove"}
+
+
+@dataclass
+class Span:
+    service: str         # postgrest, storage, postgres or the host name
+    target: str          # table, RPC function or bucket
+    operation: str       # select/insert/update/delete/rpc, upload/download, ...
+    status: Optional[int]
+    rows: Optional[int]  # from PostgREST's Content-Range, when it sends one
+    bytes_sent: int
+    bytes_received: int
+    duration_ms: float
+
+
+@dataclass
+class Trace:
+    method: str
+    path: str
+    spans: List[Span] = field(default_factory=list)
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def describe(request: httpx.Request):
+    """Map a Supabase REST/Storage request to (service, target, operation)"""
+    path = request.url.path
+    method = request.method
+    if path.startswith("/rest/v1/rpc/"):
+        return "postgrest", path[len("/rest/v1/rpc/"):], "rpc"
+    if path.startswith("/rest/v1/"):
+        operation = TABLE_OPERATIONS.get(method, method.lower())
+        if operation == "insert" and "resolution=" in request.headers.get("prefer", ""):
+            operation = "upsert"
+        return "postgrest", path[len("/rest/v1/"):], operation
+    if path.startswith("/storage/v1/object/"):
+        parts = path[len("/storage/v1/object/"):].split("/")
+        if parts[0] in ("public", "sign", "authenticated", "info") and len(parts) > 1:
+            parts = parts[1:]
+        return "storage", parts[0], STORAGE_OPERATIONS.get(method, method.lower())
+    return request.url.host, path, method.lower()
+
+
+def row_count(response: Optional[httpx.Response]) -> Optional[int]:
+    """Rows in a PostgREST response, from Content-Range ("0-24/*" or "*/0")"""
+    if response is None:
+        return None
+    content_range = response.headers.get("content-range")
+    if not content_range:
+        return None
+    span_part = content_range.split("/", 1)[0]
+    if span_part == "*":
+        return 0
+    try:
+        first, last = span_part.split("-", 1)
+        return int(last) - int(first) + 1
+    except ValueError:
+        return None
+
+
+def report_span(span: Span, on_span: Sequence[Callable[[Span], None]], slow_ms: float):
+    """Add a finished span to the current trace, pass it to the callbacks and log it if slow"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.spans.append(span)
+    for callback in on_span:
+        callback(span)
+
+    if span.duration_ms >= slow_ms:
+        where = f" during {trace.method} {trace.path}" if trace is not None else ""
+        logger.warning(
+            f"Slow {span.service} {span.operation} on {span.target}: {span.duration_ms:.1f}ms{where}",
+            extra={"fields": {**span.__dict__, "request": f"{trace.method} {trace.path}" if trace else None}},
+        )
+    elif logger.isEnabledFor(logging.DEBUG):
+        logger.debug(f"{span.service} {span.operation} on {span.target}: {span.duration_ms:.1f}ms",
+                     extra={"fields": span.__dict__})
+
+
+class _CountingStream(httpx.AsyncByteStream):
+    """Counts response bytes and reports once the body is fully read and closed"""
+
+    def __init__(self, stream: httpx.AsyncByteStream, finish: Callable[[int], None]):
+        self._stream = stream
+        self._finish = finish
+        self._received = 0
+        self._finished = False
+
+    async def __aiter__(self):
+        async for chunk in self._stream:
+            self._received += len(chunk)
+            yield chunk
+
+    async def aclose(self) -> None:
+        try:
+            await self._stream.aclose()
+        finally:
+            if not self._finished:
+                self._finished = True
+                self._finish(self._received)
+
+
+class InstrumentedTransport(httpx.AsyncBaseTransport):
+    """Wraps a transport to time every round trip, body included, and record it as a Span"""
+
+    def __init__(self, transport: httpx.AsyncBaseTransport, slow_ms: float = 500.0,
+                 on_span: Sequence[Callable[[Span], None]] = ()):
+        self.transport = transport
+        self.slow_ms = slow_ms
+        self.on_span = list(on_span)
+
+    def _record(self, request: httpx.Request, response: Optional[httpx.Response], started: float, received: int):
+        service, target, operation = describe(request)
+        report_span(Span(
+            service=service,
+            target=target,
+            operation=operation,
+            status=response.status_code if response is not None else None,
+            rows=row_count(response),
+            bytes_sent=int(request.headers.get("content-length") or 0),
+            bytes_received=received,
+            duration_ms=(time.perf_counter() - started) * 1000,
+        ), self.on_span, self.slow_ms)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self.transport.handle_async_request(request)
+        except Exception:
+            self._record(request, None, started, 0)
+            raise
+        stream = _CountingStream(response.stream, lambda received: self._record(request, response, started, received))
+        return httpx.Response(
+            status_code=response.status_code,
+            headers=response.headers,
+            stream=stream,
+            extensions=response.extensions,
+        )
+
+    async def aclose(self) -> None:
+        await self.transport.aclose()
+
+
+class TracingMiddleware:
+    """Pure ASGI middleware that opens a Trace per request.
+
+    The trace is also put in scope["trace"] so outer middleware (the access
+    log) can summarise it, and per-service totals are sent as Server-Timing.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        trace = Trace(method=scope["method"], path=scope["path"])
+        scope["trace"] = trace
+        token = current_trace.set(trace)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start" and trace.spans:
+                totals = {}
+                for span in trace.spans:
+                    count, duration = totals.get(span.service, (0, 0.0))
+                    totals[span.service] = (count + 1, duration + span.duration_ms)
+                timing = ", ".join(
+                    f'{service};dur={duration:.1f};desc="{count} calls"'
+                    for service, (count, duration) in totals.items()
+                )
+                message = {**message, "headers": list(message["headers"]) + [(b"server-timing", timing.encode())]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_trace.reset(token)
@@ -6,6 +6,7 @@ import LoginPage from "./pages/LoginPage";
 import DashboardPage from "./pages/DashboardPage";
 import EditorPage from "./pages/EditorPage";
 import PreviewPage from "./pages/PreviewPage";
+import PublicPage from "./pages/PublicPage";
 
 // Auth guard component
 const ProtectedRoute = ({ children }) => {
@@ -46,6 +47,7 @@ function App() {
               </ProtectedRoute>
             } 
           />
+          <Route path="/site/:schoolSlug/:pageSlug" element={<PublicPage />} />
           <Route path="/" element={<Navigate to="/login" replace />} />
           <Route path="*" element={<Navigate to="/login" replace />} />
         </Routes>
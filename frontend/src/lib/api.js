@@ -54,18 +54,16 @@ export const getCurrentUser = async () => {
   return response.data;
 };
 
-// Schools - Using Supabase Data API
-export const getSchools = async () => {
-  const { data, error } = await supabase
-    .from('schools')
-    .select('*')
-    .order('created_at', { ascending: false })
-    .limit(100);
+// Schools
 
-  if (error) throw error;
-  return data || [];
+// Listings come from the backend one page at a time, newest first:
+// { items, next_cursor }; pass next_cursor back to get the following page
+export const listSchools = async ({ cursor, limit } = {}) => {
+  const response = await api.get('/schools', { params: { cursor, limit } });
+  return response.data;
 };
 
+// A single school is read and written directly through the Supabase Data API
 export const getSchool = async (id) => {
   const { data, error } = await supabase
     .from('schools')
@@ -110,49 +108,46 @@ export const deleteSchool = async (id) => {
   return { message: 'School deleted' };
 };
 
-// Pages - Using Supabase Data API
-export const getPages = async (schoolId) => {
-  let query = supabase
-    .from('pages')
-    .select('*')
-    .order('created_at', { ascending: false })
-    .limit(100);
-
-  if (schoolId) {
-    query = query.eq('school_id', schoolId);
-  }
-
-  const { data, error } = await query;
+// Pages
 
-  if (error) throw error;
+// Page summaries of a school (no components unless includeComponents is set)
+export const listPages = async (schoolId, { cursor, limit, includeComponents = false } = {}) => {
+  const response = await api.get(`/schools/${schoolId}/pages`, {
+    params: { cursor, limit, include: includeComponents ? 'components' : undefined },
+  });
+  return response.data;
+};
 
-  // Parse components from JSONB if it's a string
-  return (data || []).map(page => ({
-    ...page,
-    components: typeof page.components === 'string'
-      ? JSON.parse(page.components)
-      : page.components
-  }));
+// A school's page with the given slug, or null; reads the summaries one
+// cursor page at a time and stops as soon as the page turns up
+export const findPageBySlug = async (schoolId, slug) => {
+  let cursor;
+  do {
+    const page = await listPages(schoolId, { cursor });
+    const match = page.items.find((item) => item.slug === slug);
+    if (match) return match;
+    cursor = page.next_cursor;
+  } while (cursor);
+  return null;
 };
 
-export const getPage = async (id) => {
-  const { data, error } = await supabase
-    .from('pages')
-    .select('*')
-    .eq('id', id)
-    .single();
+// A single page is read and saved through the backend, which versions it:
+// getPage returns the page with its ETag, and updatePage sends that back as
+// If-Match, so saving over someone else's newer save fails with 412
+// (isConflict) instead of silently overwriting it
+const withEtag = (response) => ({
+  ...response.data,
+  etag: response.headers.etag || `"${response.data.version}"`,
+});
 
-  if (error) throw error;
+export const isConflict = (err) => err?.response?.status === 412;
 
-  // Parse components from JSONB if it's a string
-  return {
-    ...data,
-    components: typeof data.components === 'string'
-      ? JSON.parse(data.components)
-      : data.components
-  };
+export const getPage = async (id) => {
+  const response = await api.get(`/pages/${id}`);
+  return withEtag(response);
 };
 
+// New pages are inserted directly through the Supabase Data API
 export const createPage = async (pageData) => {
   // Convert components array to JSON string for JSONB storage
   const pageDataWithJson = {
@@ -179,31 +174,48 @@ export const createPage = async (pageData) => {
   };
 };
 
-export const updatePage = async (id, pageData) => {
-  // Convert components array to JSON string if present
-  const updateData = { ...pageData };
-  if (updateData.components !== undefined) {
-    updateData.components = typeof updateData.components === 'string'
-      ? updateData.components
-      : JSON.stringify(updateData.components);
-  }
+export const updatePage = async (id, pageData, { etag } = {}) => {
+  const response = await api.put(`/pages/${id}`, pageData, {
+    headers: etag ? { 'If-Match': etag } : {},
+  });
+  return withEtag(response);
+};
 
-  const { data, error } = await supabase
-    .from('pages')
-    .update(updateData)
-    .eq('id', id)
-    .select()
-    .single();
+// Revision history: every components change is a revision, newest first
+export const listPageRevisions = async (pageId, { cursor, limit } = {}) => {
+  const response = await api.get(`/pages/${pageId}/revisions`, { params: { cursor, limit } });
+  return response.data;
+};
 
-  if (error) throw error;
+export const getPageRevision = async (pageId, version) => {
+  const response = await api.get(`/pages/${pageId}/revisions/${version}`);
+  return response.data;
+};
 
-  // Parse components back from JSONB
-  return {
-    ...data,
-    components: typeof data.components === 'string'
-      ? JSON.parse(data.components)
-      : data.components
-  };
+// Make an old revision current again (recorded as a new revision)
+export const restorePageRevision = async (pageId, version) => {
+  const response = await api.post(`/pages/${pageId}/revisions/${version}/restore`);
+  return response.data;
+};
+
+// Pages and components of a school matching a query, best first; snippets mark matches with <mark>
+export const searchSchool = async (schoolId, q, { limit } = {}) => {
+  const response = await api.get(`/schools/${schoolId}/search`, { params: { q, limit } });
+  return response.data;
+};
+
+// Snapshot the page's saved content and make it what its public URL serves;
+// with an etag, only if nobody has saved the page since
+export const publishPage = async (id, { etag } = {}) => {
+  const response = await api.post(`/pages/${id}/publish`, null, {
+    headers: etag ? { 'If-Match': etag } : {},
+  });
+  return withEtag(response);
+};
+
+export const unpublishPage = async (id) => {
+  const response = await api.delete(`/pages/${id}/publish`);
+  return response.data;
 };
 
 export const deletePage = async (id) => {
@@ -249,6 +261,13 @@ export const getThemes = async () => {
   return response.data;
 };
 
+// Published page by slug: { school, theme, page } in one request, with the
+// theme already resolved and the components in order
+export const getPublicPage = async (schoolSlug, pageSlug) => {
+  const response = await api.get(`/public/${schoolSlug}/${pageSlug}`);
+  return response.data;
+};
+
 // School-specific themes
 export const getSchoolThemes = async (schoolId) => {
   try {
@@ -289,7 +308,14 @@ export const updateSchoolTheme = async (schoolId, themeData) => {
   return data;
 };
 
-// Image Upload - Using Supabase Storage
+// Image Upload - content-addressed through the backend
+const sha256Hex = async (file) => {
+  const digest = await crypto.subtle.digest('SHA-256', await file.arrayBuffer());
+  return Array.from(new Uint8Array(digest))
+    .map((byte) => byte.toString(16).padStart(2, '0'))
+    .join('');
+};
+
 export const uploadImage = async (file) => {
   // Validate file type
   const allowedTypes = ['image/jpeg', 'image/png', 'image/gif', 'image/webp'];
@@ -297,31 +323,29 @@ export const uploadImage = async (file) => {
     throw new Error('Invalid file type. Only JPEG, PNG, GIF, WebP allowed.');
   }
 
-  // Generate unique filename
-  const fileExt = file.name.split('.').pop();
-  const fileName = `${Math.random().toString(36).substring(2, 15)}_${Date.now()}.${fileExt}`;
-  const filePath = `uploads/${fileName}`;
-
-  // Upload to Supabase Storage
-  const { data, error } = await supabase.storage
-    .from('uploads')
-    .upload(filePath, file, {
-      cacheControl: '3600',
-      upsert: false
-    });
-
-  if (error) throw error;
-
-  // Get public URL
-  const { data: { publicUrl } } = supabase.storage
-    .from('uploads')
-    .getPublicUrl(filePath);
+  // Files the backend already stores are reused without sending the bytes again
+  if (window.crypto?.subtle) {
+    try {
+      const digest = await sha256Hex(file);
+      const response = await api.get(`/upload/${digest}`);
+      return response.data;
+    } catch (err) {
+      if (err.response?.status !== 404) {
+        console.warn('Upload lookup failed, uploading instead:', err.message);
+      }
+    }
+  }
 
-  return {
-    url: publicUrl,
-    filename: fileName,
-    path: filePath
-  };
+  const formData = new FormData();
+  formData.append('file', file);
+  try {
+    const response = await api.post('/upload', formData, {
+      headers: { 'Content-Type': 'multipart/form-data' },
+    });
+    return response.data;
+  } catch (err) {
+    throw new Error(err.response?.data?.detail || err.message);
+  }
 };
 
 // Seed
@@ -14,7 +14,7 @@ import {
   FileText,
   MoreVertical
 } from 'lucide-react';
-import { getSchools, getPages, createSchool, deleteSchool, createPage, seedData } from '../lib/api';
+import { listSchools, findPageBySlug, createSchool, deleteSchool, createPage, seedData } from '../lib/api';
 import {
   DropdownMenu,
   DropdownMenuContent,
@@ -33,8 +33,9 @@ import { Label } from '../components/ui/label';
 export default function DashboardPage() {
   const navigate = useNavigate();
   const [schools, setSchools] = useState([]);
-  const [pages, setPages] = useState({});
+  const [nextCursor, setNextCursor] = useState(null);
   const [loading, setLoading] = useState(true);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [searchQuery, setSearchQuery] = useState('');
   const [showNewSchool, setShowNewSchool] = useState(false);
   const [newSchoolName, setNewSchoolName] = useState('');
@@ -54,16 +55,10 @@ export default function DashboardPage() {
         // Ignore if already seeded
       }
 
-      const schoolsData = await getSchools();
-      setSchools(schoolsData);
-
-      // Load pages for each school
-      const pagesMap = {};
-      for (const school of schoolsData) {
-        const schoolPages = await getPages(school.id);
-        pagesMap[school.id] = schoolPages;
-      }
-      setPages(pagesMap);
+      // The first page of school summaries; each carries its page_count
+      const { items, next_cursor } = await listSchools();
+      setSchools(items);
+      setNextCursor(next_cursor);
     } catch (err) {
       console.error('Failed to load data:', err);
     } finally {
@@ -71,6 +66,31 @@ export default function DashboardPage() {
     }
   };
 
+  const loadMoreSchools = async () => {
+    setLoadingMore(true);
+    try {
+      const { items, next_cursor } = await listSchools({ cursor: nextCursor });
+      setSchools((loaded) => [...loaded, ...items]);
+      setNextCursor(next_cursor);
+    } catch (err) {
+      console.error('Failed to load schools:', err);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
+  // Pages are only looked up when a school is opened
+  const openHomePage = async (schoolId, view) => {
+    try {
+      const homePage = await findPageBySlug(schoolId, 'home');
+      if (homePage) {
+        navigate(`/${view}/${schoolId}/${homePage.id}`);
+      }
+    } catch (err) {
+      console.error('Failed to load pages:', err);
+    }
+  };
+
   const handleLogout = () => {
     localStorage.removeItem('cms_token');
     localStorage.removeItem('cms_user');
@@ -264,7 +284,7 @@ export default function DashboardPage() {
 
                 <div className="flex items-center gap-2 mb-4 text-sm text-slate-500">
                   <FileText className="w-4 h-4" />
-                  <span>{pages[school.id]?.length || 0} pages</span>
+                  <span>{school.page_count ?? 0} pages</span>
                 </div>
 
                 <div className="flex gap-2">
@@ -272,12 +292,7 @@ export default function DashboardPage() {
                     variant="default"
                     size="sm"
                     className="flex-1 bg-blue-600 hover:bg-blue-700"
-                    onClick={() => {
-                      const homePage = pages[school.id]?.find(p => p.slug === 'home');
-                      if (homePage) {
-                        navigate(`/editor/${school.id}/${homePage.id}`);
-                      }
-                    }}
+                    onClick={() => openHomePage(school.id, 'editor')}
                     data-testid={`edit-school-${school.id}`}
                   >
                     <Edit3 className="w-4 h-4 mr-2" />
@@ -286,12 +301,7 @@ export default function DashboardPage() {
                   <Button
                     variant="outline"
                     size="sm"
-                    onClick={() => {
-                      const homePage = pages[school.id]?.find(p => p.slug === 'home');
-                      if (homePage) {
-                        navigate(`/preview/${school.id}/${homePage.id}`);
-                      }
-                    }}
+                    onClick={() => openHomePage(school.id, 'preview')}
                     data-testid={`preview-school-${school.id}`}
                   >
                     <ExternalLink className="w-4 h-4" />
@@ -301,6 +311,19 @@ export default function DashboardPage() {
             ))}
           </div>
         )}
+
+        {!loading && nextCursor && (
+          <div className="flex justify-center mt-8">
+            <Button
+              variant="outline"
+              onClick={loadMoreSchools}
+              disabled={loadingMore}
+              data-testid="load-more-schools-btn"
+            >
+              {loadingMore ? 'Loading...' : 'Load more schools'}
+            </Button>
+          </div>
+        )}
       </main>
     </div>
   );
@@ -1,7 +1,7 @@
 import React, { useState, useEffect, useCallback } from 'react';
 import { useParams, useNavigate } from 'react-router-dom';
 import { EditorProvider, useEditor } from '../context/EditorContext';
-import { getPage, getSchool, updatePage, getComponentTemplates, getThemes, getSchoolComponents, getSchoolThemes, updateSchoolTheme } from '../lib/api';
+import { getPage, getSchool, updatePage, publishPage, isConflict, getComponentTemplates, getThemes, getSchoolComponents, getSchoolThemes, updateSchoolTheme } from '../lib/api';
 import { WidgetsSidebar } from '../components/editor/WidgetsSidebar';
 import { EditorCanvas } from '../components/editor/EditorCanvas';
 import { PropertiesPanel } from '../components/editor/PropertiesPanel';
@@ -37,6 +37,8 @@ function EditorContent() {
 
   const [school, setSchool] = useState(null);
   const [page, setPage] = useState(null);
+  // Version of the page this editor last loaded or saved, sent back as If-Match
+  const [pageEtag, setPageEtag] = useState(null);
   const [templates, setTemplates] = useState({ widgets: [], categories: [] });
   const [themes, setThemes] = useState([]);
   const [loading, setLoading] = useState(true);
@@ -98,6 +100,7 @@ function EditorContent() {
 
       if (pageData) {
         setPage(pageData);
+        setPageEtag(pageData.etag);
         // Ensure components is always an array
         let components = [];
         if (Array.isArray(pageData.components)) {
@@ -139,40 +142,66 @@ function EditorContent() {
     }
   };
 
+  const showConflict = useCallback(() => {
+    toast.error('Someone else saved this page since you opened it. Reload to see their changes; yours are not saved.', {
+      duration: 10000,
+      action: { label: 'Reload', onClick: () => loadData() },
+    });
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [schoolId, pageId]);
+
   const handleSave = useCallback(async () => {
     if (!pageId || saving || !components) return;
 
     setSaving(true);
     try {
-      await updatePage(pageId, { components: Array.isArray(components) ? components : [] });
+      const saved = await updatePage(
+        pageId,
+        { components: Array.isArray(components) ? components : [] },
+        { etag: pageEtag }
+      );
+      setPageEtag(saved.etag);
       setHasChanges(false);
       toast.success('Page saved successfully!');
     } catch (err) {
       console.error('Failed to save:', err);
-      toast.error('Failed to save page');
+      if (isConflict(err)) {
+        showConflict();
+      } else {
+        toast.error('Failed to save page');
+      }
     } finally {
       setSaving(false);
     }
-  }, [pageId, components, saving, setHasChanges]);
+  }, [pageId, components, saving, pageEtag, setHasChanges, showConflict]);
 
   const handlePublish = useCallback(async () => {
     if (!pageId || !components) return;
 
     setSaving(true);
     try {
-      await updatePage(pageId, {
-        components: Array.isArray(components) ? components : [],
-        is_published: true
-      });
+      // Both steps are conditional, so what gets published is exactly what this editor saved
+      const saved = await updatePage(
+        pageId,
+        { components: Array.isArray(components) ? components : [] },
+        { etag: pageEtag }
+      );
+      setPageEtag(saved.etag);
+      const published = await publishPage(pageId, { etag: saved.etag });
+      setPageEtag(published.etag);
       setHasChanges(false);
       toast.success('Page published successfully!');
     } catch (err) {
       console.error('Failed to publish:', err);
-      toast.error('Failed to publish page');
+      if (isConflict(err)) {
+        showConflict();
+      } else {
+        toast.error('Failed to publish page');
+      }
     } finally {
       setSaving(false);
     }
-  }, [pageId, components, setHasChanges]);
+  }, [pageId, components, pageEtag, setHasChanges, showConflict]);
 
   const handleThemeChange = async (themeId) => {
     const theme = themes.find(t => t.id === themeId);
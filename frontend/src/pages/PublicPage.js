@@ -0,0 +1,70 @@
+import React, { useState, useEffect } from 'react';
+import { useParams } from 'react-router-dom';
+import { getPublicPage } from '../lib/api';
+import { ComponentRenderer } from '../components/editor/ComponentRenderer';
+
+// A published page for visitors: one request loads the school, resolved theme and components
+export default function PublicPage() {
+  const { schoolSlug, pageSlug } = useParams();
+  const [bundle, setBundle] = useState(null);
+  const [loading, setLoading] = useState(true);
+
+  useEffect(() => {
+    loadData();
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [schoolSlug, pageSlug]);
+
+  const loadData = async () => {
+    setLoading(true);
+    try {
+      setBundle(await getPublicPage(schoolSlug, pageSlug));
+    } catch (err) {
+      console.error('Failed to load page:', err);
+      setBundle(null);
+    } finally {
+      setLoading(false);
+    }
+  };
+
+  if (loading) {
+    return (
+      <div className="flex items-center justify-center h-screen">
+        <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-blue-600"></div>
+      </div>
+    );
+  }
+
+  if (!bundle) {
+    return (
+      <div className="flex items-center justify-center h-screen">
+        <p className="text-slate-500">Page not found</p>
+      </div>
+    );
+  }
+
+  const { theme, page } = bundle;
+  const colors = theme.colors || {};
+
+  return (
+    <div
+      className="min-h-screen preview-mode"
+      data-testid="public-page"
+      style={{
+        '--primary': colors.primary,
+        '--secondary': colors.secondary,
+        '--accent': colors.accent,
+        background: colors.background,
+        color: colors.text,
+        fontFamily: theme.fontFamily,
+      }}
+    >
+      {page.components.map((component) => (
+        <ComponentRenderer
+          key={component.id}
+          component={component}
+          isPreview={true}
+        />
+      ))}
+    </div>
+  );
+}
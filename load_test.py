@@ -0,0 +1,296 @@
+#!/usr/bin/env python3
+"""
+Async load generator for the CleverBox API.
+
+By default the backend runs in this process against SupabaseStandIn (see
+supabase_standin.py), so no network or Supabase project is needed; the
+injected PostgREST/Storage latency stands in for the round trips. Pass
+--target to load a running server instead, or --database-url to run the
+in-process backend with DATA_BACKEND=postgres against a real database (Storage
+still goes to the stand-in) and compare it with the PostgREST path.
+
+Scenarios, each run by its own pool of virtual users until --duration ends:
+  editor   open a page, fetch the school's components and themes, then save
+           repeatedly (alternating full PUTs and JSON-Patch edits, both with If-Match)
+  reader   fetch published pages, revalidating with If-None-Match half the time
+  uploader bursts of concurrent image uploads, a share of them repeats
+
+Reports requests, errors, throughput and p50/p95/p99 latency per endpoint.
+
+    python load_test.py --duration 20 --editors 5 --readers 50 --uploaders 2 --rest-latency-ms 25
+"""
+import argparse
+import asyncio
+import io
+import json
+import os
+import random
+import sys
+import time
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from pathlib import Path
+
+import httpx
+
+ROOT_DIR = Path(__file__).parent
+COMPONENTS = [
+    {"type": "hero", "order": 0, "props": {"title": "Welcome", "subtitle": "Load test page"}},
+    {"type": "text", "order": 1, "props": {"content": "Lorem ipsum dolor sit amet. " * 40}},
+    {"type": "contact", "order": 2, "props": {"address": "1 School Lane", "phone": "555-0100"}},
+]
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.statuses = defaultdict(lambda: defaultdict(int))
+        self.errors = defaultdict(int)
+
+    async def request(self, client: httpx.AsyncClient, label: str, method: str, url: str, ok=(200, 201, 304), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = await client.request(method, url, **kwargs)
+        except httpx.HTTPError as e:
+            self.latencies[label].append(time.perf_counter() - started)
+            self.statuses[label][type(e).__name__] += 1
+            self.errors[label] += 1
+            return None
+        self.latencies[label].append(time.perf_counter() - started)
+        self.statuses[label][response.status_code] += 1
+        if response.status_code not in ok:
+            self.errors[label] += 1
+        # An in-process request served from cache never suspends; yield so one
+        # virtual user can't starve the others the way it can't over a socket
+        await asyncio.sleep(0)
+        return response
+
+    def report(self, elapsed: float) -> dict:
+        rows = {}
+        for label, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            rows[label] = {
+                "requests": len(ordered),
+                "errors": self.errors[label],
+                "rps": round(len(ordered) / elapsed, 1),
+                "p50_ms": round(percentile(ordered, 50) * 1000, 2),
+                "p95_ms": round(percentile(ordered, 95) * 1000, 2),
+                "p99_ms": round(percentile(ordered, 99) * 1000, 2),
+                "max_ms": round(ordered[-1] * 1000, 2),
+                "statuses": {str(status): count for status, count in self.statuses[label].items()},
+            }
+        return rows
+
+
+def percentile(ordered, pct):
+    """Nearest-rank percentile of an already sorted list"""
+    if not ordered:
+        return 0.0
+    rank = max(1, -(-len(ordered) * pct // 100))
+    return ordered[int(rank) - 1]
+
+
+def print_report(rows: dict, elapsed: float):
+    header = f"{'endpoint':<42} {'reqs':>7} {'errs':>5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+    print(f"\nRan for {elapsed:.1f}s")
+    print(header)
+    print("-" * len(header))
+    total = 0
+    for label, row in rows.items():
+        total += row["requests"]
+        print(f"{label:<42} {row['requests']:>7} {row['errors']:>5} {row['rps']:>8} "
+              f"{row['p50_ms']:>8} {row['p95_ms']:>8} {row['p99_ms']:>8} {row['max_ms']:>8}")
+    print("-" * len(header))
+    print(f"{'total':<42} {total:>7} {'':>5} {round(total / elapsed, 1):>8}")
+
+
+def make_image(seed: int) -> bytes:
+    """A small PNG whose bytes depend only on seed"""
+    from PIL import Image
+
+    rng = random.Random(seed)
+    image = Image.new("RGB", (640, 400), tuple(rng.randrange(256) for _ in range(3)))
+    for _ in range(20):
+        x, y = rng.randrange(600), rng.randrange(360)
+        image.paste(tuple(rng.randrange(256) for _ in range(3)), (x, y, x + 40, y + 40))
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+# ---- Scenarios ----
+
+async def editor(client: httpx.AsyncClient, stats: Stats, school: dict, page_id: str, saves: int, deadline: float,
+                 rng: random.Random):
+    while time.perf_counter() < deadline:
+        response = await stats.request(client, "GET /api/pages/{id}", "GET", f"/api/pages/{page_id}")
+        await stats.request(client, "GET /api/editor/{school}/components", "GET", f"/api/editor/{school['id']}/components")
+        await stats.request(client, "GET /api/editor/{school}/themes", "GET", f"/api/editor/{school['id']}/themes")
+        if response is None or response.status_code != 200:
+            continue
+        page = response.json()
+        etag = response.headers.get("etag")
+
+        for save in range(saves):
+            if time.perf_counter() >= deadline:
+                return
+            title = f"Edited {rng.randrange(1_000_000)}"
+            if save % 2 == 0:
+                page["components"][0]["props"]["title"] = title
+                response = await stats.request(
+                    client, "PUT /api/pages/{id}", "PUT", f"/api/pages/{page_id}",
+                    json={"components": page["components"]}, headers={"If-Match": etag} if etag else {},
+                )
+            else:
+                response = await stats.request(
+                    client, "PATCH /api/pages/{id}", "PATCH", f"/api/pages/{page_id}",
+                    json=[{"op": "replace", "path": "/components/0/props/title", "value": title}],
+                    headers={"If-Match": etag} if etag else {},
+                )
+            if response is None or response.status_code != 200:
+                break  # stale or failed: reopen the page
+            etag = response.headers.get("etag", etag)
+            # Think time between saves, as the editor's autosave would have
+            await asyncio.sleep(rng.uniform(0.01, 0.05))
+
+
+async def reader(client: httpx.AsyncClient, stats: Stats, school: dict, slugs: list, deadline: float,
+                 rng: random.Random):
+    etags = {}
+    while time.perf_counter() < deadline:
+        slug = rng.choice(slugs)
+        headers = {"Accept-Encoding": "gzip, br"}
+        # Half the visits load the rendered HTML, half the JSON bundle the React app renders
+        if rng.random() < 0.5:
+            key, name, path = ("html", slug), "GET /sites/{school}/{page}", f"/sites/{school['slug']}/{slug}"
+        else:
+            key, name, path = ("json", slug), "GET /api/public/{school}/{page}", f"/api/public/{school['slug']}/{slug}"
+        if key in etags and rng.random() < 0.5:
+            headers["If-None-Match"] = etags[key]
+        response = await stats.request(client, name, "GET", path, headers=headers)
+        if response is not None and response.headers.get("etag"):
+            etags[key] = response.headers["etag"]
+
+
+async def uploader(client: httpx.AsyncClient, stats: Stats, images: list, burst: int, repeat_share: float,
+                   deadline: float, rng: random.Random):
+    fresh = 0
+    while time.perf_counter() < deadline:
+        batch = []
+        for _ in range(burst):
+            if rng.random() < repeat_share or fresh >= len(images):
+                batch.append(rng.choice(images[:max(1, fresh)]))
+            else:
+                batch.append(images[fresh])
+                fresh += 1
+        await asyncio.gather(*(
+            stats.request(client, "POST /api/upload", "POST", "/api/upload",
+                          files={"file": ("photo.png", data, "image/png")})
+            for data in batch
+        ))
+        await asyncio.sleep(rng.uniform(0.2, 0.5))
+
+
+# ---- Setup ----
+
+@asynccontextmanager
+async def in_process_client(args):
+    """Start the backend in this process, its data store replaced by the in-memory stand-in"""
+    os.environ.setdefault("SUPABASE_URL", "http://supabase.standin")
+    os.environ.setdefault("SUPABASE_KEY", "standin-key")
+    os.environ.setdefault("LOG_LEVEL", "ERROR")
+    if args.database_url:
+        os.environ["DATA_BACKEND"] = "postgres"
+        os.environ["DATABASE_URL"] = args.database_url
+    sys.path.insert(0, str(ROOT_DIR / "backend"))
+    from supabase_standin import SupabaseStandIn
+    import server
+
+    standin = SupabaseStandIn(args.rest_latency_ms, args.storage_latency_ms, args.jitter_ms, seed=args.seed)
+    # Installed before startup, so the lifespan handler builds the clients on top of it
+    server.datastore_transport.transport = standin
+    # ASGITransport doesn't send lifespan events, so run startup/shutdown here
+    async with server.app.router.lifespan_context(server.app):
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app),
+                                     base_url="http://cleverbox.test", timeout=60) as client:
+            client.standin = standin
+            yield client
+
+
+async def setup(client: httpx.AsyncClient, pages: int, run_id: str):
+    """Create a school for this run with published pages, one per editor"""
+    response = await client.post("/api/schools", json={"name": f"Load Test {run_id}", "slug": f"load-test-{run_id}"})
+    response.raise_for_status()
+    school = response.json()
+    operations = [
+        {"op": "create", "data": {
+            "school_id": school["id"], "name": f"Load {i}", "slug": f"load-{i}",
+            "components": COMPONENTS, "is_published": True,
+        }}
+        for i in range(pages)
+    ]
+    response = await client.post("/api/pages/batch", json={"operations": operations})
+    response.raise_for_status()
+    page_ids = [item["id"] for item in response.json()["results"] if item["status"] == 201]
+    if len(page_ids) < pages:
+        raise RuntimeError(f"Could not create the load-test pages: {response.json()['results']}")
+    return school, page_ids
+
+
+async def run(args):
+    connection = httpx.AsyncClient(base_url=args.target, timeout=60) if args.target else in_process_client(args)
+    rng = random.Random(args.seed)
+    async with connection as client:
+        school, page_ids = await setup(client, max(args.editors, 1), f"{int(time.time())}-{args.seed}")
+        slugs = [f"load-{i}" for i in range(len(page_ids))]
+        images = [make_image(args.seed * 1000 + i) for i in range(args.images)] if args.uploaders else []
+
+        stats = Stats()
+        started = time.perf_counter()
+        deadline = started + args.duration
+        workers = [
+            editor(client, stats, school, page_ids[i % len(page_ids)], args.saves, deadline, random.Random(rng.random()))
+            for i in range(args.editors)
+        ] + [
+            reader(client, stats, school, slugs, deadline, random.Random(rng.random()))
+            for _ in range(args.readers)
+        ] + [
+            uploader(client, stats, images, args.burst, args.repeat_share, deadline, random.Random(rng.random()))
+            for _ in range(args.uploaders)
+        ]
+        await asyncio.gather(*workers)
+        elapsed = time.perf_counter() - started
+
+        rows = stats.report(elapsed)
+        print_report(rows, elapsed)
+        standin = getattr(client, "standin", None)
+        if standin is not None:
+            print("\nData-store calls:", ", ".join(f"{name}={count}" for name, count in standin.calls.most_common()))
+        await client.delete(f"/api/schools/{school['id']}")
+        if args.json:
+            Path(args.json).write_text(json.dumps({"elapsed": elapsed, "args": vars(args), "endpoints": rows}, indent=2))
+            print(f"Wrote {args.json}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0], formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", help="base URL of a running server; default runs the backend in-process")
+    parser.add_argument("--database-url", help="run the in-process backend on this Postgres with DATA_BACKEND=postgres")
+    parser.add_argument("--duration", type=float, default=15.0, help="seconds to run (default 15)")
+    parser.add_argument("--editors", type=int, default=4, help="concurrent editor sessions (default 4)")
+    parser.add_argument("--saves", type=int, default=10, help="saves per editor session before reopening (default 10)")
+    parser.add_argument("--readers", type=int, default=20, help="concurrent public readers (default 20)")
+    parser.add_argument("--uploaders", type=int, default=1, help="concurrent uploaders (default 1)")
+    parser.add_argument("--burst", type=int, default=5, help="uploads sent together per burst (default 5)")
+    parser.add_argument("--images", type=int, default=20, help="distinct images to draw uploads from (default 20)")
+    parser.add_argument("--repeat-share", type=float, default=0.3, help="share of uploads that repeat an image (default 0.3)")
+    parser.add_argument("--rest-latency-ms", type=float, default=20.0, help="injected PostgREST latency (default 20)")
+    parser.add_argument("--storage-latency-ms", type=float, default=40.0, help="injected Storage latency (default 40)")
+    parser.add_argument("--jitter-ms", type=float, default=5.0, help="uniform jitter added to each call (default 5)")
+    parser.add_argument("--seed", type=int, default=1, help="random seed (default 1)")
+    parser.add_argument("--json", help="also write the report to this file")
+    asyncio.run(run(parser.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Cold-start budget check for the backend.
+
+Starts fresh interpreters that import backend/server.py, run the lifespan
+startup and serve a first request that reaches the data store (an in-memory
+stand-in, so no network is involved), then compares the median timings with
+the budgets. Exits 1 when either budget is exceeded, so it can gate CI.
+
+    python startup_check.py                      # 5 runs, default budgets
+    python startup_check.py --runs 9 --import-budget-ms 600 --request-budget-ms 150
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT_DIR = Path(__file__).parent
+
+
+def measure():
+    """Runs in the child interpreter: print import, startup and first-request times as JSON"""
+    import asyncio
+
+    started = time.perf_counter()
+    sys.path.insert(0, str(ROOT_DIR / "backend"))
+    import server
+    import_ms = (time.perf_counter() - started) * 1000
+
+    import httpx
+    sys.path.insert(0, str(ROOT_DIR))
+    from supabase_standin import SupabaseStandIn
+    server.datastore_transport.transport = SupabaseStandIn(0, 0, 0)
+
+    async def first_request():
+        started = time.perf_counter()
+        async with server.app.router.lifespan_context(server.app):
+            startup_ms = (time.perf_counter() - started) * 1000
+            async with httpx.AsyncClient(transport=httpx.ASGITransport(app=server.app), base_url="http://check") as client:
+                started = time.perf_counter()
+                # A route that goes through the repository, missing school so it needs no data
+                response = await client.get("/api/editor/00000000-0000-0000-0000-000000000000/components")
+                request_ms = (time.perf_counter() - started) * 1000
+                if response.status_code != 404:
+                    raise RuntimeError(f"Unexpected first response: {response.status_code} {response.text[:200]}")
+        return startup_ms, request_ms
+
+    startup_ms, request_ms = asyncio.run(first_request())
+    print(json.dumps({"import_ms": import_ms, "startup_ms": startup_ms, "request_ms": request_ms}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to time (default 5)")
+    parser.add_argument("--import-budget-ms", type=float, default=800.0,
+                        help="median budget for importing server.py (default 800)")
+    parser.add_argument("--request-budget-ms", type=float, default=400.0,
+                        help="median budget for lifespan startup plus the first request (default 400)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure()
+        return
+
+    env = {
+        **os.environ,
+        "SUPABASE_URL": "http://supabase.standin",
+        "SUPABASE_KEY": "standin-key",
+        "DATA_BACKEND": "postgrest",
+        "STORAGE_BACKEND": "supabase",
+        "LOG_LEVEL": "ERROR",
+    }
+    samples = []
+    for _ in range(args.runs):
+        result = subprocess.run([sys.executable, __file__, "--child"], env=env, capture_output=True, text=True)
+        if result.returncode != 0:
+            print(result.stdout + result.stderr, file=sys.stderr)
+            sys.exit(f"Startup failed (exit code {result.returncode})")
+        samples.append(json.loads(result.stdout.strip().splitlines()[-1]))
+
+    import_ms = statistics.median(sample["import_ms"] for sample in samples)
+    startup_ms = statistics.median(sample["startup_ms"] for sample in samples)
+    request_ms = statistics.median(sample["request_ms"] for sample in samples)
+    first_request_ms = statistics.median(sample["startup_ms"] + sample["request_ms"] for sample in samples)
+
+    print(f"Median of {args.runs} runs:")
+    print(f"  import server.py        {import_ms:8.1f} ms  (budget {args.import_budget_ms:.0f} ms)")
+    print(f"  lifespan startup        {startup_ms:8.1f} ms")
+    print(f"  first request           {request_ms:8.1f} ms")
+    print(f"  startup + first request {first_request_ms:8.1f} ms  (budget {args.request_budget_ms:.0f} ms)")
+
+    failures = []
+    if import_ms > args.import_budget_ms:
+        failures.append(f"import took {import_ms:.0f} ms, over the {args.import_budget_ms:.0f} ms budget")
+    if first_request_ms > args.request_budget_ms:
+        failures.append(f"startup + first request took {first_request_ms:.0f} ms, "
+                        f"over the {args.request_budget_ms:.0f} ms budget")
+    if failures:
+        sys.exit("Startup budget exceeded: " + "; ".join(failures))
+    print("Within budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,705 @@
+#!/usr/bin/env python3
+"""
+In-process stand-in for the Supabase PostgREST and Storage endpoints the
+backend uses, for offline load tests and benchmarks.
+
+It is an httpx transport: plug it into the backend's HTTP client and every
+table query, RPC and storage call is answered from memory after an injected
+delay. Only the PostgREST features server.py relies on are emulated (eq/neq/
+gt/gte/lt/lte/in/is filters and or/and trees of them, select columns, order,
+limit/offset, single object responses, upserts, count=exact, Content-Range)
+plus the RPCs, generated columns and views from schema_v3 to schema_v11.
+"""
+import asyncio
+import copy
+import json
+import random
+import re
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional, Tuple
+
+import httpx
+
+# Primary key, unique column sets, defaults and foreign keys of the tables
+TABLES = {
+    "schools": {
+        "pk": "id",
+        "unique": [("slug",)],
+        "defaults": lambda: {"metadata": {}, "theme": "default", "logo_url": None,
+                             "primary_color": "#1D4ED8", "secondary_color": "#FBBF24"},
+    },
+    "pages": {
+        "pk": "id",
+        "unique": [("school_id", "slug")],
+        "defaults": lambda: {"components": [], "is_published": False, "theme": "default", "version": 1},
+        "references": ("school_id", "schools"),
+        "generated": lambda row: generated_page_columns(row.get("components")),
+    },
+    "assets": {"pk": "sha256", "unique": [], "defaults": dict},
+    "page_snapshots": {"pk": "hash", "unique": [], "defaults": dict, "references": ("page_id", "pages")},
+    "page_revisions": {
+        "pk": "id",
+        "unique": [("page_id", "version")],
+        "defaults": dict,
+        "references": ("page_id", "pages"),
+        "generated": lambda row: {"bytes": len(json.dumps(row["data"], separators=(", ", ": "), ensure_ascii=False).encode())},
+    },
+    "page_search_entries": {"pk": "id", "unique": [], "defaults": dict, "references": ("page_id", "pages")},
+    "published_pages": {
+        "pk": "page_id",
+        "unique": [("school_id", "slug")],
+        "defaults": dict,
+        "references": ("page_id", "pages"),
+    },
+}
+
+# mark_published_pages_stale() from schema_v9: school columns every snapshot includes
+BRANDING_COLUMNS = ("name", "slug", "logo_url", "theme", "primary_color", "secondary_color", "metadata")
+
+# Read-only views, computed from the tables on every query
+VIEWS = {
+    "school_summaries": lambda tables: [
+        {**school, "page_count": sum(1 for page in tables["pages"] if page["school_id"] == school["id"])}
+        for school in tables["schools"]
+    ],
+    "published_snapshots": lambda tables: [
+        {"school_slug": school["slug"], "page_slug": published["slug"], "school_id": published["school_id"],
+         "page_id": published["page_id"], "hash": snapshot["hash"], "body": snapshot["body"],
+         "published_at": published["published_at"], "stale": published["stale"]}
+        for published in tables["published_pages"]
+        for school in tables["schools"] if school["id"] == published["school_id"]
+        for snapshot in tables["page_snapshots"] if snapshot["hash"] == published["snapshot_hash"]
+    ],
+}
+
+
+def components_array(doc: Any) -> List[Any]:
+    """page_components_array() from schema_v8"""
+    if isinstance(doc, str):
+        try:
+            doc = json.loads(doc)
+        except ValueError:
+            return []
+    return doc if isinstance(doc, list) else []
+
+
+def generated_page_columns(components: Any) -> Dict[str, int]:
+    doc = components_array(components)
+    # jsonb's text form, which separates with ", " and ": "
+    text = json.dumps(doc, separators=(", ", ": "), ensure_ascii=False)
+    return {"component_count": len(doc), "components_bytes": len(text.encode())}
+
+
+# component_search_text() from schema_v11: props that aren't prose
+NON_TEXT_KEY = re.compile(r"(^id|src|url|link|href|image|icon|color|variant|align|size|width|height|style)s?$", re.I)
+NON_TEXT_VALUE = re.compile(r"^(https?:|mailto:|tel:|/|#)", re.I)
+SNIPPET_WORDS = 24
+
+
+def component_search_text(doc: Any, key: Optional[str] = None) -> Optional[str]:
+    if isinstance(doc, str):
+        if (key and NON_TEXT_KEY.search(key)) or NON_TEXT_VALUE.search(doc):
+            return None
+        return doc
+    if isinstance(doc, dict):
+        parts = [component_search_text(value, k) for k, value in doc.items()]
+    elif isinstance(doc, list):
+        parts = [component_search_text(value, key) for value in doc]
+    else:
+        return None
+    parts = [part for part in parts if part]
+    return " ".join(parts) if parts else None
+
+
+def search_term(word: str) -> str:
+    """A crude stand-in for the english stemmer: lowercase, no plural s"""
+    word = word.lower()
+    return word[:-1] if len(word) > 3 and word.endswith("s") and not word.endswith("ss") else word
+
+
+def parse_websearch(query: str) -> List[Tuple[List[str], List[str]]]:
+    """websearch_to_tsquery, roughly: OR-separated groups of (required terms, excluded terms)"""
+    groups: List[Tuple[List[str], List[str]]] = [([], [])]
+    for token in re.findall(r'-?"[^"]*"?|\S+', query):
+        if token.lower() == "or":
+            groups.append(([], []))
+            continue
+        excluded = token.startswith("-")
+        terms = [search_term(word) for word in re.findall(r"\w+", token)]
+        groups[-1][1 if excluded else 0].extend(terms)
+    return [group for group in groups if group[0]]
+
+
+def now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class PostgrestError(Exception):
+    def __init__(self, status: int, code: str, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+        self.message = message
+
+
+def coerce(raw: str, like: Any) -> Any:
+    """Convert a filter value from the query string to the type of the stored value"""
+    if isinstance(like, bool):
+        return raw.lower() == "true"
+    if isinstance(like, int):
+        try:
+            return int(raw)
+        except ValueError:
+            return raw
+    if isinstance(like, float):
+        return float(raw)
+    return raw
+
+
+def split_top_level(text: str) -> List[str]:
+    """Split a logic tree's conditions on the commas outside parentheses and quotes"""
+    parts, depth, quoted, current = [], 0, False, ""
+    for char in text:
+        if char == '"':
+            quoted = not quoted
+        elif not quoted and char == "(":
+            depth += 1
+        elif not quoted and char == ")":
+            depth -= 1
+        elif not quoted and depth == 0 and char == ",":
+            parts.append(current)
+            current = ""
+            continue
+        current += char
+    return parts + [current]
+
+
+def matches_tree(row: Dict[str, Any], operator: str, raw: str) -> bool:
+    """Evaluate an or=(...) / and=(...) condition list"""
+    results = []
+    for condition in split_top_level(raw.strip()[1:-1]):
+        if condition.startswith(("or(", "and(")):
+            name, _, rest = condition.partition("(")
+            results.append(matches_tree(row, name, "(" + rest))
+        else:
+            column, op, value = condition.split(".", 2)
+            results.append(matches(row, [(column, op, value.strip('"'))]))
+    return any(results) if operator == "or" else all(results)
+
+
+def matches(row: Dict[str, Any], filters: List[Tuple[str, str, str]]) -> bool:
+    for column, op, raw in filters:
+        if column in ("or", "and"):
+            if not matches_tree(row, column, raw):
+                return False
+            continue
+        value = row.get(column)
+        if op == "is":
+            if raw == "null" and value is not None:
+                return False
+            if raw in ("true", "false") and value is not (raw == "true"):
+                return False
+            continue
+        if op == "in":
+            options = [item.strip().strip('"') for item in raw.strip("()").split(",")]
+            text = str(value).lower() if isinstance(value, bool) else str(value)
+            if text not in options:
+                return False
+            continue
+        if value is None:
+            return False
+        target = coerce(raw, value)
+        if op == "eq" and not value == target:
+            return False
+        if op == "neq" and not value != target:
+            return False
+        if op == "gt" and not value > target:
+            return False
+        if op == "gte" and not value >= target:
+            return False
+        if op == "lt" and not value < target:
+            return False
+        if op == "lte" and not value <= target:
+            return False
+    return True
+
+
+def json_response(status: int, body: Any, headers: Optional[Dict[str, str]] = None) -> httpx.Response:
+    return httpx.Response(status, content=json.dumps(body, default=str).encode(),
+                          headers={"content-type": "application/json", **(headers or {})})
+
+
+class SupabaseStandIn(httpx.AsyncBaseTransport):
+    """Answers PostgREST and Storage requests from memory after an injected delay.
+
+    rest_latency_ms / storage_latency_ms are added to every call, plus up to
+    jitter_ms of uniform noise.
+    """
+
+    def __init__(self, rest_latency_ms: float = 0.0, storage_latency_ms: float = 0.0,
+                 jitter_ms: float = 0.0, seed: Optional[int] = None):
+        self.rest_latency_ms = rest_latency_ms
+        self.storage_latency_ms = storage_latency_ms
+        self.jitter_ms = jitter_ms
+        self.random = random.Random(seed)
+        self.tables: Dict[str, List[Dict[str, Any]]] = {name: [] for name in TABLES}
+        self.objects: Dict[str, Tuple[bytes, str]] = {}
+        self.calls: Counter = Counter()
+        self.rpcs = {
+            "apply_page_batch": self.rpc_apply_page_batch,
+            "patch_page_components": self.rpc_patch_page_components,
+            "set_school_metadata_key": self.rpc_set_school_metadata_key,
+            "publish_page_snapshot": self.rpc_publish_page_snapshot,
+            "refresh_published_snapshot": self.rpc_refresh_published_snapshot,
+            "unpublish_page": self.rpc_unpublish_page,
+            "page_revision_chain": self.rpc_page_revision_chain,
+            "search_school_pages": self.rpc_search_school_pages,
+        }
+
+    async def _delay(self, base_ms: float):
+        delay = base_ms + (self.random.uniform(0, self.jitter_ms) if self.jitter_ms else 0)
+        if delay > 0:
+            await asyncio.sleep(delay / 1000)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        body = await request.aread()
+        path = request.url.path
+        if path.startswith("/storage/v1/"):
+            await self._delay(self.storage_latency_ms)
+            response = self.handle_storage(request, body)
+        elif path.startswith("/rest/v1/"):
+            await self._delay(self.rest_latency_ms)
+            try:
+                response = self.handle_rest(request, body)
+            except PostgrestError as e:
+                response = json_response(e.status, {"code": e.code, "message": e.message, "details": None, "hint": None})
+        else:
+            response = httpx.Response(404)
+        return response
+
+    # ---- PostgREST ----
+
+    def handle_rest(self, request: httpx.Request, body: bytes) -> httpx.Response:
+        name = request.url.path[len("/rest/v1/"):]
+        if name.startswith("rpc/"):
+            function = name[len("rpc/"):]
+            self.calls[f"rpc {function}"] += 1
+            if function not in self.rpcs:
+                raise PostgrestError(404, "PGRST202", f"Could not find the function public.{function}")
+            return json_response(200, self.rpcs[function](json.loads(body or b"{}")))
+
+        if name in VIEWS:
+            if request.method not in ("GET", "HEAD"):
+                raise PostgrestError(405, "PGRST117", f"View {name} is read-only")
+            rows = VIEWS[name](self.tables)
+        elif name in self.tables:
+            rows = self.tables[name]
+        else:
+            raise PostgrestError(404, "42P01", f'relation "public.{name}" does not exist')
+        params = request.url.params
+        prefer = request.headers.get("prefer", "")
+        single = "vnd.pgrst.object" in request.headers.get("accept", "")
+        filters = [
+            (key, None, value) if key in ("or", "and") else (key, *value.split(".", 1))
+            for key, value in params.multi_items()
+            if key not in ("select", "order", "limit", "offset", "on_conflict", "columns")
+        ]
+        self.calls[f"{request.method} {name}"] += 1
+
+        if request.method in ("GET", "HEAD"):
+            result = [row for row in rows if matches(row, filters)]
+            total = len(result)
+            for clause in reversed(params.get("order", "").split(",") if params.get("order") else []):
+                column, _, direction = clause.partition(".")
+                present = [row for row in result if row.get(column) is not None]
+                missing = [row for row in result if row.get(column) is None]
+                present.sort(key=lambda row: row[column], reverse=direction.startswith("desc"))
+                result = present + missing
+            offset = int(params.get("offset", 0))
+            result = result[offset:]
+            if "limit" in params:
+                result = result[:int(params["limit"])]
+        elif request.method == "POST":
+            payload = json.loads(body)
+            result = self.insert(name, payload if isinstance(payload, list) else [payload],
+                                 params.get("on_conflict"), prefer)
+            total = len(result)
+        elif request.method == "PATCH":
+            changes = json.loads(body)
+            result = []
+            for row in rows:
+                if matches(row, filters):
+                    old = copy.deepcopy(row)
+                    row.update(copy.deepcopy(changes))
+                    self.touch(name, row, old)
+                    result.append(row)
+            total = len(result)
+        elif request.method == "DELETE":
+            result = [row for row in rows if matches(row, filters)]
+            self.tables[name] = [row for row in rows if not matches(row, filters)]
+            self.cascade()
+            total = len(result)
+        else:
+            raise PostgrestError(405, "PGRST117", f"Unsupported method {request.method}")
+
+        result = [self.project(row, params.get("select")) for row in result]
+        headers = {}
+        count = total if "count=exact" in prefer else "*"
+        headers["content-range"] = f"0-{len(result) - 1}/{count}" if result else f"*/{count}"
+        if request.method in ("POST", "PATCH", "DELETE") and "return=representation" not in prefer:
+            return httpx.Response(201 if request.method == "POST" else 204, headers=headers)
+        if single:
+            if len(result) != 1:
+                raise PostgrestError(406, "PGRST116", "JSON object requested, multiple (or no) rows returned")
+            return json_response(200, result[0], headers)
+        return json_response(201 if request.method == "POST" else 200, result, headers)
+
+    @staticmethod
+    def project(row: Dict[str, Any], select: Optional[str]) -> Dict[str, Any]:
+        if not select or select.strip() == "*":
+            return copy.deepcopy(row)
+        columns = [column.strip() for column in select.split(",")]
+        return {column: copy.deepcopy(row.get(column)) for column in columns}
+
+    def touch(self, table: str, row: Dict[str, Any], old: Optional[Dict[str, Any]] = None):
+        """What the update triggers do"""
+        if table == "pages":
+            row["version"] = row.get("version", 1) + 1
+            row["updated_at"] = now()
+            self.record_revision(row)
+            self.index_page(row)
+        if table == "schools" and old is not None and any(old.get(c) != row.get(c) for c in BRANDING_COLUMNS):
+            for published in self.tables["published_pages"]:
+                if published["school_id"] == row["id"]:
+                    published["stale"] += 1
+        self.generate(table, row)
+
+    @staticmethod
+    def generate(table: str, row: Dict[str, Any]):
+        """Recompute the table's generated columns"""
+        if "generated" in TABLES[table]:
+            row.update(TABLES[table]["generated"](row))
+
+    def insert(self, table: str, payload: List[Dict[str, Any]], on_conflict: Optional[str], prefer: str):
+        spec = TABLES[table]
+        rows = self.tables[table]
+        inserted = []
+        for item in payload:
+            row = {spec["pk"]: str(uuid.uuid4()), **spec["defaults"](), "created_at": now(), **copy.deepcopy(item)}
+            if table == "pages":
+                row.setdefault("updated_at", row["created_at"])
+            reference = spec.get("references")
+            if reference and not any(r["id"] == row.get(reference[0]) for r in self.tables[reference[1]]):
+                raise PostgrestError(409, "23503", f'insert or update on table "{table}" violates foreign key constraint')
+            keys = [(spec["pk"],)] + spec["unique"]
+            conflict = next(
+                (existing for existing in rows for key in keys
+                 if all(existing.get(column) == row.get(column) for column in key)),
+                None,
+            )
+            if conflict is not None:
+                if on_conflict and "resolution=ignore-duplicates" in prefer:
+                    continue
+                if on_conflict and "resolution=merge-duplicates" in prefer:
+                    old = copy.deepcopy(conflict)
+                    conflict.update(copy.deepcopy(item))
+                    self.touch(table, conflict, old)
+                    inserted.append(conflict)
+                    continue
+                raise PostgrestError(409, "23505", f'duplicate key value violates unique constraint on "{table}"')
+            self.generate(table, row)
+            rows.append(row)
+            inserted.append(row)
+            if table == "pages":
+                self.record_revision(row)
+                self.index_page(row)
+        return inserted
+
+    def cascade(self):
+        """ON DELETE CASCADE: drop rows whose referenced row is gone, down the chain"""
+        removed = True
+        while removed:
+            removed = False
+            for table, spec in TABLES.items():
+                if "references" not in spec:
+                    continue
+                column, parent = spec["references"]
+                keys = {row[TABLES[parent]["pk"]] for row in self.tables[parent]}
+                kept = [row for row in self.tables[table] if row.get(column) in keys]
+                if len(kept) < len(self.tables[table]):
+                    self.tables[table] = kept
+                    removed = True
+
+    def record_revision(self, page: Dict[str, Any]):
+        """What record_page_revision() from schema_v10 does after a page is written"""
+        doc = components_array(page.get("components"))
+        chain = self.rpc_page_revision_chain({"p_page_id": page["id"], "p_version": page["version"] - 1})
+        previous = self.materialize(chain)
+        if chain and previous == doc:
+            return
+        kind, data = "keyframe", doc
+        addressable = all(isinstance(c, dict) and isinstance(c.get("id"), str) for c in doc + previous) \
+            and len({c["id"] for c in doc}) == len(doc) and len({c["id"] for c in previous}) == len(previous)
+        if 1 <= len(chain) <= 20 and addressable:
+            delta = {"order": [c["id"] for c in doc], "changed": {c["id"]: c for c in doc if c not in previous}}
+            if len(json.dumps(delta)) < len(json.dumps(doc)):
+                kind, data = "delta", delta
+        self.tables["page_revisions"] = [r for r in self.tables["page_revisions"]
+                                         if (r["page_id"], r["version"]) != (page["id"], page["version"])]
+        self.insert("page_revisions", [{"page_id": page["id"], "version": page["version"], "kind": kind,
+                                        "data": copy.deepcopy(data)}], None, "")
+
+    def index_page(self, page: Dict[str, Any]):
+        """What refresh_page_search() from schema_v11 does after a page is written"""
+        entries = [{"page_id": page["id"], "school_id": page["school_id"], "component_id": None,
+                    "component_type": "page", "position": -1, "content": page.get("name") or ""}]
+        for position, component in enumerate(components_array(page.get("components"))):
+            if isinstance(component, dict):
+                entries.append({"page_id": page["id"], "school_id": page["school_id"],
+                                "component_id": component.get("id"), "component_type": component.get("type") or "unknown",
+                                "position": position, "content": component_search_text(component.get("props")) or ""})
+        self.tables["page_search_entries"] = [row for row in self.tables["page_search_entries"]
+                                              if row["page_id"] != page["id"]]
+        self.tables["page_search_entries"].extend(
+            {"id": str(uuid.uuid4()), **entry} for entry in entries if entry["content"])
+
+    @staticmethod
+    def materialize(chain: List[Dict[str, Any]]) -> List[Any]:
+        components: List[Any] = []
+        for revision in chain:
+            if revision["kind"] == "keyframe":
+                components = copy.deepcopy(revision["data"])
+            else:
+                by_id = {c["id"]: c for c in components}
+                by_id.update(copy.deepcopy(revision["data"]["changed"]))
+                components = [by_id[i] for i in revision["data"]["order"]]
+        return components
+
+    def find(self, table: str, key: Any) -> Optional[Dict[str, Any]]:
+        pk = TABLES[table]["pk"]
+        return next((row for row in self.tables[table] if row[pk] == key), None)
+
+    # ---- RPCs ----
+
+    def rpc_set_school_metadata_key(self, params):
+        school = self.find("schools", params["p_school_id"])
+        if school is None:
+            return False
+        old = copy.deepcopy(school)
+        metadata = school.get("metadata") or {}
+        if isinstance(metadata, str):
+            metadata = json.loads(metadata)
+        metadata[params["p_key"]] = params["p_value"]
+        school["metadata"] = metadata
+        self.touch("schools", school, old)
+        return True
+
+    def rpc_patch_page_components(self, params):
+        page = self.find("pages", params["p_page_id"])
+        if page is None:
+            return []
+        expected = params.get("p_expected_version")
+        if expected is not None and expected != page["version"]:
+            raise PostgrestError(412, "PT412", f"Page version is {page['version']}, expected {expected}")
+        doc = page.get("components")
+        doc = copy.deepcopy(json.loads(doc) if isinstance(doc, str) else doc or [])
+        for op in params["p_ops"]:
+            doc = apply_patch_operation(doc, op)
+        for index, component in enumerate(doc):
+            if isinstance(component, dict):
+                component["order"] = index
+        page["components"] = doc
+        self.touch("pages", page)
+        return [{"id": page["id"], "version": page["version"], "updated_at": page["updated_at"]}]
+
+    def rpc_apply_page_batch(self, params):
+        results = []
+        for index, op in enumerate(params["p_ops"]):
+            try:
+                if op["op"] == "create":
+                    data = op["data"]
+                    row = self.insert("pages", [{**data, "components": data.get("components") or []}], None, "")[0]
+                    results.append({"index": index, "op": "create", "status": 201, "id": row["id"], "version": row["version"]})
+                elif op["op"] == "update":
+                    page = self.find("pages", op["id"])
+                    if page is None:
+                        status, version = 404, None
+                    elif op.get("version") is not None and op["version"] != page["version"]:
+                        status, version = 412, None
+                    else:
+                        page.update({k: v for k, v in op.get("data", {}).items() if v is not None})
+                        self.touch("pages", page)
+                        status, version = 200, page["version"]
+                    results.append({"index": index, "op": "update", "status": status, "id": op["id"], "version": version})
+                elif op["op"] == "delete":
+                    before = len(self.tables["pages"])
+                    self.tables["pages"] = [page for page in self.tables["pages"] if page["id"] != op["id"]]
+                    status = 200 if len(self.tables["pages"]) < before else 404
+                    self.cascade()
+                    results.append({"index": index, "op": "delete", "status": status, "id": op["id"], "version": None})
+                else:
+                    raise PostgrestError(400, "22023", f"Unsupported batch operation {op['op']}")
+            except PostgrestError as e:
+                status = {"23505": 409, "23503": 422}.get(e.code, 400)
+                results.append({"index": index, "op": op.get("op"), "id": op.get("id") or op.get("data", {}).get("id"),
+                                "status": status, "error": e.message})
+        return results
+
+    def rpc_publish_page_snapshot(self, params):
+        page = self.find("pages", params["p_page_id"])
+        if page is None:
+            return []
+        if page["version"] != params["p_version"]:
+            raise PostgrestError(412, "PT412", f"Page version is {page['version']}, expected {params['p_version']}")
+        if self.find("page_snapshots", params["p_hash"]) is None:
+            self.insert("page_snapshots", [{"hash": params["p_hash"], "page_id": page["id"], "body": params["p_body"]}],
+                        None, "")
+        published_at = now()
+        self.tables["published_pages"] = [
+            row for row in self.tables["published_pages"]
+            if row["page_id"] != page["id"] and (row["school_id"], row["slug"]) != (page["school_id"], page["slug"])
+        ]
+        self.tables["published_pages"].append({"page_id": page["id"], "school_id": page["school_id"], "slug": page["slug"],
+                                               "snapshot_hash": params["p_hash"], "published_at": published_at,
+                                               "stale": 0})
+        if page.get("is_published") is not True:
+            page["is_published"] = True
+            self.touch("pages", page)
+        return [{"hash": params["p_hash"], "version": page["version"], "published_at": published_at}]
+
+    def rpc_refresh_published_snapshot(self, params):
+        if self.find("page_snapshots", params["p_hash"]) is None:
+            self.insert("page_snapshots", [{"hash": params["p_hash"], "page_id": params["p_page_id"],
+                                            "body": params["p_body"]}], None, "")
+        for published in self.tables["published_pages"]:
+            if (published["page_id"] == params["p_page_id"] and published["snapshot_hash"] == params["p_old_hash"]
+                    and published["stale"] == params["p_stale"]):
+                published.update(snapshot_hash=params["p_hash"], stale=0)
+                return True
+        return False
+
+    def rpc_unpublish_page(self, params):
+        page = self.find("pages", params["p_page_id"])
+        self.tables["published_pages"] = [row for row in self.tables["published_pages"]
+                                          if row["page_id"] != params["p_page_id"]]
+        if page is not None and page.get("is_published") is not False:
+            page["is_published"] = False
+            self.touch("pages", page)
+        return page is not None
+
+    def rpc_page_revision_chain(self, params):
+        history = sorted((r for r in self.tables["page_revisions"]
+                          if r["page_id"] == params["p_page_id"] and r["version"] <= params["p_version"]),
+                         key=lambda r: r["version"])
+        keyframes = [r["version"] for r in history if r["kind"] == "keyframe"]
+        if not keyframes:
+            return []
+        return [{"version": r["version"], "kind": r["kind"], "data": r["data"]}
+                for r in history if r["version"] >= keyframes[-1]]
+
+    def rpc_search_school_pages(self, params):
+        groups = parse_websearch(params["p_query"])
+        hits = []
+        for entry in self.tables["page_search_entries"]:
+            if entry["school_id"] != params["p_school_id"] or not groups:
+                continue
+            words = entry["content"].split()
+            terms = [search_term(w) for word in words for w in re.findall(r"\w+", word)]
+            matched = {term for required, excluded in groups
+                       if all(t in terms for t in required) and not any(t in terms for t in excluded)
+                       for term in required}
+            if matched:
+                hits.append((sum(terms.count(term) for term in matched) / (1 + len(terms) / 10), entry, matched))
+        hits.sort(key=lambda hit: (-hit[0], hit[1]["page_id"], hit[1]["position"]))
+        results = []
+        for rank, entry, matched in hits[:params.get("p_limit", 50)]:
+            page = self.find("pages", entry["page_id"])
+            words = entry["content"].split()
+            marked = [i for i, word in enumerate(words)
+                      if any(search_term(w) in matched for w in re.findall(r"\w+", word))]
+            start = max(0, min(marked[0] if marked else 0, len(words) - SNIPPET_WORDS))
+            snippet = " ".join("\ue000" + word + "\ue001" if i in marked else word
+                               for i, word in enumerate(words) if start <= i < start + SNIPPET_WORDS)
+            results.append({"page_id": page["id"], "page_name": page["name"], "page_slug": page["slug"],
+                            "is_published": page.get("is_published", False), "component_id": entry["component_id"],
+                            "component_type": entry["component_type"], "position": entry["position"],
+                            "rank": rank, "snippet": snippet})
+        return results
+
+    # ---- Storage ----
+
+    def handle_storage(self, request: httpx.Request, body: bytes) -> httpx.Response:
+        path = request.url.path[len("/storage/v1/object/"):]
+        if path.startswith("public/"):
+            self.calls["storage download"] += 1
+            stored = self.objects.get(path[len("public/"):])
+            if stored is None:
+                return json_response(400, {"statusCode": "404", "error": "not_found", "message": "Object not found"})
+            return httpx.Response(200, content=stored[0], headers={"content-type": stored[1]})
+        if request.method in ("POST", "PUT"):
+            self.calls["storage upload"] += 1
+            content_type = request.headers.get("content-type", "application/octet-stream")
+            if "multipart/form-data" in content_type:
+                body, content_type = parse_multipart_file(body, content_type)
+            self.objects[path] = (body, content_type)
+            return json_response(200, {"Key": path})
+        return httpx.Response(405)
+
+
+def parse_multipart_file(body: bytes, content_type: str) -> Tuple[bytes, str]:
+    """The file part of a multipart upload and its content type"""
+    boundary = ("--" + content_type.split("boundary=", 1)[1].strip('"')).encode()
+    for part in body.split(boundary):
+        head, _, data = part.partition(b"\r\n\r\n")
+        if b'name="file"' in head:
+            part_type = "application/octet-stream"
+            for line in head.decode("latin-1").split("\r\n"):
+                if line.lower().startswith("content-type:"):
+                    part_type = line.split(":", 1)[1].strip()
+            return data[:-2] if data.endswith(b"\r\n") else data, part_type
+    return body, content_type
+
+
+def apply_patch_operation(doc: list, op: Dict[str, Any]) -> list:
+    """Apply one operation from patch_page_components (paths relative to the components array)"""
+    def resolve(path):
+        parent = doc
+        for segment in path[:-1]:
+            parent = parent[int(segment)] if isinstance(parent, list) else parent[segment]
+        return parent, path[-1]
+
+    def index_of(container, key, inserting=False):
+        if not isinstance(container, list):
+            return key
+        position = len(container) if key == "-" else int(key)
+        if position < 0 or position > len(container) - (0 if inserting else 1):
+            raise PostgrestError(400, "22023", f"Path index {key} out of range")
+        return position
+
+    try:
+        value = op.get("value")
+        if op["op"] == "move":
+            parent, key = resolve(op["from"])
+            value = parent.pop(index_of(parent, key))
+        if op["op"] in ("add", "move"):
+            parent, key = resolve(op["path"])
+            if isinstance(parent, list):
+                parent.insert(index_of(parent, key, inserting=True), value)
+            else:
+                parent[key] = value
+        elif op["op"] in ("remove", "replace"):
+            parent, key = resolve(op["path"])
+            position = index_of(parent, key)
+            if not isinstance(parent, list) and key not in parent:
+                raise KeyError(key)
+            if op["op"] == "remove":
+                del parent[position]
+            else:
+                parent[position] = value
+        else:
+            raise PostgrestError(400, "22023", f"Unsupported patch operation {op['op']}")
+    except (KeyError, IndexError, ValueError, TypeError):
+        raise PostgrestError(400, "22023", f"Path /{'/'.join(op['path'])} does not exist")
+    return doc
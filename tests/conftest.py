@@ -0,0 +1,102 @@
+"""
+Shared setup: the backend modules on the import path, the settings server.py
+reads at import time, an app client whose data store is the in-memory Supabase
+stand-in (no network), and a scratch school on a real database for the SQL tests.
+"""
+import asyncio
+import os
+import sys
+import uuid
+from pathlib import Path
+
+import pytest
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path[:0] = [str(ROOT / "backend"), str(ROOT)]
+
+# Read by server.py at import time
+os.environ.update(
+    SUPABASE_URL="http://supabase.standin",
+    SUPABASE_KEY="test-key",
+    DATA_BACKEND="postgrest",
+    STORAGE_BACKEND="supabase",
+    LOG_LEVEL="ERROR",
+)
+
+
+@pytest.fixture
+def standin():
+    from supabase_standin import SupabaseStandIn
+    return SupabaseStandIn()
+
+
+@pytest.fixture
+def client(standin):
+    from fastapi.testclient import TestClient
+    import server
+
+    server.datastore_transport.transport = standin
+    for cache in server.CACHES.values():
+        cache.clear()
+    with TestClient(server.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def school(client):
+    response = client.post("/api/schools", json={"name": "Oak Primary", "slug": "oak"})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.fixture
+def page(client, school):
+    components = [
+        {"id": "hero", "type": "hero", "props": {"title": "Welcome to Oak", "backgroundImage": "https://cdn/x.png"}},
+        {"id": "events", "type": "events", "props": {"events": [{"title": "Sports Day", "date": "June 3"}]}},
+        {"id": "staff", "type": "staff", "props": {"members": [{"name": "Maria Gonzalez", "role": "Head Teacher"}]}},
+    ]
+    response = client.post("/api/pages", json={"school_id": school["id"], "name": "Home", "slug": "home",
+                                               "components": components})
+    assert response.status_code == 200
+    return response.json()
+
+
+class Database:
+    """A new school on the DATABASE_URL database, for SQL tests written as plain functions"""
+
+    def __init__(self, url: str):
+        import asyncpg
+        self.url = url
+        self.errors = asyncpg.PostgresError
+        self.loop = asyncio.new_event_loop()
+        self.connection = self.run(asyncpg.connect(url))
+        self.school_id = str(uuid.uuid4())
+        self.fetchval("INSERT INTO schools (id, name, slug) VALUES ($1, 'Test', $2)", self.school_id,
+                      f"test-{self.school_id}")
+
+    def run(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def fetch(self, query: str, *args):
+        return self.run(self.connection.fetch(query, *args))
+
+    def fetchval(self, query: str, *args):
+        return self.run(self.connection.fetchval(query, *args))
+
+    def close(self):
+        self.fetchval("DELETE FROM schools WHERE id = $1", self.school_id)
+        self.run(self.connection.close())
+        self.loop.close()
+
+
+@pytest.fixture
+def database():
+    """Skips unless DATABASE_URL names a scratch database with backend/schema*.sql applied"""
+    url = os.environ.get("DATABASE_URL")
+    if not url:
+        pytest.skip("DATABASE_URL is not set")
+    pytest.importorskip("asyncpg")
+    database = Database(url)
+    yield database
+    database.close()
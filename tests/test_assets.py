@@ -0,0 +1,37 @@
+"""Content-addressed uploads: the digest computed while spooling and lookups by it"""
+import asyncio
+import hashlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from media import spool_multipart_upload
+
+PNG = b"\x89PNG\r\n\x1a\n" + bytes(range(256))
+
+
+def test_spooled_upload_carries_its_sha256():
+    body = (b"--b\r\nContent-Disposition: form-data; name=\"file\"; filename=\"a.png\"\r\n\r\n" + PNG
+            + b"\r\n--b--\r\n")
+
+    async def chunks():
+        for start in range(0, len(body), 5):
+            yield body[start:start + 5]
+
+    spooled = asyncio.run(spool_multipart_upload(chunks(), "multipart/form-data; boundary=b", "file", 1024))
+    spooled.cleanup()
+    assert spooled.sha256 == hashlib.sha256(PNG).hexdigest()
+
+
+@pytest.mark.parametrize("digest", ["abc", "g" * 64, "a" * 65])
+def test_lookup_needs_a_sha256(digest):
+    assert TestClient(server.app).get(f"/api/upload/{digest}").status_code == 400
+
+
+def test_asset_response():
+    asset = {"url": "https://cdn/uploads/x.png", "path": "uploads/x.png", "sha256": "x", "content_type": "image/png"}
+    response = server.asset_response(asset, deduplicated=True)
+    assert (response["filename"], response["deduplicated"]) == ("x.png", True)
+    assert response["manifest"] == "https://cdn/uploads/x.json"
+    assert "manifest" not in server.asset_response({**asset, "content_type": "image/gif"}, deduplicated=False)
@@ -0,0 +1,52 @@
+"""POST /api/pages/batch: validating and shaping operations before the single RPC"""
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+
+
+def build(**operation):
+    return server.build_batch_operation(server.PageBatchOperation(**operation))
+
+
+def test_create_gets_an_id_and_component_defaults():
+    op = build(op="create", data={"school_id": "s1", "name": "About", "slug": "about",
+                                  "components": [{"type": "text"}]})
+    assert op["op"] == "create" and op["data"]["id"]
+    assert op["data"]["is_published"] is False
+    component = op["data"]["components"][0]
+    assert component["id"] and component["props"] == {}
+
+
+def test_update_keeps_only_given_fields():
+    op = build(op="update", id="p1", version=3, data={"name": "Start"})
+    assert op == {"op": "update", "id": "p1", "version": 3, "data": {"name": "Start"}}
+
+
+def test_delete():
+    assert build(op="delete", id="p1") == {"op": "delete", "id": "p1"}
+
+
+@pytest.mark.parametrize("operation", [
+    {"op": "update", "data": {"name": "no id"}},
+    {"op": "delete"},
+    {"op": "create", "data": {"name": "no school"}},
+])
+def test_invalid(operation):
+    with pytest.raises((TypeError, ValueError)):
+        build(**operation)
+
+
+def test_invalid_item_rejects_whole_batch():
+    response = TestClient(server.app).post("/api/pages/batch", json={"operations": [
+        {"op": "delete", "id": "p1"},
+        {"op": "update", "data": {"name": "no id"}},
+    ]})
+    assert response.status_code == 422
+    assert [error["index"] for error in response.json()["detail"]] == [1]
+
+
+def test_too_many_operations(monkeypatch):
+    monkeypatch.setattr(server, "PAGE_BATCH_LIMIT", 1)
+    response = TestClient(server.app).post("/api/pages/batch", json={"operations": [{"op": "delete", "id": "a"}] * 2})
+    assert response.status_code == 413
@@ -0,0 +1,65 @@
+"""The in-process LRU cache and its counters"""
+from cache import LRUCache
+
+MISSING = object()
+
+
+def test_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+
+
+def test_ttl(monkeypatch):
+    import cache as cache_module
+    now = [100.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = LRUCache(ttl=10)
+    cache.set("a", 1)
+    now[0] += 9
+    assert cache.get("a") == 1
+    now[0] += 1
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_falsy_values_are_cached():
+    cache = LRUCache()
+    cache.set("empty", [])
+    assert cache.get("empty", MISSING) == []
+
+
+def test_pop_and_discard_where():
+    cache = LRUCache()
+    for n in range(4):
+        cache.set(n, {"school_id": n % 2})
+    assert cache.pop(0) == {"school_id": 0}
+    assert cache.pop(0) is None
+    assert cache.discard_where(lambda key, value: value["school_id"] == 1) == 2
+    assert len(cache) == 1
+
+
+def test_stats(monkeypatch):
+    import cache as cache_module
+    now = [0.0]
+    monkeypatch.setattr(cache_module.time, "monotonic", lambda: now[0])
+    cache = LRUCache(maxsize=1, ttl=5)
+    cache.set("a", 1)
+    cache.get("a")
+    cache.get("b")
+    cache.set("b", 2)
+    now[0] = 10
+    cache.get("b")
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["evictions"], stats["expirations"]) == (1, 2, 1, 1)
+    assert stats["hit_ratio"] == round(1 / 3, 4)
+    assert stats["size"] == 0 and stats["maxsize"] == 1
+
+
+def test_no_lookups_yet():
+    assert LRUCache().stats()["hit_ratio"] is None
+
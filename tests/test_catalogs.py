@@ -0,0 +1,56 @@
+"""The precomputed template and theme catalogs and their conditional GETs"""
+import gzip
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+from starlette.requests import Request
+
+import server
+
+
+@pytest.fixture
+def client():
+    return TestClient(server.app)
+
+
+def request_with(**headers) -> Request:
+    return Request({
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(name.replace("_", "-").encode(), value.encode()) for name, value in headers.items()],
+    })
+
+
+@pytest.mark.parametrize("path", ["/api/themes", "/api/templates/components"])
+def test_etag_and_304(client, path):
+    response = client.get(path)
+    assert response.status_code == 200
+    etag = response.headers["etag"]
+    assert response.headers["cache-control"] == "public, max-age=300"
+
+    revalidated = client.get(path, headers={"If-None-Match": etag})
+    assert revalidated.status_code == 304
+    assert revalidated.content == b""
+    assert revalidated.headers["etag"] == etag
+
+
+def test_body_matches_catalog(client):
+    assert client.get("/api/themes").json() == json.loads(server.THEMES_CATALOG.body)
+
+
+def test_encodings_are_prebuilt():
+    assert json.loads(gzip.decompress(server.THEMES_CATALOG._encoded["gzip"])) == json.loads(server.THEMES_CATALOG.body)
+
+
+class TestEtagMatches:
+    def test_no_header(self):
+        assert not server.etag_matches(request_with(), '"a"')
+
+    @pytest.mark.parametrize("header", ['"a"', 'W/"a"', '"b", "a"', "*"])
+    def test_matches(self, header):
+        assert server.etag_matches(request_with(if_none_match=header), '"a"')
+
+    def test_other_etag(self):
+        assert not server.etag_matches(request_with(if_none_match='"b", W/"c"'), '"a"')
@@ -0,0 +1,51 @@
+"""Accept-Encoding negotiation and precompressed bodies"""
+import gzip
+
+import pytest
+
+import compression
+from compression import PrecompressedBody, negotiate_encoding
+
+BEST = compression.ENCODINGS[0]
+
+
+@pytest.mark.parametrize("header", [None, "", "identity", "deflate", "gzip;q=0, br;q=0", "*;q=0"])
+def test_identity(header):
+    assert negotiate_encoding(header) is None
+
+
+@pytest.mark.parametrize("header", ["gzip, deflate, br", "br, gzip", "*", "GZIP, BR"])
+def test_prefers_best_supported_when_weighed_equally(header):
+    assert negotiate_encoding(header) == BEST
+
+
+@pytest.mark.parametrize("header", ["gzip", "gzip, br;q=0", "br;q=0.1, gzip;q=0.9", "gzip;q=0.5, *;q=0"])
+def test_gzip(header):
+    assert negotiate_encoding(header) == "gzip"
+
+
+def test_unparseable_weight_counts_as_refused():
+    assert negotiate_encoding("gzip;q=abc") is None
+
+
+def test_precompressed_body_encodes_once():
+    body = PrecompressedBody(b'{"a": 1}' * 200)
+    assert body.encoded(None) == body.body
+    encoded = body.encoded("gzip")
+    assert gzip.decompress(encoded) == body.body
+    assert body.encoded("gzip") is encoded
+
+
+def test_precompress_builds_every_encoding():
+    body = PrecompressedBody(b"<p>page</p>" * 200).precompress()
+    assert set(body._encoded) == set(compression.ENCODINGS)
+
+
+def test_catalog_negotiates_encoding():
+    from fastapi.testclient import TestClient
+    import server
+
+    response = TestClient(server.app).get("/api/themes", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.content == server.THEMES_CATALOG.body
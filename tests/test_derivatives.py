@@ -0,0 +1,62 @@
+"""Responsive image derivatives and the srcset markup built from their manifest"""
+import os
+
+import pytest
+
+from media import generate_derivatives
+from renderer import collect_image_urls, render_components
+
+SRC = "https://project.supabase.co/storage/v1/object/public/uploads/uploads/a.png"
+MANIFEST = {
+    "src": SRC,
+    "width": 2000,
+    "height": 1000,
+    "placeholder": "data:image/webp;base64,AAAA",
+    "sources": [{"width": 640, "url": SRC + "-640w.webp"}, {"width": 1600, "url": SRC + "-1600w.webp"},
+                {"width": 2000, "url": SRC}],
+}
+
+
+def test_generate_derivatives(tmp_path):
+    Image = pytest.importorskip("PIL.Image")
+    src = tmp_path / "upload"
+    Image.new("RGB", (800, 400), "red").save(src, "PNG")
+
+    result = generate_derivatives(str(src), (320, 640, 1024))
+    assert (result["width"], result["height"]) == (800, 400)
+    assert result["placeholder"].startswith("data:image/webp;base64,")
+    # Widths at or above the original are served by the original
+    assert [width for width, _ in result["files"]] == [320, 640]
+    for width, path in result["files"]:
+        with Image.open(path) as derivative:
+            assert derivative.format == "WEBP"
+            assert derivative.size == (width, width // 2)
+        os.unlink(path)
+
+
+def test_img_with_manifest():
+    html = render_components([{"type": "image", "props": {"src": SRC}}], {SRC: MANIFEST})
+    assert f'srcset="{SRC}-640w.webp 640w, {SRC}-1600w.webp 1600w, {SRC} 2000w"' in html
+    assert 'width="2000" height="1000"' in html
+    assert "background:url('data:image/webp;base64,AAAA') center/cover" in html
+
+
+def test_img_without_manifest():
+    html = render_components([{"type": "image", "props": {"src": SRC}}], {})
+    assert "srcset" not in html and f'src="{SRC}"' in html
+
+
+def test_hero_background_prefers_a_fitting_derivative():
+    html = render_components([{"type": "hero", "props": {"backgroundImage": SRC}}], {SRC: MANIFEST})
+    assert f"background-image:url('{SRC}-1600w.webp'),url('data:image/webp;base64,AAAA')" in html
+
+
+def test_collect_image_urls():
+    components = [
+        {"type": "hero", "props": {"backgroundImage": "h.png"}},
+        {"type": "gallery", "props": {"images": ["g1.png", "g2.png"]}},
+        {"type": "staff", "props": {"staff": [{"image": "s.png"}]}},
+        {"type": "text", "props": {"content": "x.png"}},
+    ]
+    assert set(collect_image_urls(components)) >= {"h.png", "g1.png", "g2.png", "s.png"}
+    assert "x.png" not in collect_image_urls(components)
@@ -0,0 +1,64 @@
+"""Worker sizing in gunicorn.conf.py, loaded as gunicorn loads it"""
+import builtins
+import importlib.util
+import io
+import os
+from pathlib import Path
+
+import pytest
+
+CONF = Path(__file__).resolve().parent.parent / "backend" / "gunicorn.conf.py"
+
+
+def load_conf():
+    spec = importlib.util.spec_from_file_location("gunicorn_conf", CONF)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def cgroup_files(monkeypatch, files):
+    real_open = builtins.open
+
+    def fake_open(path, *args, **kwargs):
+        if str(path).startswith("/sys/fs/cgroup/"):
+            if path not in files:
+                raise FileNotFoundError(path)
+            return io.StringIO(files[path])
+        return real_open(path, *args, **kwargs)
+
+    monkeypatch.setattr(builtins, "open", fake_open)
+
+
+@pytest.fixture
+def eight_cpus(monkeypatch):
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: set(range(8)), raising=False)
+
+
+@pytest.mark.parametrize("files, cpus", [
+    ({}, 8),
+    ({"/sys/fs/cgroup/cpu.max": "max 100000\n"}, 8),
+    ({"/sys/fs/cgroup/cpu.max": "200000 100000\n"}, 2),
+    ({"/sys/fs/cgroup/cpu.max": "50000 100000\n"}, 1),
+    ({"/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "300000", "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000"}, 3),
+    ({"/sys/fs/cgroup/cpu/cpu.cfs_quota_us": "-1", "/sys/fs/cgroup/cpu/cpu.cfs_period_us": "100000"}, 8),
+])
+def test_available_cpus_honours_the_cgroup_quota(monkeypatch, eight_cpus, files, cpus):
+    conf = load_conf()
+    cgroup_files(monkeypatch, files)
+    assert conf.available_cpus() == cpus
+
+
+def test_at_least_two_workers(monkeypatch):
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    monkeypatch.setattr(os, "sched_getaffinity", lambda pid: {0}, raising=False)
+    assert load_conf().workers >= 2
+
+
+def test_environment_overrides(monkeypatch):
+    monkeypatch.setenv("WEB_CONCURRENCY", "5")
+    monkeypatch.setenv("PORT", "9000")
+    conf = load_conf()
+    assert conf.workers == 5
+    assert conf.bind == "0.0.0.0:9000"
+    assert conf.worker_class == "uvicorn.workers.UvicornWorker"
@@ -0,0 +1,85 @@
+"""Keyset-paginated school and page listings"""
+import base64
+from datetime import datetime, timezone
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+MISSING_SCHOOL = "00000000-0000-0000-0000-000000000000"
+
+
+class TestCursor:
+    def test_round_trip(self):
+        row = {"created_at": "2026-01-02T03:04:05.123456+00:00", "id": "6f1c1c4e-8a7a-4cde-9a5e-0b5d8f3c2a11"}
+        cursor = server.encode_cursor(row)
+        assert "=" not in cursor
+        assert server.decode_cursor(cursor) == (row["created_at"], row["id"])
+
+    def test_datetime_created_at(self):
+        created_at = datetime(2026, 1, 2, tzinfo=timezone.utc)
+        cursor = server.encode_cursor({"created_at": created_at, "id": "6f1c1c4e-8a7a-4cde-9a5e-0b5d8f3c2a11"})
+        assert server.decode_cursor(cursor)[0] == created_at.isoformat()
+
+    @pytest.mark.parametrize("cursor", [None, ""])
+    def test_first_page(self, cursor):
+        assert server.decode_cursor(cursor) is None
+
+    @pytest.mark.parametrize("raw", [b"not json", b'["2026-01-02", "not-a-uuid"]', b'["yesterday", '
+                                     b'"6f1c1c4e-8a7a-4cde-9a5e-0b5d8f3c2a11"]', b"[1]"])
+    def test_invalid(self, raw):
+        with pytest.raises(HTTPException) as raised:
+            server.decode_cursor(base64.urlsafe_b64encode(raw).decode())
+        assert raised.value.status_code == 400
+
+
+def read_all(client, url, **params):
+    items, cursor = [], None
+    while True:
+        response = client.get(url, params={**params, "cursor": cursor})
+        assert response.status_code == 200
+        body = response.json()
+        items += body["items"]
+        cursor = body["next_cursor"]
+        if cursor is None:
+            return items
+
+
+class TestSchools:
+    def test_newest_first_with_page_count(self, client, school, page):
+        other = client.post("/api/schools", json={"name": "Elm", "slug": "elm"}).json()
+        items = client.get("/api/schools").json()["items"]
+        assert [item["id"] for item in items] == [other["id"], school["id"]]
+        assert [item["page_count"] for item in items] == [0, 1]
+
+    def test_pages_through_every_school_once(self, client):
+        ids = [client.post("/api/schools", json={"name": f"S{n}", "slug": f"s{n}"}).json()["id"] for n in range(5)]
+        assert [item["id"] for item in read_all(client, "/api/schools", limit=2)] == ids[::-1]
+
+    @pytest.mark.parametrize("params", [{"limit": 0}, {"limit": server.LIST_MAX_LIMIT + 1}, {"cursor": "x"}])
+    def test_invalid_parameters(self, client, params):
+        assert client.get("/api/schools", params=params).status_code in (400, 422)
+
+
+class TestPages:
+    def test_summaries_leave_out_components(self, client, school, page):
+        [item] = client.get(f"/api/schools/{school['id']}/pages").json()["items"]
+        assert item["id"] == page["id"]
+        assert "components" not in item
+        [full] = client.get(f"/api/schools/{school['id']}/pages", params={"include": "components"}).json()["items"]
+        assert [c["id"] for c in full["components"]] == ["hero", "events", "staff"]
+
+    def test_pages_through_every_page_once(self, client, school):
+        ids = [client.post("/api/pages", json={"school_id": school["id"], "name": f"P{n}", "slug": f"p{n}"}).json()["id"]
+               for n in range(5)]
+        assert [item["id"] for item in read_all(client, f"/api/schools/{school['id']}/pages", limit=2)] == ids[::-1]
+
+    def test_empty_school(self, client, school):
+        assert client.get(f"/api/schools/{school['id']}/pages").json() == {"items": [], "next_cursor": None}
+
+    def test_missing_school(self, client):
+        assert client.get(f"/api/schools/{MISSING_SCHOOL}/pages").status_code == 404
+
+    def test_unknown_include(self, client, school):
+        assert client.get(f"/api/schools/{school['id']}/pages", params={"include": "secrets"}).status_code == 422
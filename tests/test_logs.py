@@ -0,0 +1,114 @@
+"""JSON log records, the non-blocking queue handler and the ASGI access log"""
+import asyncio
+import json
+import logging
+import queue
+
+import pytest
+
+from logs import AccessLogMiddleware, DroppingQueueHandler, JSONFormatter
+
+
+def record(msg="hello %s", args=("world",), **extra) -> logging.LogRecord:
+    entry = logging.LogRecord("test", logging.INFO, __file__, 1, msg, args, None)
+    entry.__dict__.update(extra)
+    return entry
+
+
+class TestJSONFormatter:
+    def test_message_and_fields(self):
+        line = json.loads(JSONFormatter().format(record(fields={"path": "/api", "status": 200})))
+        assert line["msg"] == "hello world"
+        assert line["level"] == "INFO"
+        assert line["logger"] == "test"
+        assert (line["path"], line["status"]) == ("/api", 200)
+
+    def test_traceback(self):
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            import sys
+            entry = logging.LogRecord("test", logging.ERROR, __file__, 1, "failed", None, sys.exc_info())
+        assert "ValueError: boom" in json.loads(JSONFormatter().format(entry))["exc"]
+
+
+class TestDroppingQueueHandler:
+    def test_message_resolved_before_enqueue(self):
+        log_queue = queue.Queue()
+        DroppingQueueHandler(log_queue).handle(record())
+        queued = log_queue.get_nowait()
+        assert (queued.msg, queued.args) == ("hello world", None)
+
+    def test_full_queue_drops_instead_of_blocking(self, monkeypatch):
+        monkeypatch.setattr(DroppingQueueHandler, "dropped", 0)
+        handler = DroppingQueueHandler(queue.Queue(maxsize=1))
+        handler.handle(record())
+        handler.handle(record())
+        assert DroppingQueueHandler.dropped == 1
+
+
+class ListHandler(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.records = []
+
+    def emit(self, entry):
+        self.records.append(entry)
+
+
+def call(middleware, status=200, body=b"ok", error=None):
+    async def app(scope, receive, send):
+        if error:
+            raise error
+        await send({"type": "http.response.start", "status": status, "headers": []})
+        await send({"type": "http.response.body", "body": body})
+
+    async def receive():
+        return {"type": "http.request"}
+
+    async def send(message):
+        pass
+
+    middleware.app = app
+    scope = {"type": "http", "method": "GET", "path": "/api/x", "client": ("10.0.0.1", 1234)}
+    asyncio.run(middleware(scope, receive, send))
+
+
+@pytest.fixture
+def access():
+    logger = logging.getLogger("test.access")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = ListHandler()
+    logger.addHandler(handler)
+    yield logger, handler.records
+    logger.removeHandler(handler)
+
+
+class TestAccessLog:
+    def test_one_record_per_request(self, access):
+        logger, records = access
+        call(AccessLogMiddleware(None, logger=logger), body=b"12345")
+        [entry] = records
+        assert entry.levelno == logging.INFO
+        assert entry.fields["status"] == 200
+        assert entry.fields["bytes"] == 5
+        assert entry.fields["client"] == "10.0.0.1"
+
+    def test_successes_are_sampled(self, access):
+        logger, records = access
+        call(AccessLogMiddleware(None, sample_rate=0, logger=logger))
+        assert records == []
+
+    def test_errors_always_logged(self, access):
+        logger, records = access
+        call(AccessLogMiddleware(None, sample_rate=0, logger=logger), status=503)
+        with pytest.raises(RuntimeError):
+            call(AccessLogMiddleware(None, sample_rate=0, logger=logger), error=RuntimeError("boom"))
+        assert [entry.levelno for entry in records] == [logging.ERROR, logging.ERROR]
+        assert records[1].fields["status"] == 500
+
+    def test_slow_requests_always_logged(self, access):
+        logger, records = access
+        call(AccessLogMiddleware(None, sample_rate=0, slow_ms=0, logger=logger))
+        assert len(records) == 1
@@ -0,0 +1,79 @@
+"""Prometheus text rendering of the in-process metrics"""
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from metrics import CallbackMetric, Counter, Gauge, Histogram, Metric, Registry
+
+
+def test_counter_and_gauge():
+    registry = Registry()
+    requests = registry.register(Counter("http_requests_total", "Requests", ("method", "status")))
+    in_flight = registry.register(Gauge("in_flight", "In flight", ("method",)))
+    requests.inc("GET", "200")
+    requests.inc("GET", "200")
+    requests.inc("POST", "500", amount=3)
+    in_flight.inc("GET")
+    in_flight.dec("GET")
+
+    assert registry.render().splitlines() == [
+        "# HELP http_requests_total Requests",
+        "# TYPE http_requests_total counter",
+        'http_requests_total{method="GET",status="200"} 2',
+        'http_requests_total{method="POST",status="500"} 3',
+        "# HELP in_flight In flight",
+        "# TYPE in_flight gauge",
+        'in_flight{method="GET"} 0',
+    ]
+
+
+def test_histogram_buckets_are_cumulative():
+    registry = Registry()
+    latency = registry.register(Histogram("latency_seconds", "Latency", ("route",), buckets=(0.1, 1.0)))
+    for value in (0.05, 0.5, 0.5, 5.0):
+        latency.observe(value, "/a")
+
+    lines = registry.render().splitlines()
+    assert lines[1] == "# TYPE latency_seconds histogram"
+    assert lines[2:] == [
+        'latency_seconds_bucket{route="/a",le="0.1"} 1',
+        'latency_seconds_bucket{route="/a",le="1.0"} 3',
+        'latency_seconds_bucket{route="/a",le="+Inf"} 4',
+        'latency_seconds_sum{route="/a"} 6.05',
+        'latency_seconds_count{route="/a"} 4',
+    ]
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    counter = registry.register(Counter("errors_total", "Errors", ("message",)))
+    counter.inc('say "hi"\\\n')
+    assert registry.render().splitlines()[-1] == 'errors_total{message="say \\"hi\\"\\\\\\n"} 1'
+
+
+def test_callback_metric_skips_missing_values():
+    registry = Registry()
+    registry.register(CallbackMetric("cache_size", "Entries", ("cache",), lambda: {("a",): 2, ("b",): None}))
+    registry.register(CallbackMetric("dropped_total", "Dropped", (), lambda: {(): 5}, type="counter"))
+    assert registry.render().splitlines() == [
+        "# HELP cache_size Entries",
+        "# TYPE cache_size gauge",
+        'cache_size{cache="a"} 2',
+        "# HELP dropped_total Dropped",
+        "# TYPE dropped_total counter",
+        "dropped_total 5",
+    ]
+
+
+def test_metric_must_yield_samples():
+    with pytest.raises(TypeError):
+        Metric("incomplete", "No samples")
+
+
+def test_endpoint_counts_requests_by_route_template():
+    client = TestClient(server.app)
+    client.get("/api/themes")
+    response = client.get("/api/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'http_requests_total{method="GET",route="/api/themes",status="200"}' in response.text
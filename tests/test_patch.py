@@ -0,0 +1,38 @@
+"""PATCH /api/pages/{page_id}: patch paths and the operations refused before reaching the database"""
+import pytest
+from fastapi import HTTPException
+from fastapi.testclient import TestClient
+
+import server
+
+MISSING_PAGE = "00000000-0000-0000-0000-000000000000"
+
+
+class TestParseComponentPointer:
+    @pytest.mark.parametrize("pointer, segments", [
+        ("/components/0", ["0"]),
+        ("/components/-", ["-"]),
+        ("/components/2/props/title", ["2", "props", "title"]),
+        ("/components/1/props/a~1b/c~0d", ["1", "props", "a/b", "c~d"]),
+    ])
+    def test_segments(self, pointer, segments):
+        assert server.parse_component_pointer(pointer) == segments
+
+    @pytest.mark.parametrize("pointer", [None, "", "/components", "/name", "components/0"])
+    def test_outside_components(self, pointer):
+        with pytest.raises(HTTPException) as raised:
+            server.parse_component_pointer(pointer)
+        assert raised.value.status_code == 422
+
+
+@pytest.mark.parametrize("operation", [
+    {"op": "replace", "path": "/name", "value": "x"},
+    {"op": "copy", "from": "/components/0", "path": "/components/1"},
+    {"op": "add", "path": "/components/-", "value": {"props": {}}},
+    {"op": "add", "path": "/components/-", "value": "hero"},
+    {"op": "replace", "path": "/components/0", "value": {"id": "hero"}},
+    {"op": "replace", "path": "/components/0", "value": None},
+])
+def test_invalid_operation(operation):
+    response = TestClient(server.app).patch(f"/api/pages/{MISSING_PAGE}", json=[operation])
+    assert response.status_code == 422
@@ -0,0 +1,57 @@
+"""patch_page_components from schema_v3.sql and schema_v4.sql, against a real database"""
+import json
+import uuid
+
+import pytest
+
+COMPONENTS = [
+    {"id": "hero", "type": "hero", "props": {"title": "Welcome"}, "order": 0},
+    {"id": "text", "type": "text", "props": {"content": "Hello"}, "order": 1},
+]
+
+
+def patch(database, ops, components=COMPONENTS, expected_version=None):
+    """Apply ops to a new page holding components; its components afterwards, or the database error"""
+    page_id = database.fetchval(
+        "INSERT INTO pages (school_id, name, slug, components) VALUES ($1, 'Home', $2, $3::jsonb) RETURNING id",
+        database.school_id, f"page-{uuid.uuid4()}", json.dumps(components))
+    try:
+        database.fetch("SELECT * FROM patch_page_components($1, $2::jsonb, $3)", page_id, json.dumps(ops),
+                       expected_version)
+    except database.errors as e:
+        return e
+    return json.loads(database.fetchval("SELECT components FROM pages WHERE id = $1", page_id))
+
+
+def test_replace_prop(database):
+    components = patch(database, [{"op": "replace", "path": ["0", "props", "title"], "value": "Hi"}])
+    assert components[0]["props"]["title"] == "Hi"
+
+
+@pytest.mark.parametrize("index, ids", [("0", ["new", "hero", "text"]), ("2", ["hero", "text", "new"]),
+                                        ("-", ["hero", "text", "new"])])
+def test_add_component(database, index, ids):
+    components = patch(database, [{"op": "add", "path": [index], "value": {"id": "new", "type": "spacer", "props": {}}}])
+    assert [c["id"] for c in components] == ids
+    assert [c["order"] for c in components] == [0, 1, 2]
+
+
+@pytest.mark.parametrize("path", [["3"], ["-1"], ["x"], ["0", "props", "items", "5"]])
+def test_add_out_of_range(database, path):
+    components = [{**COMPONENTS[0], "props": {"items": ["a"]}}, *COMPONENTS[1:]]
+    error = patch(database, [{"op": "add", "path": path, "value": {"id": "new"}}], components)
+    assert getattr(error, "sqlstate", None) == "22023"
+
+
+def test_move_and_remove(database):
+    components = patch(database, [
+        {"op": "move", "from": ["1"], "path": ["0"]},
+        {"op": "remove", "path": ["1"]},
+    ])
+    assert [(c["id"], c["order"]) for c in components] == [("text", 0)]
+
+
+def test_expected_version(database):
+    ops = [{"op": "remove", "path": ["0"]}]
+    assert [c["id"] for c in patch(database, ops, expected_version=1)] == ["text"]
+    assert patch(database, ops, expected_version=2).sqlstate == "PT412"
@@ -0,0 +1,34 @@
+"""Page versions as ETags and the If-Match preconditions on writes"""
+import pytest
+from fastapi import HTTPException
+
+import server
+
+
+class TestParseIfMatch:
+    @pytest.mark.parametrize("header", [None, "*", " * "])
+    def test_any_version(self, header):
+        assert server.parse_if_match(header) is None
+
+    @pytest.mark.parametrize("header, version", [
+        ('"3"', 3),
+        ('W/"7"', 7),
+        ('"12", "13"', 12),
+        ("4", 4),
+    ])
+    def test_names_a_version(self, header, version):
+        assert server.parse_if_match(header) == version
+
+    def test_not_a_version(self):
+        with pytest.raises(HTTPException) as raised:
+            server.parse_if_match('"abc"')
+        assert raised.value.status_code == 412
+
+    def test_page_etag_round_trips(self):
+        assert server.parse_if_match(server.page_etag(9)) == 9
+
+
+def test_stored_components_are_returned_as_saved():
+    row = {"id": "p1", "school_id": "s1", "name": "Home", "slug": "home", "version": 4,
+           "components": [{"type": "text", "props": {"content": "no id"}}, {"id": "x", "props": {}}]}
+    assert server.StoredPage(**row).model_dump()["components"] == row["components"]
@@ -0,0 +1,47 @@
+"""Published pages served as one cached JSON bundle by slug"""
+import server
+
+
+def publish(client, page):
+    response = client.put(f"/api/pages/{page['id']}", json={"is_published": True})
+    assert response.status_code == 200
+    return response
+
+
+def test_theme_resolution_applies_brand_colors():
+    theme = server.resolve_school_theme({"theme": "forest", "primary_color": "#000000", "secondary_color": None})
+    assert theme["id"] == "forest"
+    assert theme["colors"]["primary"] == "#000000"
+    assert theme["colors"]["secondary"] == "#FCD34D"
+
+
+def test_theme_from_school_metadata_falls_back_to_its_first_theme():
+    themes = [{"id": "own", "colors": {"primary": "#111111"}}]
+    assert server.resolve_school_theme({"theme": "missing", "metadata": {"themes": themes}})["id"] == "own"
+
+
+def test_bundle(client, school, page):
+    assert client.get("/api/public/oak/home").status_code == 404
+    publish(client, page)
+
+    response = client.get("/api/public/oak/home")
+    assert response.status_code == 200
+    bundle = response.json()
+    assert bundle["school"]["name"] == "Oak Primary"
+    assert bundle["theme"]["id"] == "default"
+    assert [c["id"] for c in bundle["page"]["components"]] == ["hero", "events", "staff"]
+    assert client.get("/api/public/oak/home", headers={"If-None-Match": response.headers["etag"]}).status_code == 304
+
+
+def test_theme_change_reaches_the_bundle(client, school, page):
+    publish(client, page)
+    client.get("/api/public/oak/home")
+    client.put(f"/api/schools/{school['id']}/theme", json={"theme": "forest", "primary_color": "#000000"})
+    theme = client.get("/api/public/oak/home").json()["theme"]
+    assert (theme["id"], theme["colors"]["primary"]) == ("forest", "#000000")
+
+
+def test_unknown_school_or_page(client, school, page):
+    publish(client, page)
+    assert client.get("/api/public/elm/home").status_code == 404
+    assert client.get("/api/public/oak/about").status_code == 404
@@ -0,0 +1,78 @@
+"""Static HTML for published pages: escaping and the URL/CSS values let through"""
+import pytest
+
+from renderer import render_components, render_page
+
+SCHOOL = {"name": "Oak Primary"}
+THEME = {"colors": {"primary": "#112233"}, "fontFamily": "Inter"}
+
+
+def render(component_type, **props):
+    return render_components([{"type": component_type, "props": props}])
+
+
+def test_text_is_escaped():
+    html = render("heading", content='<script>alert("x")</script>')
+    assert "<script>" not in html
+    assert "&lt;script&gt;alert(&quot;x&quot;)&lt;/script&gt;" in html
+
+
+def test_components_in_saved_order_and_unknown_types_skipped():
+    html = render_components([
+        {"type": "text", "order": 2, "props": {"content": "second"}},
+        {"type": "marquee", "order": 0, "props": {"content": "never"}},
+        {"type": "text", "order": 1, "props": {"content": "first"}},
+    ])
+    assert "never" not in html
+    assert html.index("first") < html.index("second")
+
+
+@pytest.mark.parametrize("link", ["javascript:alert(1)", " JavaScript:alert(1)", "java\tscript:alert(1)",
+                                  "data:text/html,x", "vbscript:x"])
+def test_unsafe_links_are_dropped(link):
+    assert 'href="#"' in render("button", text="Go", link=link)
+    assert '<a href="#">Facebook</a>' in render("footer", socialLinks={"facebook": link})
+
+
+@pytest.mark.parametrize("link", ["https://example.org/a?b=1", "/about", "#contact", "mailto:office@oak.sch",
+                                  "tel:+441234"])
+def test_safe_links_are_kept(link):
+    assert f'href="{link}"' in render("button", text="Go", link=link)
+
+
+def test_image_urls_need_http():
+    assert 'src=""' in render("image", src="javascript:alert(1)")
+    assert 'src="https://cdn.example/a.png"' in render("image", src="https://cdn.example/a.png")
+
+
+def test_background_url_cannot_end_the_style():
+    html = render("hero", title="Hi", backgroundImage="https://cdn.example/a.png') ;color:red;('")
+    assert "url('https://cdn.example/a.png%27%29%20;color:red;%28%27')" in html
+    assert 'style=""' in render("hero", title="Hi", backgroundImage="javascript:alert(1)")
+
+
+@pytest.mark.parametrize("width, expected", [("50%", "50%"), ("320px", "320px"), ("auto", "auto"),
+                                             ("red;position:fixed", "100%"), (None, "100%")])
+def test_image_width_is_a_css_length(width, expected):
+    assert f"width:{expected}" in render("image", src="https://cdn.example/a.png", width=width)
+
+
+def test_theme_values_are_checked():
+    theme = {"colors": {"primary": "red;}body{display:none", "accent": "rgb(1, 2, 3)"},
+             "fontFamily": 'Inter";}*{x:y'}
+    html = render_page(SCHOOL, {"name": "Home", "components": []}, theme)
+    assert "--primary:#1D4ED8" in html
+    assert "--accent:rgb(1, 2, 3)" in html
+    assert '--font:"Outfit"' in html
+
+
+def test_document():
+    html = render_page(SCHOOL, {"name": "Home", "components": [{"type": "text", "props": {"content": "Hi"}}]}, THEME)
+    assert html.startswith("<!DOCTYPE html>")
+    assert "<title>Home | Oak Primary</title>" in html
+    assert "--primary:#112233" in html and '--font:"Inter"' in html
+
+
+def test_two_column_gallery_is_overridden_on_wide_screens():
+    html = render_page(SCHOOL, {"name": "Home", "components": []}, THEME)
+    assert html.index(".grid-4{grid-template-columns:repeat(2,1fr)}") < html.index("@media(min-width:768px)")
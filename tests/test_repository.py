@@ -0,0 +1,146 @@
+"""Both repository backends against the same expectations: PostgREST on the stand-in, asyncpg on DATABASE_URL"""
+import asyncio
+import hashlib
+import json
+import os
+import uuid
+from types import SimpleNamespace
+
+import httpx
+import pytest
+from supabase import AsyncClient, AsyncClientOptions
+
+from repository import DataStoreError, PostgresRepository, PostgrestRepository, Repository, parse_json_column
+
+MISSING_PAGE = "00000000-0000-0000-0000-000000000000"
+
+
+@pytest.fixture(params=["postgrest", "postgres"])
+def store(request):
+    if request.param == "postgrest":
+        http_client = httpx.AsyncClient(transport=request.getfixturevalue("standin"))
+        repository = PostgrestRepository(AsyncClient(os.environ["SUPABASE_URL"], os.environ["SUPABASE_KEY"],
+                                                     options=AsyncClientOptions(httpx_client=http_client)))
+        school = asyncio.run(repository.create_school({"name": "Oak Primary", "slug": "oak", "metadata": {}}))
+        yield SimpleNamespace(repository=repository, run=asyncio.run, school_id=school["id"])
+    else:
+        database = request.getfixturevalue("database")
+        repository = PostgresRepository(database.url, min_size=1, max_size=2)
+        yield SimpleNamespace(repository=repository, run=database.run, school_id=database.school_id)
+        database.run(repository.close())
+
+
+def create_page(store, **fields):
+    doc = {"id": str(uuid.uuid4()), "school_id": store.school_id, "name": "Home", "slug": f"page-{uuid.uuid4()}",
+           "components": json.dumps([{"id": "hero", "type": "hero", "props": {"title": "Hi"}, "order": 0}]),
+           **fields}
+    return store.run(store.repository.create_page(doc))
+
+
+def test_backend_must_implement_every_operation():
+    class Partial(Repository):
+        async def get_page(self, page_id):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+def test_page_round_trip(store):
+    page = create_page(store)
+    stored = store.run(store.repository.get_page(page["id"]))
+    assert stored["name"] == "Home"
+    assert parse_json_column(stored["components"])[0]["props"] == {"title": "Hi"}
+    assert store.run(store.repository.page_exists(page["id"]))
+    assert store.run(store.repository.get_page(MISSING_PAGE)) is None
+
+
+def test_update_at_expected_version(store):
+    page = create_page(store)
+    assert store.run(store.repository.update_page(page["id"], {"name": "Lost"}, page["version"] + 1)) is None
+    updated = store.run(store.repository.update_page(page["id"], {"name": "Start"}, page["version"]))
+    assert updated["name"] == "Start"
+
+
+def test_patch_components(store):
+    page = create_page(store)
+    patched = store.run(store.repository.patch_page_components(
+        page["id"], [{"op": "replace", "path": ["0", "props", "title"], "value": "Hello"}], None))
+    assert patched["version"] == page["version"] + 1
+    components = parse_json_column(store.run(store.repository.get_page(page["id"]))["components"])
+    assert components[0]["props"]["title"] == "Hello"
+
+
+def test_delete(store):
+    page = create_page(store)
+    assert store.run(store.repository.delete_page(page["id"]))
+    assert not store.run(store.repository.delete_page(page["id"]))
+
+
+def test_errors_carry_the_sqlstate(store):
+    page = create_page(store)
+    with pytest.raises(DataStoreError) as raised:
+        create_page(store, slug=page["slug"])
+    assert raised.value.code == "23505"
+
+
+def test_malformed_id(database):
+    repository = PostgresRepository(database.url, min_size=1, max_size=1)
+    try:
+        with pytest.raises(DataStoreError) as raised:
+            database.run(repository.get_page("not-a-uuid"))
+        assert raised.value.code == "22P02"
+    finally:
+        database.run(repository.close())
+
+
+def test_list_pages_by_keyset(store):
+    created = [create_page(store, name=f"P{n}") for n in range(3)]
+    first = store.run(store.repository.list_pages(store.school_id, 2))
+    assert [row["id"] for row in first] == [page["id"] for page in created[::-1][:2]]
+    assert "components" not in first[0]
+    after = (first[-1]["created_at"], first[-1]["id"])
+    rest = store.run(store.repository.list_pages(store.school_id, 2, after, include_components=True))
+    assert [row["id"] for row in rest] == [created[0]["id"]]
+    assert parse_json_column(rest[0]["components"])[0]["id"] == "hero"
+
+
+def test_stale_snapshot_refresh(store):
+    old, new = (hashlib.sha256(body).hexdigest() for body in (b"old", b"new"))
+    page = create_page(store)
+    store.run(store.repository.publish_page_snapshot(page["id"], page["version"], old, "old"))
+    school = store.run(store.repository.get_school(store.school_id))
+    published = store.run(store.repository.get_published_snapshot(school["slug"], page["slug"]))
+    assert (published["hash"], published["stale"]) == (old, 0)
+
+    store.run(store.repository.update_school(store.school_id, {"primary_color": "#000000"}))
+    assert store.run(store.repository.get_published_snapshot(school["slug"], page["slug"]))["stale"] == 1
+    # Read before a further branding change: refused
+    assert not store.run(store.repository.refresh_published_snapshot(page["id"], old, 0, new, "new"))
+    assert store.run(store.repository.refresh_published_snapshot(page["id"], old, 1, new, "new"))
+    published = store.run(store.repository.get_published_snapshot(school["slug"], page["slug"]))
+    assert (published["hash"], published["stale"]) == (new, 0)
+
+
+def test_revisions(store):
+    page = create_page(store)
+    original = parse_json_column(page["components"])
+    patched = store.run(store.repository.patch_page_components(
+        page["id"], [{"op": "replace", "path": ["0", "props", "title"], "value": "Hello"}], None))
+    listed = store.run(store.repository.list_page_revisions(page["id"], 10))
+    assert [row["version"] for row in listed] == [patched["version"], page["version"]]
+    assert [row["version"] for row in store.run(
+        store.repository.list_page_revisions(page["id"], 10, patched["version"]))] == [page["version"]]
+    assert store.run(store.repository.get_page_revision(page["id"], page["version"])) == original
+    assert store.run(store.repository.get_page_revision(page["id"], patched["version"]))[0]["props"]["title"] == "Hello"
+    assert store.run(store.repository.get_page_revision(page["id"], 999)) is None
+
+
+def test_search_pages(store):
+    page = create_page(store, components=json.dumps([
+        {"id": "events", "type": "events", "props": {"events": [{"title": "Sports Day", "url": "https://cdn/x"}]}},
+    ]))
+    [hit] = store.run(store.repository.search_pages(store.school_id, "sports", 10))
+    assert (hit["page_id"], hit["component_id"], hit["position"]) == (page["id"], "events", 0)
+    assert "Sports" in hit["snippet"]
+    assert store.run(store.repository.search_pages(store.school_id, "cdn", 10)) == []
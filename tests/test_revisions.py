@@ -0,0 +1,45 @@
+"""Materializing page revisions from a keyframe and the deltas after it (schema_v10)"""
+import json
+
+from repository import materialize_revision
+
+
+def component(component_id, text):
+    return {"id": component_id, "type": "text", "props": {"content": text}}
+
+
+def test_empty_chain():
+    assert materialize_revision([]) == []
+
+
+def test_keyframe_alone():
+    components = [component("a", "one"), component("b", "two")]
+    assert materialize_revision([{"version": 1, "kind": "keyframe", "data": components}]) == components
+
+
+def test_deltas_replace_changed_components_and_reorder():
+    chain = [
+        {"version": 1, "kind": "keyframe", "data": [component("a", "one"), component("b", "two")]},
+        {"version": 2, "kind": "delta", "data": {"order": ["a", "b"], "changed": {"b": component("b", "TWO")}}},
+        # Adds c, drops a, reorders
+        {"version": 3, "kind": "delta", "data": {"order": ["c", "b"], "changed": {"c": component("c", "three")}}},
+    ]
+    assert materialize_revision(chain) == [component("c", "three"), component("b", "TWO")]
+    assert materialize_revision(chain[:2]) == [component("a", "one"), component("b", "TWO")]
+
+
+def test_later_keyframe_resets():
+    chain = [
+        {"version": 1, "kind": "keyframe", "data": [component("a", "one")]},
+        {"version": 2, "kind": "delta", "data": {"order": ["a"], "changed": {"a": component("a", "uno")}}},
+        {"version": 3, "kind": "keyframe", "data": [component("z", "last")]},
+    ]
+    assert materialize_revision(chain) == [component("z", "last")]
+
+
+def test_json_encoded_data():
+    chain = [
+        {"version": 1, "kind": "keyframe", "data": json.dumps([component("a", "one")])},
+        {"version": 2, "kind": "delta", "data": json.dumps({"order": ["a"], "changed": {}})},
+    ]
+    assert materialize_revision(chain) == [component("a", "one")]
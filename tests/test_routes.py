@@ -0,0 +1,232 @@
+"""Page write routes, against the in-memory Supabase stand-in"""
+import json
+
+import pytest
+from fastapi import HTTPException
+
+import server
+
+MISSING_PAGE = "00000000-0000-0000-0000-000000000000"
+
+
+def components_of(client, page_id):
+    return client.get(f"/api/pages/{page_id}").json()["components"]
+
+
+class TestGet:
+    def test_components_come_back_as_stored(self, client, standin, page):
+        stored = [{"type": "text", "props": {"body": "x"}, "legacy": True}]
+        standin.tables["pages"][0]["components"] = stored
+        assert components_of(client, page["id"]) == stored
+
+    def test_missing_page(self, client):
+        assert client.get(f"/api/pages/{MISSING_PAGE}").status_code == 404
+        assert client.get("/api/pages/not-a-uuid").status_code == 404
+
+
+class TestPatch:
+    def test_replace_prop(self, client, page):
+        response = client.patch(f"/api/pages/{page['id']}", headers={"If-Match": f'"{page["version"]}"'},
+                                json=[{"op": "replace", "path": "/components/0/props/title", "value": "Hello"}])
+        assert response.status_code == 200
+        assert response.json()["version"] == page["version"] + 1
+        assert response.headers["etag"] == f'"{page["version"] + 1}"'
+        assert components_of(client, page["id"])[0]["props"]["title"] == "Hello"
+
+    def test_add_and_move_components(self, client, page):
+        response = client.patch(f"/api/pages/{page['id']}", json=[
+            {"op": "add", "path": "/components/-", "value": {"id": "spacer", "type": "spacer"}},
+            {"op": "move", "from": "/components/3", "path": "/components/0"},
+        ])
+        assert response.status_code == 200
+        components = components_of(client, page["id"])
+        assert [c["id"] for c in components] == ["spacer", "hero", "events", "staff"]
+        # Whole components get the same defaults as on create
+        assert components[0]["props"] == {}
+
+    def test_stale_if_match(self, client, page):
+        response = client.patch(f"/api/pages/{page['id']}", headers={"If-Match": '"999"'},
+                                json=[{"op": "remove", "path": "/components/0"}])
+        assert response.status_code == 412
+        assert len(components_of(client, page["id"])) == 3
+
+    @pytest.mark.parametrize("operation", [
+        {"op": "replace", "path": "/name", "value": "x"},
+        {"op": "replace", "path": "/components/9/props/title", "value": "x"},
+        {"op": "add", "path": "/components/-", "value": {"props": {}}},
+        {"op": "replace", "path": "/components/0", "value": {"props": {}}},
+    ])
+    def test_invalid_operation(self, client, page, operation):
+        assert client.patch(f"/api/pages/{page['id']}", json=[operation]).status_code == 422
+
+    def test_missing_page(self, client):
+        response = client.patch(f"/api/pages/{MISSING_PAGE}",
+                                json=[{"op": "remove", "path": "/components/0"}])
+        assert response.status_code == 404
+
+
+class TestPut:
+    def test_versioned_update(self, client, page):
+        response = client.put(f"/api/pages/{page['id']}", json={"name": "Start"},
+                              headers={"If-Match": f'"{page["version"]}"'})
+        assert response.status_code == 200
+        assert response.headers["etag"] == f'"{page["version"] + 1}"'
+
+        stale = client.put(f"/api/pages/{page['id']}", json={"name": "Lost"},
+                           headers={"If-Match": f'"{page["version"]}"'})
+        assert stale.status_code == 412
+        assert client.get(f"/api/pages/{page['id']}").json()["name"] == "Start"
+
+    def test_publish_failure_keeps_the_update(self, client, page, monkeypatch):
+        async def conflicting_save(page):
+            raise HTTPException(status_code=412, detail="Page was modified since it was read")
+
+        monkeypatch.setattr(server, "publish_page", conflicting_save)
+        response = client.put(f"/api/pages/{page['id']}", json={"name": "Start", "is_published": True})
+        assert response.status_code == 200
+        assert response.json()["publish_error"] == "Page was modified since it was read"
+        assert client.get(f"/api/pages/{page['id']}").json()["name"] == "Start"
+
+    def test_missing_page(self, client):
+        assert client.put(f"/api/pages/{MISSING_PAGE}", json={"name": "x"},
+                          headers={"If-Match": '"1"'}).status_code == 404
+        assert client.delete(f"/api/pages/{MISSING_PAGE}").status_code == 404
+
+
+class TestBatch:
+    def test_per_item_results(self, client, school, page):
+        response = client.post("/api/pages/batch", json={"operations": [
+            {"op": "create", "data": {"school_id": school["id"], "name": "About", "slug": "about"}},
+            {"op": "update", "id": page["id"], "version": page["version"], "data": {"name": "Start"}},
+            {"op": "update", "id": page["id"], "version": page["version"], "data": {"name": "Stale"}},
+            {"op": "create", "data": {"school_id": school["id"], "name": "Dup", "slug": "home"}},
+            {"op": "delete", "id": MISSING_PAGE},
+        ]})
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [item["status"] for item in results] == [201, 200, 412, 409, 404]
+        assert client.get(f"/api/pages/{page['id']}").json()["name"] == "Start"
+
+    def test_invalid_operation_rejects_whole_batch(self, client, standin, school):
+        response = client.post("/api/pages/batch", json={"operations": [
+            {"op": "create", "data": {"school_id": school["id"], "name": "About", "slug": "about"}},
+            {"op": "update", "data": {"name": "no id"}},
+        ]})
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["index"] == 1
+        assert standin.tables["pages"] == []
+
+    def test_too_many_operations(self, client, monkeypatch):
+        monkeypatch.setattr(server, "PAGE_BATCH_LIMIT", 1)
+        response = client.post("/api/pages/batch", json={"operations": [{"op": "delete", "id": "a"}] * 2})
+        assert response.status_code == 413
+
+
+class TestRevisions:
+    def edit(self, client, page_id, text):
+        response = client.patch(f"/api/pages/{page_id}",
+                                json=[{"op": "replace", "path": "/components/0/props/title", "value": text}])
+        assert response.status_code == 200
+        return response.json()["version"]
+
+    def test_every_revision_materializes(self, client, page):
+        versions = {page["version"]: components_of(client, page["id"])}
+        for n in range(25):
+            version = self.edit(client, page["id"], f"edit {n}")
+            versions[version] = components_of(client, page["id"])
+
+        listed = client.get(f"/api/pages/{page['id']}/revisions", params={"limit": 100}).json()["items"]
+        assert [item["version"] for item in listed] == sorted(versions, reverse=True)
+        assert {item["kind"] for item in listed} == {"keyframe", "delta"}
+        for version, components in versions.items():
+            response = client.get(f"/api/pages/{page['id']}/revisions/{version}")
+            assert response.status_code == 200
+            assert response.json()["components"] == components
+
+    def test_listing_pages_by_cursor(self, client, page):
+        for n in range(4):
+            self.edit(client, page["id"], f"edit {n}")
+        first = client.get(f"/api/pages/{page['id']}/revisions", params={"limit": 3}).json()
+        second = client.get(f"/api/pages/{page['id']}/revisions",
+                            params={"limit": 3, "cursor": first["next_cursor"]}).json()
+        assert len(first["items"]) == 3 and len(second["items"]) == 2
+        assert second["next_cursor"] is None
+
+    def test_restore(self, client, standin, page):
+        original = components_of(client, page["id"])
+        version = self.edit(client, page["id"], "changed")
+
+        stale = client.post(f"/api/pages/{page['id']}/revisions/{page['version']}/restore",
+                            headers={"If-Match": '"1"'})
+        assert stale.status_code == 412
+
+        response = client.post(f"/api/pages/{page['id']}/revisions/{page['version']}/restore",
+                               headers={"If-Match": f'"{version}"'})
+        assert response.status_code == 200
+        assert response.json()["components"] == original
+        # Stored as PUT stores components
+        assert standin.tables["pages"][0]["components"] == json.dumps(original)
+        assert response.headers["etag"] == f'"{version + 1}"'
+        latest = client.get(f"/api/pages/{page['id']}/revisions", params={"limit": 1}).json()["items"][0]
+        assert latest["version"] == version + 1
+
+    def test_missing(self, client, page):
+        assert client.get(f"/api/pages/{page['id']}/revisions/999").status_code == 404
+        assert client.get(f"/api/pages/{MISSING_PAGE}/revisions").status_code == 404
+        assert client.get(f"/api/pages/{page['id']}/revisions", params={"cursor": "x"}).status_code == 400
+        assert client.post(f"/api/pages/{page['id']}/revisions/999/restore").status_code == 404
+
+
+class TestPublishing:
+    def test_publish_and_serve(self, client, school, page):
+        assert client.get("/api/public/oak/home").status_code == 404
+
+        response = client.post(f"/api/pages/{page['id']}/publish", headers={"If-Match": f'"{page["version"]}"'})
+        assert response.status_code == 200
+        snapshot = response.json()["hash"]
+
+        public = client.get("/api/public/oak/home")
+        assert public.status_code == 200
+        assert public.headers["etag"] == f'"{snapshot}"'
+        assert public.json()["page"]["components"][1]["props"]["events"][0]["title"] == "Sports Day"
+        assert client.get("/api/public/oak/home", headers={"If-None-Match": public.headers["etag"]}).status_code == 304
+
+        html = client.get("/sites/oak/home")
+        assert html.status_code == 200
+        assert "Sports Day" in html.text
+
+    def test_saving_does_not_change_the_published_page(self, client, page):
+        client.post(f"/api/pages/{page['id']}/publish")
+        client.patch(f"/api/pages/{page['id']}",
+                     json=[{"op": "replace", "path": "/components/0/props/title", "value": "Draft"}])
+        assert client.get("/api/public/oak/home").json()["page"]["components"][0]["props"]["title"] == "Welcome to Oak"
+
+    def test_branding_change_rebuilds_the_snapshot(self, client, standin, school, page):
+        published = client.post(f"/api/pages/{page['id']}/publish").json()["hash"]
+        client.patch(f"/api/pages/{page['id']}",
+                     json=[{"op": "replace", "path": "/components/0/props/title", "value": "Draft"}])
+        client.put(f"/api/schools/{school['id']}/theme", json={"theme": "forest"})
+        assert standin.tables["published_pages"][0]["stale"] == 1
+
+        # The content stays as published; only the branding and theme are new
+        public = client.get("/api/public/oak/home")
+        bundle = public.json()
+        assert bundle["theme"]["id"] == "forest"
+        assert bundle["page"]["components"][0]["props"]["title"] == "Welcome to Oak"
+        assert public.headers["etag"] != f'"{published}"'
+        assert standin.tables["published_pages"][0]["stale"] == 0
+        assert standin.tables["published_pages"][0]["snapshot_hash"] == public.headers["etag"].strip('"')
+
+    def test_stale_publish(self, client, page):
+        response = client.post(f"/api/pages/{page['id']}/publish", headers={"If-Match": '"999"'})
+        assert response.status_code == 412
+        assert client.get("/api/public/oak/home").status_code == 404
+
+    def test_unpublish(self, client, page):
+        client.post(f"/api/pages/{page['id']}/publish")
+        assert client.delete(f"/api/pages/{page['id']}/publish").status_code == 200
+        assert client.get("/api/public/oak/home").status_code == 404
+        assert client.get("/sites/oak/home").status_code == 404
+
+    def test_missing_page(self, client):
+        assert client.post(f"/api/pages/{MISSING_PAGE}/publish").status_code == 404
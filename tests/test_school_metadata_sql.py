@@ -0,0 +1,25 @@
+"""set_school_metadata_key from schema_v6.sql, against a real database"""
+import json
+import uuid
+
+
+def metadata(database):
+    return json.loads(database.fetchval("SELECT metadata FROM schools WHERE id = $1", database.school_id))
+
+
+def test_replaces_only_its_key(database):
+    database.fetchval("UPDATE schools SET metadata = '{\"themes\": [1], \"components\": [2]}' WHERE id = $1",
+                      database.school_id)
+    assert database.fetchval("SELECT set_school_metadata_key($1, 'themes', $2::jsonb)", database.school_id,
+                             json.dumps([{"id": "dark"}]))
+    assert metadata(database) == {"themes": [{"id": "dark"}], "components": [2]}
+
+
+def test_empty_metadata(database):
+    database.fetchval("UPDATE schools SET metadata = NULL WHERE id = $1", database.school_id)
+    database.fetchval("SELECT set_school_metadata_key($1, 'components', '[]'::jsonb)", database.school_id)
+    assert metadata(database) == {"components": []}
+
+
+def test_missing_school(database):
+    assert database.fetchval("SELECT set_school_metadata_key($1, 'themes', '[]'::jsonb)", str(uuid.uuid4())) is False
@@ -0,0 +1,62 @@
+"""Full-text search over page names and component content"""
+import pytest
+
+import server
+
+MISSING_SCHOOL = "00000000-0000-0000-0000-000000000000"
+
+
+class TestSearchResults:
+    def test_snippet_escapes_text_and_marks_matches(self):
+        snippet = f"a <b> {server.SNIPPET_START}Sports{server.SNIPPET_STOP} & games"
+        assert server.snippet_html(snippet) == "a &lt;b&gt; <mark>Sports</mark> &amp; games"
+
+    def test_missing_snippet(self):
+        assert server.snippet_html(None) == ""
+
+    def test_hits_grouped_by_page_in_rank_order(self):
+        def hit(page_id, position, rank):
+            return {"page_id": page_id, "page_name": page_id.title(), "page_slug": page_id, "is_published": False,
+                    "component_id": f"c{position}", "component_type": "text", "position": position,
+                    "rank": rank, "snippet": "x"}
+
+        results = server.group_search_hits([hit("home", 3, 0.9), hit("about", 0, 0.5), hit("home", 1, 0.2)])
+        assert [page["page_id"] for page in results] == ["home", "about"]
+        assert results[0]["rank"] == 0.9
+        # Hits within a page come in page order
+        assert [h["position"] for h in results[0]["hits"]] == [1, 3]
+
+
+class TestSearch:
+    def search(self, client, school_id, q, **params):
+        return client.get(f"/api/schools/{school_id}/search", params={"q": q, **params})
+
+    def test_component_hits_with_snippets(self, client, school, page):
+        response = self.search(client, school["id"], "sports day")
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [result["page_id"] for result in results] == [page["id"]]
+        hit = results[0]["hits"][0]
+        assert (hit["component_id"], hit["component_type"]) == ("events", "events")
+        assert "<mark>Sports</mark>" in hit["snippet"]
+
+    def test_page_name_hit(self, client, school, page):
+        hits = self.search(client, school["id"], "home").json()["results"][0]["hits"]
+        assert hits[0]["component_type"] == "page" and hits[0]["component_id"] is None
+
+    def test_urls_are_not_indexed(self, client, school, page):
+        assert self.search(client, school["id"], "cdn").json()["results"] == []
+
+    def test_follows_edits(self, client, school, page):
+        client.patch(f"/api/pages/{page['id']}", json=[
+            {"op": "replace", "path": "/components/2/props/members/0/name", "value": "Sam Okafor"},
+        ])
+        assert self.search(client, school["id"], "gonzalez").json()["results"] == []
+        assert self.search(client, school["id"], "okafor").json()["results"][0]["hits"][0]["component_id"] == "staff"
+
+    @pytest.mark.parametrize("params", [{"q": ""}, {"q": "   "}, {}, {"q": "x", "limit": 0}])
+    def test_invalid_query(self, client, school, params):
+        assert client.get(f"/api/schools/{school['id']}/search", params=params).status_code == 422
+
+    def test_missing_school(self, client):
+        assert self.search(client, MISSING_SCHOOL, "sports").status_code == 404
@@ -0,0 +1,113 @@
+"""The local-disk storage backend and the /uploads route that serves it"""
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from storage import StorageBackend, LocalStorage
+
+
+@pytest.fixture
+def local_storage(tmp_path, monkeypatch):
+    backend = LocalStorage(str(tmp_path), "http://api.test/")
+    monkeypatch.setattr(server, "storage", backend)
+    return backend
+
+
+def test_backend_must_implement_every_operation():
+    class Partial(StorageBackend):
+        async def read(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
+
+
+class TestLocalStorage:
+    def test_round_trip(self, local_storage, tmp_path):
+        source = tmp_path / "source.bin"
+        source.write_bytes(b"file")
+
+        async def scenario():
+            await local_storage.put_file("uploads/a.png", str(source), "image/png")
+            await local_storage.put_bytes("uploads/a.json", b"{}", "application/json")
+            return await local_storage.read("uploads/a.png"), await local_storage.read("uploads/a.json")
+
+        assert asyncio.run(scenario()) == (b"file", b"{}")
+        assert not list((tmp_path / "uploads").glob(".tmp-*"))
+
+    def test_missing_object(self, local_storage):
+        assert asyncio.run(local_storage.read("uploads/none.png")) is None
+
+    @pytest.mark.parametrize("key", ["../outside.png", "uploads/../../outside.png", ""])
+    def test_keys_stay_under_root(self, local_storage, key):
+        assert local_storage.path_for(key) is None
+        with pytest.raises(ValueError):
+            asyncio.run(local_storage.put_bytes(key, b"x", "image/png"))
+
+    def test_public_url_round_trips(self, local_storage):
+        url = asyncio.run(local_storage.public_url("uploads/a.png"))
+        assert url == "http://api.test/uploads/a.png"
+        assert local_storage.key_for_url(url + "?v=2") == "uploads/a.png"
+        assert local_storage.key_for_url("https://elsewhere.test/uploads/a.png") is None
+
+
+class TestServeUpload:
+    BODY = bytes(range(256)) * 4
+
+    @pytest.fixture
+    def client(self, local_storage):
+        asyncio.run(local_storage.put_bytes("uploads/a.png", self.BODY, "image/png"))
+        return TestClient(server.app)
+
+    def test_whole_file(self, client):
+        response = client.get("/uploads/a.png")
+        assert response.status_code == 200
+        assert response.content == self.BODY
+        assert response.headers["content-type"] == "image/png"
+        assert "immutable" in response.headers["cache-control"]
+
+    def test_not_modified(self, client):
+        etag = client.get("/uploads/a.png").headers["etag"]
+        assert client.get("/uploads/a.png", headers={"If-None-Match": etag}).status_code == 304
+
+    def test_range(self, client):
+        response = client.get("/uploads/a.png", headers={"Range": "bytes=10-19"})
+        assert response.status_code == 206
+        assert response.content == self.BODY[10:20]
+        assert response.headers["content-range"] == f"bytes 10-19/{len(self.BODY)}"
+
+    def test_unsatisfiable_range(self, client):
+        response = client.get("/uploads/a.png", headers={"Range": "bytes=5000-"})
+        assert response.status_code == 416
+        assert response.headers["content-range"] == f"bytes */{len(self.BODY)}"
+
+    @pytest.mark.parametrize("name", ["missing.png", ".tmp-abc", "../a.png"])
+    def test_not_found(self, client, name):
+        assert client.get(f"/uploads/{name}").status_code == 404
+
+    def test_other_backend(self, client, monkeypatch):
+        monkeypatch.setattr(server, "storage", object())
+        assert client.get("/uploads/a.png").status_code == 404
+
+
+class TestParseByteRange:
+    @pytest.mark.parametrize("header, expected", [
+        ("bytes=0-99", (0, 99)),
+        ("bytes=100-", (100, 999)),
+        ("bytes=-100", (900, 999)),
+        ("bytes=-5000", (0, 999)),
+        ("bytes=900-5000", (900, 999)),
+        (" Bytes = 5-5", (5, 5)),
+    ])
+    def test_single_range(self, header, expected):
+        assert server.parse_byte_range(header, 1000) == expected
+
+    @pytest.mark.parametrize("header", ["bytes=1000-", "bytes=50-10", "bytes=-0"])
+    def test_unsatisfiable(self, header):
+        assert server.parse_byte_range(header, 1000) is None
+
+    @pytest.mark.parametrize("header", ["bytes=0-10,20-30", "items=0-10", "bytes=a-b"])
+    def test_whole_file(self, header):
+        assert server.parse_byte_range(header, 1000) == (0, 999)
@@ -0,0 +1,20 @@
+"""The async Supabase client and its shared connection pool, built when the app starts"""
+import server
+
+
+def test_postgrest_and_storage_share_one_pool(client):
+    assert server.supabase.postgrest.session is server.http_client
+    assert server.supabase.storage._client is server.http_client
+
+
+def test_timeouts(client):
+    assert server.http_client.timeout == server.http_timeout
+
+
+def test_closed_on_shutdown(standin):
+    from fastapi.testclient import TestClient
+
+    server.datastore_transport.transport = standin
+    with TestClient(server.app):
+        http_client = server.http_client
+    assert http_client.is_closed
@@ -0,0 +1,94 @@
+"""Data-store spans recorded by the instrumented transport, and their per-request trace"""
+import asyncio
+
+import httpx
+import pytest
+
+from tracing import InstrumentedTransport, Trace, TracingMiddleware, current_trace, describe, row_count
+
+
+@pytest.mark.parametrize("method, url, headers, expected", [
+    ("GET", "/rest/v1/pages?id=eq.1", {}, ("postgrest", "pages", "select")),
+    ("POST", "/rest/v1/pages", {}, ("postgrest", "pages", "insert")),
+    ("POST", "/rest/v1/pages", {"Prefer": "resolution=merge-duplicates"}, ("postgrest", "pages", "upsert")),
+    ("POST", "/rest/v1/rpc/patch_page", {}, ("postgrest", "patch_page", "rpc")),
+    ("POST", "/storage/v1/object/uploads/a.png", {}, ("storage", "uploads", "upload")),
+    ("GET", "/storage/v1/object/public/uploads/a.png", {}, ("storage", "uploads", "download")),
+    ("GET", "/other", {}, ("db.test", "/other", "get")),
+])
+def test_describe(method, url, headers, expected):
+    assert describe(httpx.Request(method, f"http://db.test{url}", headers=headers)) == expected
+
+
+@pytest.mark.parametrize("content_range, rows", [
+    (None, None),
+    ("0-24/*", 25),
+    ("5-5/100", 1),
+    ("*/0", 0),
+    ("garbage", None),
+])
+def test_row_count(content_range, rows):
+    headers = {"Content-Range": content_range} if content_range else {}
+    assert row_count(httpx.Response(200, headers=headers)) == rows
+
+
+def backend(request):
+    return httpx.Response(200, headers={"Content-Range": "0-1/*"}, content=b'[{"id": 1}, {"id": 2}]')
+
+
+def test_span_recorded_on_the_current_trace():
+    spans = []
+    transport = InstrumentedTransport(httpx.MockTransport(backend), on_span=[spans.append])
+    trace = Trace(method="GET", path="/api/pages")
+
+    async def scenario():
+        token = current_trace.set(trace)
+        try:
+            async with httpx.AsyncClient(transport=transport) as client:
+                return await client.get("http://db.test/rest/v1/pages")
+        finally:
+            current_trace.reset(token)
+
+    assert asyncio.run(scenario()).json() == [{"id": 1}, {"id": 2}]
+    [span] = trace.spans
+    assert spans == [span]
+    assert (span.service, span.target, span.operation, span.status, span.rows) == ("postgrest", "pages", "select", 200, 2)
+    assert span.bytes_received == len(b'[{"id": 1}, {"id": 2}]')
+
+
+def test_failed_call_recorded_without_status():
+    def unreachable(request):
+        raise httpx.ConnectError("down")
+
+    spans = []
+    transport = InstrumentedTransport(httpx.MockTransport(unreachable), on_span=[spans.append])
+
+    async def scenario():
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("http://db.test/rest/v1/pages")
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(scenario())
+    assert spans[0].status is None
+
+
+def test_server_timing_totals_per_service():
+    transport = InstrumentedTransport(httpx.MockTransport(backend))
+    messages = []
+
+    async def app(scope, receive, send):
+        async with httpx.AsyncClient(transport=transport) as client:
+            await client.get("http://db.test/rest/v1/pages")
+            await client.get("http://db.test/rest/v1/schools")
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": "/api/pages"}
+    asyncio.run(TracingMiddleware(app)(scope, None, send))
+    headers = dict(messages[0]["headers"])
+    assert headers[b"server-timing"].startswith(b"postgrest;dur=")
+    assert headers[b"server-timing"].endswith(b'desc="2 calls"')
+    assert len(scope["trace"].spans) == 2
@@ -0,0 +1,89 @@
+"""Image uploads: the multipart body streamed to a bounded spool"""
+import asyncio
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+import server
+from media import MalformedUpload, UnsupportedImageType, UploadTooLarge, spool_multipart_upload
+
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 200
+BOUNDARY = "----boundary"
+CONTENT_TYPE = f"multipart/form-data; boundary={BOUNDARY}"
+
+
+def form(*parts):
+    """A multipart body from (name, filename or None, content) parts"""
+    body = b""
+    for name, filename, content in parts:
+        disposition = f'form-data; name="{name}"' + (f'; filename="{filename}"' if filename else "")
+        body += f"--{BOUNDARY}\r\nContent-Disposition: {disposition}\r\n\r\n".encode() + content + b"\r\n"
+    return body + f"--{BOUNDARY}--\r\n".encode()
+
+
+def spool(body, content_type=CONTENT_TYPE, max_bytes=1024, chunk_size=7):
+    async def chunks():
+        for start in range(0, len(body), chunk_size):
+            yield body[start:start + chunk_size]
+
+    return asyncio.run(spool_multipart_upload(chunks(), content_type, "file", max_bytes, form_overhead=256))
+
+
+def test_file_part_is_spooled():
+    spooled = spool(form(("caption", None, b"hello"), ("file", "a.png", PNG)))
+    try:
+        assert (spooled.content_type, spooled.ext, spooled.size) == ("image/png", "png", len(PNG))
+        with open(spooled.path, "rb") as f:
+            assert f.read() == PNG
+    finally:
+        spooled.cleanup()
+    assert not os.path.exists(spooled.path)
+
+
+@pytest.mark.parametrize("body, content_type, error", [
+    (form(("file", "a.txt", b"just some text here")), CONTENT_TYPE, UnsupportedImageType),
+    (form(("file", "a.png", PNG * 10)), CONTENT_TYPE, UploadTooLarge),
+    (form(("other", "a.png", PNG)), CONTENT_TYPE, MalformedUpload),
+    (form(("file", None, PNG)), CONTENT_TYPE, MalformedUpload),
+    (b"not multipart", "application/octet-stream", MalformedUpload),
+    (b"--nope\r\n", CONTENT_TYPE, MalformedUpload),
+])
+def test_refused(body, content_type, error):
+    with pytest.raises(error):
+        spool(body, content_type)
+
+
+def test_oversized_body_is_cut_off_without_parsing():
+    # Padding in another field still counts against the body limit
+    with pytest.raises(UploadTooLarge):
+        spool(form(("padding", None, b"x" * 2000), ("file", "a.png", PNG)))
+
+
+@pytest.mark.parametrize("size, text", [
+    (900, "900 bytes"),
+    (512 * 1024, "512 KB"),
+    (1536 * 1024, "1.5 MB"),
+    (10 * 1024 * 1024, "10 MB"),
+])
+def test_format_byte_size(size, text):
+    assert server.format_byte_size(size) == text
+
+
+class TestRoute:
+    def post(self, body, **headers):
+        return TestClient(server.app).post("/api/upload", content=body,
+                                           headers={"Content-Type": CONTENT_TYPE, **headers})
+
+    def test_declared_length_over_limit(self, monkeypatch):
+        monkeypatch.setattr(server, "UPLOAD_MAX_BYTES", 100)
+        monkeypatch.setattr(server, "UPLOAD_FORM_OVERHEAD", 10)
+        response = self.post(form(("file", "a.png", PNG)))
+        assert response.status_code == 413
+        assert response.json()["detail"] == "File too large. Maximum size is 100 bytes."
+
+    def test_not_an_image(self):
+        assert self.post(form(("file", "a.txt", b"just some text here"))).status_code == 400
+
+    def test_no_file_field(self):
+        assert self.post(form(("caption", None, b"hello"))).status_code == 422